@@ -0,0 +1,13 @@
+"""
+Offline benchmarks for the profile model layer.
+
+These run against fake Discord objects without connecting to the gateway or the database, so they
+can be run anywhere the bot's requirements are installed. From the `Jakes Profiles` directory:
+
+    python -m benchmarks                    # Run everything and compare against the saved baseline
+    python -m benchmarks --save             # Run everything and store the results as the new baseline
+    python -m benchmarks -k command         # Only run benchmarks with "command" in their name
+
+The process exits with a non-zero status if any benchmark is slower (or allocates more) than its
+baseline by more than the allowed tolerance.
+"""
@@ -0,0 +1,60 @@
+import argparse
+import pathlib
+import sys
+
+from benchmarks import cases  # noqa - registers the benchmarks
+from benchmarks import runner
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the profile model benchmarks.")
+    parser.add_argument("-k", "--filter", default=None, help="Only run benchmarks whose name contains this")
+    parser.add_argument("--iterations", type=int, default=None, help="Override the number of timed iterations for every benchmark")
+    parser.add_argument("--baseline", type=pathlib.Path, default=None, help="The baseline file to compare against or save to")
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline instead of comparing")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="Allowed fractional slowdown before failing")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="Allowed fractional allocation increase before failing")
+    args = parser.parse_args()
+
+    # Run everything
+    baseline_path = args.baseline or runner.get_default_baseline_path()
+    results = {}
+    print(f"{'benchmark':<45} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'peak B':>10} {'kept B':>10}")
+    for benchmark in runner.BENCHMARKS:
+        if args.filter and args.filter not in benchmark.name:
+            continue
+        result = runner.run_benchmark(benchmark, iterations=args.iterations)
+        results[benchmark.name] = result
+        print(
+            f"{benchmark.name:<45} {result['p50_us']:>10.2f} {result['p90_us']:>10.2f} {result['p99_us']:>10.2f} "
+            f"{result['alloc_peak_bytes']:>10.0f} {result['alloc_retained_bytes']:>10.0f}"
+        )
+
+    # Save a new baseline, keeping any results that weren't run this time
+    if args.save:
+        baseline = runner.load_baseline(baseline_path) or dict()
+        baseline.update(results)
+        runner.save_baseline(baseline_path, baseline)
+        print(f"Saved baseline to {baseline_path}")
+        return 0
+
+    # Compare against the old one
+    baseline = runner.load_baseline(baseline_path)
+    if baseline is None:
+        print(f"No baseline at {baseline_path} - run with --save to create one")
+        return 0
+    regressions = runner.find_regressions(
+        results, baseline,
+        time_tolerance=args.time_tolerance,
+        memory_tolerance=args.memory_tolerance,
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        return 1
+    print(f"No regressions against {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+The benchmarks themselves. Each registered function is a single call of the operation being measured.
+"""
+
+import asyncio
+import itertools
+import random
+import typing
+import uuid
+
+from cogs import utils as localutils
+from cogs.utils.profiles import command_processor, embed_budget
+from benchmarks import fakes
+from benchmarks.runner import register
+
+
+BOT = fakes.FakeBot()
+TEMPLATE = fakes.make_template(10)
+LARGE_TEMPLATE = fakes.make_template(25, command_field_count=10)
+PLAIN_TEMPLATE = fakes.make_template(10, command_field_count=0)
+USER_PROFILE = fakes.make_user_profile(TEMPLATE)
+PLAIN_USER_PROFILE = fakes.make_user_profile(PLAIN_TEMPLATE)
+LARGE_USER_PROFILE = fakes.make_user_profile(LARGE_TEMPLATE, value_length=1_000)
+MEMBER = fakes.make_member(USER_PROFILE.user_id, fakes.ROLE_IDS[:3])
+ROLELESS_MEMBER = fakes.make_member(USER_PROFILE.user_id)
+MANY_ROLES_MEMBER = fakes.make_member(USER_PROFILE.user_id, fakes.ROLE_IDS[-40:] + list(range(1, 200)))
+
+
+# Command prompts
+PLAIN_PROMPT = "What is your character's name?"
+SIMPLE_COMMAND = f'{{{{DEFAULT "nothing" HASROLE({fakes.ROLE_IDS[0]}) SAYS "has role"}}}}'
+LONG_COMMAND = "{{DEFAULT \"nothing\" " + " ".join([f'HASANYROLE({i}, {i + 1}) SAYS "role {i}"' for i in fakes.ROLE_IDS[:40]]) + "}}"
+UNCLOSED_COMMAND = "{{DEFAULT " + "x" * 10_000
+NESTED_BRACES = "{{\n" * 1_000
+LONG_PLAIN_PROMPT = "lorem ipsum " * 1_000
+
+
+@register("command.get_is_command.plain", iterations=10_000)
+def get_is_command_plain():
+    return localutils.CommandProcessor.get_is_command(PLAIN_PROMPT)
+
+
+@register("command.get_is_command.simple", iterations=10_000)
+def get_is_command_simple():
+    return localutils.CommandProcessor.get_is_command(SIMPLE_COMMAND)
+
+
+@register("command.get_is_command.long_plain", iterations=2_000)
+def get_is_command_long_plain():
+    return localutils.CommandProcessor.get_is_command(LONG_PLAIN_PROMPT)
+
+
+@register("command.get_is_command.unclosed", iterations=500)
+def get_is_command_unclosed():
+    return localutils.CommandProcessor.get_is_command(UNCLOSED_COMMAND)
+
+
+@register("command.get_is_command.nested_braces", iterations=50)
+def get_is_command_nested_braces():
+    return localutils.CommandProcessor.get_is_command(NESTED_BRACES)
+
+
+@register("command.get_value.simple", iterations=10_000)
+def get_value_simple():
+    return localutils.CommandProcessor.get_value(SIMPLE_COMMAND, MEMBER)
+
+
+@register("command.get_value.long", iterations=5_000)
+def get_value_long():
+    return localutils.CommandProcessor.get_value(LONG_COMMAND, MANY_ROLES_MEMBER)
+
+
+@register("command.compile.simple.cold", iterations=5_000)
+def compile_simple_cold():
+    return command_processor._compile.__wrapped__(SIMPLE_COMMAND)
+
+
+@register("command.compile.long.cold", iterations=1_000)
+def compile_long_cold():
+    return command_processor._compile.__wrapped__(LONG_COMMAND)
+
+
+@register("command.compile.unclosed.cold", iterations=200)
+def compile_unclosed_cold():
+    return command_processor._compile.__wrapped__(UNCLOSED_COMMAND)
+
+
+# Embeds
+@register("user_profile.build_embed.render", iterations=2_000)
+def user_profile_render():
+    return USER_PROFILE._build_embed(BOT, MEMBER)
+
+
+@register("user_profile.build_embed.render.large", iterations=500)
+def user_profile_render_large():
+    return LARGE_USER_PROFILE._build_embed(BOT, MEMBER)
+
+
+@register("user_profile.build_embeds.split.large", iterations=500)
+def user_profile_build_embeds_split_large():
+    return embed_budget.validate_embeds(embed_budget.split_embed(LARGE_USER_PROFILE._build_embed(BOT, MEMBER)))
+
+
+@register("user_profile.build_embed.cached", iterations=5_000)
+def user_profile_cached():
+    return USER_PROFILE.build_embed(BOT, MEMBER)
+
+
+@register("user_profile.build_embed.no_member", iterations=2_000)
+def user_profile_no_member():
+    # Command fields need a member to be evaluated, so this uses a template without any
+    return PLAIN_USER_PROFILE._build_embed(BOT, None)
+
+
+@register("template.build_embed.brief", iterations=2_000)
+def template_build_embed_brief():
+    return TEMPLATE.build_embed(BOT, brief=True)
+
+
+@register("template.build_embed.full", iterations=2_000)
+def template_build_embed_full():
+    return TEMPLATE.build_embed(BOT, brief=False)
+
+
+@register("template.build_embed.full.large", iterations=500)
+def template_build_embed_full_large():
+    return LARGE_TEMPLATE.build_embed(BOT, brief=False)
+
+
+@register("template.compile", iterations=2_000)
+def template_compile():
+    return localutils.CompiledTemplate.from_fields(TEMPLATE.all_fields.values())
+
+
+@register("template.compile.large", iterations=500)
+def template_compile_large():
+    return localutils.CompiledTemplate.from_fields(LARGE_TEMPLATE.all_fields.values())
+
+
+# Field type validators
+TEXT_VALUE = "a" * 1_000
+IMAGE_URL = "https://cdn.discordapp.com/attachments/123456789/987654321/my_character_image.png"
+INVALID_IMAGE_URL = "https://" + "a/" * 500 + "!"
+IMAGE_MESSAGE = fakes.FakeMessage("", attachments=[fakes.FakeAttachment(IMAGE_URL)])
+QUERY_IMAGE_URL = IMAGE_URL + "?ex=65a1b2c3&is=659f3d4e&hm=" + "f" * 64 + "&"
+UNTYPED_IMAGE_MESSAGE = fakes.FakeMessage("", attachments=[fakes.FakeAttachment(QUERY_IMAGE_URL, content_type=None)])
+
+# Seeded random 1000 character URLs made of the characters that the old regex backtracked over, so the
+# worst case of the validator shows up in the p99
+_fuzz_random = random.Random(16)
+FUZZ_IMAGE_URLS = [
+    "https://" + "".join(_fuzz_random.choices("/.|a- _", k=1_000 - len("https://") - 4)) + _fuzz_random.choice([".png", ".pn!", "?.pn", "/.jp"])
+    for _ in range(200)
+]
+_fuzz_image_urls = itertools.cycle(FUZZ_IMAGE_URLS)
+
+
+def _check_failure(field_type, value):
+    try:
+        return field_type.check(value)
+    except localutils.errors.FieldCheckFailure:
+        return False
+
+
+@register("field_type.text.check", iterations=20_000)
+def text_check():
+    return localutils.TextField.check(TEXT_VALUE)
+
+
+@register("field_type.number.check", iterations=20_000)
+def number_check():
+    return localutils.NumberField.check("123456")
+
+
+@register("field_type.number.check.invalid", iterations=20_000)
+def number_check_invalid():
+    return _check_failure(localutils.NumberField, "not a number")
+
+
+@register("field_type.image.check", iterations=10_000)
+def image_check():
+    return localutils.ImageField.check(IMAGE_URL)
+
+
+@register("field_type.image.check.invalid_long", iterations=200)
+def image_check_invalid_long():
+    return _check_failure(localutils.ImageField, INVALID_IMAGE_URL)
+
+
+@register("field_type.image.check.query_string", iterations=10_000)
+def image_check_query_string():
+    return localutils.ImageField.check(QUERY_IMAGE_URL)
+
+
+@register("field_type.image.check.fuzz_1000", iterations=2_000)
+def image_check_fuzz():
+    return _check_failure(localutils.ImageField, next(_fuzz_image_urls))
+
+
+@register("field_type.image.get_from_message", iterations=10_000)
+def image_get_from_message():
+    return localutils.ImageField.get_from_message(IMAGE_MESSAGE)
+
+
+@register("field_type.image.get_from_message.untyped", iterations=10_000)
+def image_get_from_message_untyped():
+    return localutils.ImageField.get_from_message(UNTYPED_IMAGE_MESSAGE)
+
+
+# Field construction
+FIELD_ROW = {
+    "field_id": uuid.uuid4(),
+    "name": "Field",
+    "index": 0,
+    "prompt": PLAIN_PROMPT,
+    "timeout": 120,
+    "field_type": "1000-CHAR",
+    "template_id": TEMPLATE.template_id,
+    "optional": False,
+    "deleted": False,
+}
+
+
+@register("field.construct", iterations=20_000)
+def field_construct():
+    return localutils.Field(**FIELD_ROW)
+
+
+@register("field.from_record", iterations=20_000)
+def field_from_record():
+    return localutils.Field.from_record(FIELD_ROW)
+
+
+@register("filled_field.construct", iterations=20_000)
+def filled_field_construct():
+    return localutils.FilledField(user_id=2, name="default", field_id=FIELD_ROW["field_id"], value=TEXT_VALUE)
+
+
+@register("filled_field.from_record", iterations=20_000)
+def filled_field_from_record():
+    return localutils.FilledField.from_record(FILLED_FIELD_ROW)
+
+
+# Bulk loading 100k filled fields - 1000 profiles of 100 fields each
+# The rows are built inside each call the same way that asyncpg decodes them (a new user ID and name
+# object per row) and are dropped before returning, so "kept B" is what the loaded profiles hold on to;
+# compare the two benchmarks to see how much sharing the profile's objects saves per 100k filled fields
+FILLED_FIELD_ROW = {"user_id": 2, "name": "default", "field_id": FIELD_ROW["field_id"], "value": TEXT_VALUE}
+BULK_TEMPLATE = fakes.make_template(100, command_field_count=0, image_field=False)
+BULK_FIELD_IDS = list(BULK_TEMPLATE.all_fields.keys())
+BULK_PROFILE_COUNT = 1_000
+
+
+def _make_bulk_rows(user_id:int) -> typing.List[dict]:
+    return [
+        {"user_id": user_id + 10 ** 17, "name": f"profile {user_id}", "field_id": i, "value": "value"}
+        for i in BULK_FIELD_IDS
+    ]
+
+
+def _make_bulk_profile(user_id:int) -> localutils.UserProfile:
+    return localutils.UserProfile.from_record({
+        "user_id": user_id + 10 ** 17, "name": f"profile {user_id}", "template_id": BULK_TEMPLATE.template_id,
+        "verified": True, "posted_message_id": None, "posted_channel_id": None,
+    }, BULK_TEMPLATE)
+
+
+@register("filled_field.bulk_100k.kwargs", iterations=3)
+def filled_field_bulk_kwargs():
+    # How filled fields were built before `FilledField.from_record`, kept here for comparison
+    profiles = []
+    for user_id in range(BULK_PROFILE_COUNT):
+        profile = _make_bulk_profile(user_id)
+        for row in _make_bulk_rows(user_id):
+            filled = localutils.FilledField(**row)
+            filled.field = BULK_TEMPLATE.all_fields[filled.field_id]
+            profile.all_filled_fields[filled.field_id] = filled
+        profile._saved_values = {i: o.value for i, o in profile.all_filled_fields.items()}
+        profiles.append(profile)
+    return profiles
+
+
+@register("filled_field.bulk_100k.from_record", iterations=3)
+def filled_field_bulk_from_record():
+    profiles = []
+    for user_id in range(BULK_PROFILE_COUNT):
+        profile = _make_bulk_profile(user_id)
+        profile._store_filled_field_rows(_make_bulk_rows(user_id))
+        profiles.append(profile)
+    return profiles
+
+
+# Cache invalidation between two processes, over the in-process Redis stand-in
+INVALIDATION_LOOP = asyncio.new_event_loop()
+INVALIDATION_REDIS = localutils.invalidation.LocalRedis()
+INVALIDATION_BUSES = [localutils.invalidation.InvalidationBus(redis=INVALIDATION_REDIS) for _ in range(2)]
+for _bus in INVALIDATION_BUSES:
+    _bus.register("profile", lambda entity_id: localutils.UserProfile.embed_cache.invalidate_profile(*entity_id))
+    INVALIDATION_REDIS.subscribe(_bus.channel, _bus.receive)
+
+
+@register("invalidation.publish.local_redis", iterations=5_000)
+def invalidation_publish():
+    return INVALIDATION_LOOP.run_until_complete(
+        INVALIDATION_BUSES[0].publish("profile", [str(USER_PROFILE.template_id), USER_PROFILE.user_id, USER_PROFILE.name]),
+    )
@@ -0,0 +1,154 @@
+"""
+Lightweight stand-ins for the Discord objects that the profile model layer touches.
+"""
+
+import typing
+import uuid
+
+import discord
+
+from cogs import utils as localutils
+
+
+class FakeUser(object):
+
+    def __init__(self, user_id:int, name:str="Benchmark User"):
+        self.id: int = user_id
+        self.name: str = name
+        self.discriminator: str = "0001"
+        self.bot: bool = False
+        self.avatar = None
+
+    def __str__(self):
+        return f"{self.name}#{self.discriminator}"
+
+
+class FakeGuild(object):
+
+    def __init__(self, guild_id:int, name:str="Benchmark Guild"):
+        self.id: int = guild_id
+        self.name: str = name
+
+
+def make_member(user_id:int, role_ids:typing.Iterable[int]=(), guild:FakeGuild=None) -> discord.Member:
+    """
+    Make a `discord.Member` without any connection state - only the attributes that the model layer
+    reads are filled in, so that `isinstance` checks pass without needing a gateway.
+    """
+
+    member = discord.Member.__new__(discord.Member)
+    member._user = FakeUser(user_id)
+    member._roles = discord.utils.SnowflakeList(list(role_ids))
+    member._state = None
+    member.guild = guild or FakeGuild(1)
+    member.nick = None
+    member.activities = tuple()
+    member.joined_at = None
+    member.premium_since = None
+    return member
+
+
+class FakeAttachment(object):
+
+    def __init__(self, url:str, *, content_type:typing.Optional[str]="image/png", size:int=1_024):
+        self.url: str = url
+        self.filename: str = url.rsplit("/", 1)[-1]
+        self.content_type: typing.Optional[str] = content_type
+        self.size: int = size
+
+
+class FakeMessage(object):
+
+    def __init__(self, content:str, *, author=None, attachments:typing.List[FakeAttachment]=None):
+        self.id: int = 0
+        self.content: str = content
+        self.author = author
+        self.attachments: typing.List[FakeAttachment] = attachments or list()
+
+
+class FakeBot(object):
+    """
+    Enough of a bot for embeds to be built.
+    """
+
+    def __init__(self):
+        self.user = FakeUser(1, "ProfileBot")
+        self.config = {"embed": {"enabled": False}}
+
+    def set_footer_from_config(self, embed:discord.Embed) -> None:
+        pass
+
+
+GUILD_ID = 141231597155385344
+ROLE_IDS = [100_000_000_000_000_000 + i for i in range(50)]
+
+
+def make_template(field_count:int=10, *, command_field_count:int=2, image_field:bool=True) -> localutils.Template:
+    """
+    Make a template with a mix of text, number, command and image fields.
+    """
+
+    template = localutils.Template(
+        template_id=uuid.uuid4(),
+        colour=0x00ff00,
+        guild_id=GUILD_ID,
+        verification_channel_id=str(ROLE_IDS[0]),
+        name="benchmark",
+        archive_channel_id=f'{{{{DEFAULT "{ROLE_IDS[1]}" HASROLE({ROLE_IDS[2]}) SAYS "{ROLE_IDS[3]}"}}}}',
+        role_id=None,
+        max_profile_count=5,
+        max_field_count=field_count + 5,
+    )
+    fields = []
+    for index in range(field_count):
+        if index < command_field_count:
+            prompt = f'{{{{DEFAULT "nothing" HASROLE({ROLE_IDS[index]}) SAYS "role {index}" HASANYROLE({ROLE_IDS[index + 1]}, {ROLE_IDS[index + 2]}) SAYS "any {index}"}}}}'
+            field_type = "1000-CHAR"
+        elif image_field and index == field_count - 1:
+            prompt = "Give an image for your profile."
+            field_type = "IMAGE"
+        elif index % 3 == 0:
+            prompt = f"How old is your character? ({index})"
+            field_type = "INT"
+        else:
+            prompt = f"Tell us about your character ({index})."
+            field_type = "1000-CHAR"
+        field = localutils.Field(
+            field_id=uuid.uuid4(),
+            name=f"Field {index}",
+            index=index,
+            prompt=prompt,
+            timeout=120,
+            field_type=field_type,
+            template_id=template.template_id,
+            optional=False,
+            deleted=False,
+        )
+        fields.append(field)
+    template.set_fields(fields)
+    return template
+
+
+def make_user_profile(template:localutils.Template, user_id:int=2, *, value_length:int=200) -> localutils.UserProfile:
+    """
+    Make a filled profile for the given template, marked as matching what's in the database.
+    """
+
+    user_profile = localutils.UserProfile(
+        user_id=user_id,
+        name="default",
+        template_id=template.template_id,
+        verified=True,
+        template=template,
+    )
+    rows = []
+    for field in template.all_fields.values():
+        if isinstance(field.field_type, localutils.ImageField):
+            value = "https://cdn.discordapp.com/attachments/1/2/image.png"
+        elif isinstance(field.field_type, localutils.NumberField):
+            value = "42"
+        else:
+            value = ("lorem ipsum " * value_length)[:value_length]
+        rows.append({"user_id": user_id, "name": "default", "field_id": field.field_id, "value": value})
+    user_profile._store_filled_field_rows(rows)
+    return user_profile
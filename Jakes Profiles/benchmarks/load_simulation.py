@@ -0,0 +1,324 @@
+"""
+Simulates a burst of users setting up profiles at once (eg after a server announcement), with
+moderators verifying or denying them and some users editing their profiles afterwards.
+
+The `ProfileCreation`, `ProfileVerification` and `Conversations` cogs are driven through a
+simulated bot and Discord API against a real Postgres database. The schema and migrations are
+applied to the given database, and everything the simulation creates is removed afterwards -
+but don't point it at production.
+
+    python -m benchmarks.load_simulation --dsn postgres://profilebot@localhost/profilebot_sim --users 500
+
+Reports throughput, event loop lag, database round trips per command and peak memory (as max RSS,
+or traced Python allocations with --trace-memory).
+"""
+
+import argparse
+import asyncio
+import json
+import pathlib
+import random
+import resource
+import sys
+import time
+import tracemalloc
+import typing
+import uuid
+
+import asyncpg
+
+from cogs import utils as localutils
+from cogs.cache_invalidation import CacheInvalidation
+from cogs.conversations import Conversations
+from cogs.profile_commands import ProfileCreation
+from cogs.profile_verification import ProfileVerification
+from benchmarks import simulation
+from benchmarks.runner import percentile
+
+
+SCHEMA_PATH = pathlib.Path(__file__).resolve().parents[1] / "config" / "database.pgsql"
+
+FIELDS = [
+    # (name, type, prompt, answer)
+    ("Name", "1000-CHAR", "What is your character's name?", "Simulated Character"),
+    ("Age", "INT", "How old is your character?", "27"),
+    ("Backstory", "1000-CHAR", "Tell us your character's backstory.", "lorem ipsum " * 60),
+    ("Status", "1000-CHAR", '{{DEFAULT "Member" HASROLE(1) SAYS "Staff"}}', None),
+    ("Picture", "IMAGE", "Give an image of your character.", "https://cdn.discordapp.com/attachments/1/2/character.png"),
+]
+
+
+class SimulatedSession(object):
+    """
+    One user working through a set (and possibly an edit) of their profile, answering each prompt the bot DMs them.
+    """
+
+    def __init__(self, harness:'LoadSimulation', member:simulation.SimulatedMember, *, edit:bool, deny:bool):
+        self.harness = harness
+        self.member = member
+        self.edit: bool = edit
+        self.deny: bool = deny
+        self.editing: bool = False
+        member.simulated_dm_channel.on_send = self.on_dm
+
+    def get_answer(self, content:str) -> typing.Optional[str]:
+        """
+        Work out what to say to a message from the bot, or None if it isn't a question.
+        """
+
+        for _, _, prompt, answer in FIELDS:
+            if answer is None or not content.startswith(prompt.rstrip(".")):
+                continue
+            if self.editing and random.random() < 0.5:
+                return "pass"
+            return answer
+        return None
+
+    def on_dm(self, message:simulation.SimulatedMessage) -> None:
+        if not message.content:
+            return
+        answer = self.get_answer(message.content)
+        if answer is not None:
+            asyncio.ensure_future(self.reply(answer))
+
+    async def reply(self, content:str) -> None:
+        """
+        Wait a human-ish amount of time, then answer once the bot is listening.
+        """
+
+        await asyncio.sleep(random.uniform(*self.harness.think_time))
+        router = self.harness.conversations.router
+        key = (self.member.simulated_dm_channel.id, self.member.id)
+        for _ in range(100):
+            if key in router.waiters:
+                break
+            await asyncio.sleep(0.01)
+        message = simulation.SimulatedMessage(self.harness.api, self.member.simulated_dm_channel, self.member, content)
+        await self.harness.conversations.on_message(message)
+
+    async def run(self) -> None:
+        harness = self.harness
+
+        # Set the profile
+        await harness.run_command("set", harness.profile_commands.set_profile_meta, self.member, None)
+
+        # Have a moderator look at it
+        async with harness.database() as db:
+            user_profile = await harness.template.fetch_profile_for_user(db, self.member.id, fetch_filled_fields=False)
+        if user_profile is None or user_profile.posted_message_id is None:
+            harness.failures += 1
+            return
+        message = harness.verification_channel.get_partial_message(user_profile.posted_message_id)
+        await asyncio.sleep(random.uniform(*harness.moderator_delay))
+        emoji = ProfileVerification.CROSS_EMOJI if self.deny else ProfileVerification.TICK_EMOJI
+        payload = simulation.RawReaction(message, random.choice(harness.moderators), emoji)
+        await harness.run_command("deny" if self.deny else "verify", harness.verification.verification_emoji_check, payload)
+
+        # And maybe edit it
+        if self.edit and not self.deny:
+            self.editing = True
+            await harness.run_command("edit", harness.profile_commands.edit_profile_meta, self.member, None)
+        harness.completed_sessions += 1
+
+
+class LoadSimulation(object):
+
+    def __init__(self, pool, *, users:int, edit_ratio:float, deny_ratio:float, moderators:int, api_latency:float, think_time:typing.Tuple[float, float], trace_memory:bool=False):
+        self.api = simulation.SimulatedAPI(latency=api_latency)
+        self.database = simulation.CountingDatabase(pool)
+        self.bot = simulation.SimulatedBot(self.api, self.database)
+        self.users: int = users
+        self.edit_ratio: float = edit_ratio
+        self.deny_ratio: float = deny_ratio
+        self.think_time: typing.Tuple[float, float] = think_time
+        self.trace_memory: bool = trace_memory
+        self.moderator_delay: typing.Tuple[float, float] = (0.0, 1.0)
+
+        # Set up the guild
+        self.guild = simulation.SimulatedGuild(self.api, simulation.next_snowflake())
+        self.guild.me = self.guild.add_member(simulation.SimulatedMember(self.api, self.guild, self.bot.user.id, "ProfileBot", bot=True))
+        self.guild.owner = self.guild.me
+        self.bot.guilds[self.guild.id] = self.guild
+        self.command_channel = self.guild.add_channel("commands")
+        self.verification_channel = self.guild.add_channel("verification", on_send=self.on_verification_message)
+        self.archive_channel = self.guild.add_channel("archive")
+        self.moderators = [
+            self.guild.add_member(simulation.SimulatedMember(self.api, self.guild, simulation.next_snowflake(), f"moderator{i}", moderator=True))
+            for i in range(moderators)
+        ]
+        self.template: typing.Optional[localutils.Template] = None
+
+        # Metrics
+        self.command_timings: typing.Dict[str, typing.List[float]] = dict()
+        self.completed_sessions: int = 0
+        self.failures: int = 0
+        self.errors: typing.List[str] = list()
+
+    def on_verification_message(self, message:simulation.SimulatedMessage) -> None:
+        """
+        Give a reason when the bot asks why a profile was denied.
+        """
+
+        if message.content == "Why was that profile denied?":
+            asyncio.ensure_future(self.give_denial_reason())
+
+    async def give_denial_reason(self) -> None:
+        await asyncio.sleep(random.uniform(*self.think_time))
+        router = self.conversations.router
+        for moderator in self.moderators:
+            if (self.verification_channel.id, moderator.id) in router.waiters:
+                message = simulation.SimulatedMessage(self.api, self.verification_channel, moderator, "Simulated denial.")
+                await self.conversations.on_message(message)
+
+    async def run_command(self, name:str, command, *args) -> None:
+        """
+        Run a command or listener, timing it and attributing its database round trips to its name.
+        """
+
+        token = simulation.current_command.set(name)
+        start = time.perf_counter()
+        try:
+            if isinstance(args[0], simulation.SimulatedMember):
+                ctx = simulation.SimulatedContext(self.bot, args[0], self.command_channel, self.template)
+                await command.callback(self.profile_commands, ctx, *args[1:])
+            else:
+                await command(*args)
+        except Exception as e:
+            self.errors.append(f"{name}: {e!r}")
+        finally:
+            simulation.current_command.reset(token)
+        self.command_timings.setdefault(name, list()).append(time.perf_counter() - start)
+
+    async def setup(self) -> None:
+        """
+        Apply the schema and make the template that everyone's filling in.
+        """
+
+        async with self.database() as db:
+            await db.conn.execute(SCHEMA_PATH.read_text())
+            await localutils.migrations.apply_migrations(db)
+            await db("INSERT INTO guild_settings (guild_id) VALUES (0) ON CONFLICT (guild_id) DO NOTHING")
+            template_id = uuid.uuid4()
+            await db(
+                """INSERT INTO template (template_id, name, colour, guild_id, verification_channel_id, archive_channel_id, max_profile_count)
+                VALUES ($1, $2, 0, $3, $4, $5, 1)""",
+                template_id, f"sim{random.randint(0, 99_999)}", self.guild.id, str(self.verification_channel.id), str(self.archive_channel.id),
+            )
+            for index, (name, field_type, prompt, _) in enumerate(FIELDS):
+                await db(
+                    """INSERT INTO field (field_id, name, index, prompt, timeout, field_type, template_id, optional, deleted)
+                    VALUES ($1, $2, $3, $4, 120, $5, $6, false, false)""",
+                    uuid.uuid4(), name, index, prompt, field_type, template_id,
+                )
+            self.template = await localutils.Template.fetch_template_by_id(db, template_id)
+
+        # Load the cogs
+        self.conversations = Conversations(self.bot)
+        self.verification = ProfileVerification(self.bot)
+        self.profile_commands = ProfileCreation(self.bot)
+        self.cache_invalidation = CacheInvalidation(self.bot)
+        for cog in (self.conversations, self.verification, self.profile_commands, self.cache_invalidation):
+            self.bot.add_cog(cog)
+        async with self.database() as db:
+            await self.verification.cache_setup(db)
+
+    async def teardown(self) -> None:
+        self.profile_commands.cog_unload()
+        async with self.database() as db:
+            await db("DELETE FROM template WHERE template_id=$1", self.template.template_id)
+
+    async def run(self) -> typing.Dict[str, typing.Any]:
+        await self.setup()
+        sessions = []
+        for _ in range(self.users):
+            member = self.guild.add_member(simulation.SimulatedMember(self.api, self.guild, simulation.next_snowflake(), "user"))
+            sessions.append(SimulatedSession(
+                self, member,
+                edit=random.random() < self.edit_ratio,
+                deny=random.random() < self.deny_ratio,
+            ))
+
+        # Let everyone loose at once
+        monitor = simulation.LoopLagMonitor()
+        monitor.start()
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*[i.run() for i in sessions])
+        finally:
+            elapsed = time.perf_counter() - start
+            peak_traced = None
+            if self.trace_memory:
+                _, peak_traced = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            monitor.stop()
+            await self.teardown()
+        return self.get_report(elapsed, monitor.samples, peak_traced)
+
+    def get_report(self, elapsed:float, lag_samples:typing.List[float], peak_traced:typing.Optional[int]) -> typing.Dict[str, typing.Any]:
+        lag_samples = sorted(lag_samples) or [0.0]
+        commands = {}
+        for name, timings in self.command_timings.items():
+            timings = sorted(timings)
+            commands[name] = {
+                "count": len(timings),
+                "p50_ms": percentile(timings, 0.5) * 1_000,
+                "p99_ms": percentile(timings, 0.99) * 1_000,
+                "db_round_trips_per_command": self.database.round_trips[name] / len(timings),
+            }
+        return {
+            "users": self.users,
+            "elapsed_s": elapsed,
+            "completed_sessions": self.completed_sessions,
+            "failed_sessions": self.failures,
+            "errors": self.errors[:20],
+            "sessions_per_s": self.completed_sessions / elapsed,
+            "commands_per_s": sum([len(i) for i in self.command_timings.values()]) / elapsed,
+            "loop_lag_ms": {
+                "p50": percentile(lag_samples, 0.5) * 1_000,
+                "p99": percentile(lag_samples, 0.99) * 1_000,
+                "max": lag_samples[-1] * 1_000,
+            },
+            "commands": commands,
+            "background_db_round_trips": self.database.round_trips["background"],
+            "db_connections_opened": self.database.connections_opened,
+            "discord_api_calls": dict(self.api.calls),
+            "peak_traced_memory_mb": peak_traced / 1_048_576 if peak_traced is not None else None,
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1_024,
+        }
+
+
+async def main(args:argparse.Namespace) -> int:
+    pool = await asyncpg.create_pool(args.dsn, min_size=1, max_size=args.pool_size)
+    try:
+        harness = LoadSimulation(
+            pool,
+            users=args.users,
+            edit_ratio=args.edit_ratio,
+            deny_ratio=args.deny_ratio,
+            moderators=args.moderators,
+            api_latency=args.api_latency,
+            think_time=(args.min_think_time, args.max_think_time),
+            trace_memory=args.trace_memory,
+        )
+        report = await harness.run()
+    finally:
+        await pool.close()
+    print(json.dumps(report, indent=4))
+    return 1 if report["errors"] or report["failed_sessions"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_simulation", description="Simulate many users setting up profiles at once.")
+    parser.add_argument("--dsn", required=True, help="The Postgres database to run against")
+    parser.add_argument("--users", type=int, default=500, help="How many users set a profile at once")
+    parser.add_argument("--edit-ratio", type=float, default=0.2, help="The fraction of users who edit their profile after it's verified")
+    parser.add_argument("--deny-ratio", type=float, default=0.1, help="The fraction of profiles that moderators deny")
+    parser.add_argument("--moderators", type=int, default=3, help="How many moderators are reacting to submissions")
+    parser.add_argument("--pool-size", type=int, default=10, help="The size of the database connection pool")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="The simulated latency of each Discord API call, in seconds")
+    parser.add_argument("--min-think-time", type=float, default=0.5, help="The shortest time a user takes to answer a prompt, in seconds")
+    parser.add_argument("--max-think-time", type=float, default=3.0, help="The longest time a user takes to answer a prompt, in seconds")
+    parser.add_argument("--trace-memory", action="store_true", help="Trace Python allocations for a more precise peak (slows the simulation down)")
+    sys.exit(asyncio.get_event_loop().run_until_complete(main(parser.parse_args())))
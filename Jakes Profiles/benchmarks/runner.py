@@ -0,0 +1,168 @@
+"""
+Timing, allocation measurement and baseline comparison for the benchmarks.
+"""
+
+import gc
+import json
+import pathlib
+import platform
+import time
+import tracemalloc
+import typing
+
+
+BASELINE_DIRECTORY = pathlib.Path(__file__).resolve().parent / "baselines"
+
+
+class Benchmark(object):
+    """
+    A single operation to be timed.
+
+    Args:
+        name (str): The name of the benchmark, as it's stored in the baseline.
+        func (typing.Callable[[], typing.Any]): The operation being measured.
+        iterations (int): How many times to time the operation.
+    """
+
+    __slots__ = ("name", "func", "iterations")
+
+    def __init__(self, name:str, func:typing.Callable[[], typing.Any], iterations:int=1_000):
+        self.name: str = name
+        self.func: typing.Callable[[], typing.Any] = func
+        self.iterations: int = iterations
+
+
+BENCHMARKS: typing.List[Benchmark] = list()
+
+
+def register(name:str, *, iterations:int=1_000):
+    """
+    Register a zero-argument function as a benchmark.
+    """
+
+    def inner(func):
+        BENCHMARKS.append(Benchmark(name, func, iterations))
+        return func
+    return inner
+
+
+def percentile(sorted_values:typing.List[float], fraction:float) -> float:
+    """
+    Get a percentile of some already sorted values by nearest rank.
+    """
+
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_benchmark(benchmark:Benchmark, *, iterations:int=None, warmup:int=20) -> typing.Dict[str, float]:
+    """
+    Time a benchmark and measure how much it allocates per call.
+
+    Timing and allocation are measured in separate passes, since tracing allocations slows every call down.
+
+    Returns:
+        typing.Dict[str, float]: Latency percentiles in microseconds, and the peak and retained bytes allocated per call.
+    """
+
+    iterations = iterations or benchmark.iterations
+    func = benchmark.func
+    for _ in range(warmup):
+        func()
+
+    # Time each call
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter_ns()
+            func()
+            timings.append((time.perf_counter_ns() - start) / 1_000)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    timings.sort()
+
+    # Measure allocations
+    allocation_iterations = min(iterations, 100)
+    peaks = []
+    tracemalloc.start()
+    try:
+        retained_before, _ = tracemalloc.get_traced_memory()
+        results = []
+        for _ in range(allocation_iterations):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            results.append(func())
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - current)
+        retained_after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del results
+    peaks.sort()
+
+    return {
+        "iterations": iterations,
+        "mean_us": sum(timings) / len(timings),
+        "p50_us": percentile(timings, 0.5),
+        "p90_us": percentile(timings, 0.9),
+        "p99_us": percentile(timings, 0.99),
+        "max_us": timings[-1],
+        "alloc_peak_bytes": percentile(peaks, 0.5),
+        "alloc_retained_bytes": (retained_after - retained_before) / allocation_iterations,
+    }
+
+
+def get_default_baseline_path() -> pathlib.Path:
+    """
+    Baselines are only comparable on the same interpreter and machine, so they're stored per platform.
+    """
+
+    name = f"{platform.system()}-{platform.machine()}-{platform.python_implementation()}{platform.python_version()}".lower()
+    return BASELINE_DIRECTORY / f"{name}.json"
+
+
+def load_baseline(path:pathlib.Path) -> typing.Optional[typing.Dict[str, typing.Dict[str, float]]]:
+    if not path.exists():
+        return None
+    with open(path) as a:
+        return json.load(a)["results"]
+
+
+def save_baseline(path:pathlib.Path, results:typing.Dict[str, typing.Dict[str, float]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w") as a:
+        json.dump(data, a, indent=4, sort_keys=True)
+
+
+def find_regressions(
+        results:typing.Dict[str, typing.Dict[str, float]],
+        baseline:typing.Dict[str, typing.Dict[str, float]],
+        *,
+        time_tolerance:float=0.25,
+        memory_tolerance:float=0.10,
+        ) -> typing.List[str]:
+    """
+    Compare some results against a baseline, returning a description of each regression.
+    Latency is compared on the median and p90, and memory on the peak allocation per call.
+    """
+
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for key in ("p50_us", "p90_us"):
+            if result[key] > previous[key] * (1 + time_tolerance):
+                regressions.append(f"{name}: {key} went from {previous[key]:.2f} to {result[key]:.2f}")
+        allowed_memory = previous["alloc_peak_bytes"] * (1 + memory_tolerance) + 64
+        if result["alloc_peak_bytes"] > allowed_memory:
+            regressions.append(f"{name}: alloc_peak_bytes went from {previous['alloc_peak_bytes']:.0f} to {result['alloc_peak_bytes']:.0f}")
+    return regressions
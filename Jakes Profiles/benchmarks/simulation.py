@@ -0,0 +1,442 @@
+"""
+A simulated bot, Discord API and database connection, for driving the cogs without a gateway.
+
+Every Discord API call sleeps for a configurable latency so that the cogs interleave the way they
+would against the real API, and every database round trip is counted against the command that
+issued it.
+"""
+
+import asyncio
+import collections
+import contextvars
+import itertools
+import logging
+import random
+import typing
+
+import discord
+
+
+# The name of the command that the current task is running, for attributing database round trips
+current_command: contextvars.ContextVar[str] = contextvars.ContextVar("current_command", default="background")
+
+_snowflakes = itertools.count(800_000_000_000_000_000)
+
+
+def next_snowflake() -> int:
+    return next(_snowflakes)
+
+
+class SimulatedAPI(object):
+    """
+    Stands in for the Discord HTTP API, sleeping for a random latency on each call and counting them.
+    """
+
+    def __init__(self, latency:float=0.02, jitter:float=0.01):
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.calls: typing.Counter[str] = collections.Counter()
+
+    async def request(self, route:str) -> None:
+        self.calls[route] += 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# Database
+
+class _TransactionProxy(object):
+
+    def __init__(self, connection:'CountingConnection', transaction):
+        self.connection = connection
+        self.transaction = transaction
+
+    async def __aenter__(self):
+        self.connection.count()
+        return await self.transaction.__aenter__()
+
+    async def __aexit__(self, *args):
+        self.connection.count()
+        return await self.transaction.__aexit__(*args)
+
+
+class _ConnectionProxy(object):
+    """
+    Wraps an asyncpg connection so that statements run on it directly are counted too.
+    """
+
+    def __init__(self, connection:'CountingConnection', conn):
+        self._connection = connection
+        self._conn = conn
+
+    def transaction(self, *args, **kwargs):
+        return _TransactionProxy(self._connection, self._conn.transaction(*args, **kwargs))
+
+    async def execute(self, *args, **kwargs):
+        self._connection.count()
+        return await self._conn.execute(*args, **kwargs)
+
+    def cursor(self, *args, **kwargs):
+        self._connection.count()
+        return self._conn.cursor(*args, **kwargs)
+
+    def __getattr__(self, item):
+        return getattr(self._conn, item)
+
+
+class CountingConnection(object):
+    """
+    A stand-in for the bot's `DatabaseConnection` that counts each round trip against the current command.
+    """
+
+    def __init__(self, database:'CountingDatabase', conn):
+        self.database = database
+        self.conn = _ConnectionProxy(self, conn)
+        self._raw_conn = conn
+
+    def count(self) -> None:
+        self.database.round_trips[current_command.get()] += 1
+
+    async def __call__(self, sql:str, *args):
+        self.count()
+        return await self._raw_conn.fetch(sql, *args)
+
+
+class CountingDatabase(object):
+    """
+    Hands out counted connections from an asyncpg pool, in the same shape as `bot.database()`.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.round_trips: typing.Counter[str] = collections.Counter()
+        self.connections_opened: int = 0
+
+    def __call__(self) -> '_AcquireContext':
+        return _AcquireContext(self)
+
+
+class _AcquireContext(object):
+
+    def __init__(self, database:CountingDatabase):
+        self.database = database
+        self.conn = None
+
+    async def __aenter__(self) -> CountingConnection:
+        self.conn = await self.database.pool.acquire()
+        self.database.connections_opened += 1
+        return CountingConnection(self.database, self.conn)
+
+    async def __aexit__(self, *args):
+        await self.database.pool.release(self.conn)
+
+
+# Discord objects
+
+class SimulatedUser(object):
+
+    def __init__(self, user_id:int, name:str, *, bot:bool=False):
+        self.id: int = user_id
+        self.name: str = name
+        self.discriminator: str = "0001"
+        self.bot: bool = bot
+        self.avatar = None
+
+    def __str__(self):
+        return f"{self.name}#{self.discriminator}"
+
+
+class SimulatedMessage(object):
+
+    def __init__(self, api:SimulatedAPI, channel:'SimulatedChannel', author, content:str=None, embed:discord.Embed=None):
+        self.api = api
+        self.id: int = next_snowflake()
+        self.channel = channel
+        self.author = author
+        self.content: str = content or ""
+        self.embeds: typing.List[discord.Embed] = [embed] if embed else []
+        self.attachments: list = []
+        self.guild = getattr(channel, "guild", None)
+        self.reactions: typing.List[str] = []
+
+    async def add_reaction(self, emoji) -> None:
+        await self.api.request("add_reaction")
+        self.reactions.append(str(emoji))
+
+    async def edit(self, *, content:str=None, embed:discord.Embed=None) -> None:
+        await self.api.request("edit_message")
+        if self.id not in self.channel.messages:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Message")
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embeds = [embed]
+
+    async def delete(self) -> None:
+        await self.api.request("delete_message")
+        self.channel.messages.pop(self.id, None)
+
+
+class SimulatedChannel(object):
+    """
+    A text or DM channel. Anything sent is stored, and handed to `on_send` so that simulated users can respond.
+    """
+
+    def __init__(self, api:SimulatedAPI, *, guild:'SimulatedGuild'=None, name:str="channel", on_send:typing.Callable=None):
+        self.api = api
+        self.id: int = next_snowflake()
+        self.guild = guild
+        self.name: str = name
+        self.messages: typing.Dict[int, SimulatedMessage] = dict()
+        self.on_send: typing.Optional[typing.Callable[[SimulatedMessage], None]] = on_send
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    async def send(self, content:str=None, *, embed:discord.Embed=None, author=None, **kwargs) -> SimulatedMessage:
+        await self.api.request("send_message")
+        message = SimulatedMessage(self.api, self, author, content, embed)
+        self.messages[message.id] = message
+        if self.on_send is not None:
+            self.on_send(message)
+        return message
+
+    def get_partial_message(self, message_id:int) -> SimulatedMessage:
+        message = self.messages.get(message_id)
+        if message is None:
+            message = SimulatedMessage(self.api, self, None)
+            message.id = message_id
+        return message
+
+    async def fetch_message(self, message_id:int) -> SimulatedMessage:
+        await self.api.request("fetch_message")
+        try:
+            return self.messages[message_id]
+        except KeyError:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Message")
+
+    def permissions_for(self, member) -> discord.Permissions:
+        return discord.Permissions.all()
+
+    async def purge(self, *, check:typing.Callable=None, bulk:bool=True, **kwargs) -> typing.List[SimulatedMessage]:
+        await self.api.request("purge")
+        deleted = [i for i in self.messages.values() if check is None or check(i)]
+        for message in deleted:
+            self.messages.pop(message.id, None)
+        return deleted
+
+
+class _FakeResponse(object):
+
+    def __init__(self, status:int):
+        self.status = status
+        self.reason = "Simulated"
+
+
+class SimulatedMember(discord.Member):
+    """
+    A `discord.Member` with no connection state, whose DMs go to a simulated channel.
+    """
+
+    def __init__(self, api:SimulatedAPI, guild:'SimulatedGuild', user_id:int, name:str, *, moderator:bool=False, bot:bool=False):
+        self._user = SimulatedUser(user_id, name, bot=bot)
+        self._roles = discord.utils.SnowflakeList([])
+        self._state = None
+        self.guild = guild
+        self.nick = None
+        self.activities = tuple()
+        self.joined_at = None
+        self.premium_since = None
+        self.moderator: bool = moderator
+        self.simulated_dm_channel = SimulatedChannel(api, name=f"dm-{user_id}")
+        self.simulated_api = api
+
+    @property
+    def dm_channel(self) -> SimulatedChannel:
+        return self.simulated_dm_channel
+
+    async def create_dm(self) -> SimulatedChannel:
+        return self.simulated_dm_channel
+
+    async def send(self, content:str=None, *, embed:discord.Embed=None, **kwargs) -> SimulatedMessage:
+        return await self.simulated_dm_channel.send(content, embed=embed, author=self.guild.me)
+
+    @property
+    def guild_permissions(self) -> discord.Permissions:
+        return discord.Permissions(manage_roles=self.moderator)
+
+    def permissions_in(self, channel) -> discord.Permissions:
+        return discord.Permissions.all() if self.moderator else discord.Permissions.text()
+
+    async def add_roles(self, *roles, **kwargs) -> None:
+        await self.simulated_api.request("add_roles")
+
+
+class SimulatedRole(object):
+
+    def __init__(self, role_id:int):
+        self.id: int = role_id
+
+
+class SimulatedGuild(object):
+
+    def __init__(self, api:SimulatedAPI, guild_id:int, name:str="Simulated Guild"):
+        self.api = api
+        self.id: int = guild_id
+        self.name: str = name
+        self.members: typing.Dict[int, SimulatedMember] = dict()
+        self.channels: typing.Dict[int, SimulatedChannel] = dict()
+        self.me: typing.Optional[SimulatedMember] = None
+        self.owner: typing.Optional[SimulatedMember] = None
+
+    def add_member(self, member:SimulatedMember) -> SimulatedMember:
+        self.members[member.id] = member
+        return member
+
+    def add_channel(self, name:str, **kwargs) -> SimulatedChannel:
+        channel = SimulatedChannel(self.api, guild=self, name=name, **kwargs)
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_member(self, user_id:int) -> typing.Optional[SimulatedMember]:
+        return self.members.get(user_id)
+
+    async def fetch_member(self, user_id:int) -> SimulatedMember:
+        await self.api.request("fetch_member")
+        try:
+            return self.members[user_id]
+        except KeyError:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Member")
+
+    def get_role(self, role_id:int) -> SimulatedRole:
+        return SimulatedRole(role_id)
+
+
+class SimulatedContext(object):
+    """
+    Enough of a `utils.Context` to invoke the profile meta commands directly.
+    """
+
+    def __init__(self, bot:'SimulatedBot', author:SimulatedMember, channel:SimulatedChannel, template=None):
+        self.bot = bot
+        self.author: SimulatedMember = author
+        self.guild: SimulatedGuild = channel.guild
+        self.channel: SimulatedChannel = channel
+        self.template = template
+        self.prefix: str = "!"
+        self.clean_prefix: str = "!"
+        self.invoke_meta: bool = True
+
+    async def send(self, content:str=None, **kwargs) -> SimulatedMessage:
+        return await self.channel.send(content, author=self.guild.me, **kwargs)
+
+
+class SimulatedHTTP(object):
+    """
+    The raw API routes that the cogs call directly through `bot.http`.
+    """
+
+    def __init__(self, bot:'SimulatedBot'):
+        self.bot = bot
+
+    async def delete_message(self, channel_id:int, message_id:int, **kwargs) -> None:
+        await self.bot.api.request("delete_message")
+        channel = self.bot.get_channel(channel_id)
+        if channel is None or channel.messages.pop(message_id, None) is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Message")
+
+
+class SimulatedBot(object):
+    """
+    The parts of `utils.Bot` that the profile cogs use.
+    """
+
+    def __init__(self, api:SimulatedAPI, database:CountingDatabase):
+        self.api = api
+        self.database = database
+        self.config = {"owners": [], "embed": {"enabled": False}, "redis": {"enabled": False}}
+        self.logger = logging.getLogger("profilebot.simulation")
+        self.loop = asyncio.get_event_loop()
+        self.user = SimulatedUser(1, "ProfileBot", bot=True)
+        self.guilds: typing.Dict[int, SimulatedGuild] = dict()
+        self.cogs: typing.Dict[str, typing.Any] = dict()
+        self.redis = None
+        self.http = SimulatedHTTP(self)
+
+    def add_cog(self, cog) -> None:
+        self.cogs[cog.__class__.__name__] = cog
+
+    def get_cog(self, name:str):
+        return self.cogs.get(name)
+
+    def get_guild(self, guild_id:int) -> typing.Optional[SimulatedGuild]:
+        return self.guilds.get(guild_id)
+
+    async def fetch_guild(self, guild_id:int) -> SimulatedGuild:
+        await self.api.request("fetch_guild")
+        return self.guilds[guild_id]
+
+    def get_channel(self, channel_id:int) -> typing.Optional[SimulatedChannel]:
+        for guild in self.guilds.values():
+            channel = guild.channels.get(channel_id)
+            if channel is not None:
+                return channel
+        return None
+
+    async def fetch_channel(self, channel_id:int) -> SimulatedChannel:
+        await self.api.request("fetch_channel")
+        channel = self.get_channel(channel_id)
+        if channel is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Channel")
+        return channel
+
+    def set_footer_from_config(self, embed:discord.Embed) -> None:
+        pass
+
+    async def wait_until_ready(self) -> None:
+        pass
+
+    def dispatch(self, event:str, *args) -> None:
+        pass
+
+
+class RawReaction(object):
+    """
+    The fields of `discord.RawReactionActionEvent` that verification reads.
+    """
+
+    def __init__(self, message:SimulatedMessage, member:SimulatedMember, emoji:str):
+        self.message_id: int = message.id
+        self.channel_id: int = message.channel.id
+        self.guild_id: int = member.guild.id
+        self.user_id: int = member.id
+        self.member: SimulatedMember = member
+        name, emoji_id = emoji.strip("<>").split(":")[-2:]
+        self.emoji: discord.PartialEmoji = discord.PartialEmoji(name=name, id=int(emoji_id))
+
+
+class LoopLagMonitor(object):
+    """
+    Measures event loop lag by seeing how late a regularly scheduled sleep wakes up.
+    """
+
+    def __init__(self, interval:float=0.01):
+        self.interval: float = interval
+        self.samples: typing.List[float] = list()
+        self.task: typing.Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - expected, 0))
+
+    def start(self) -> None:
+        self.task = asyncio.ensure_future(self.run())
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
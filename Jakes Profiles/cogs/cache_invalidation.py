@@ -0,0 +1,83 @@
+import uuid
+
+import voxelbotutils as utils
+
+from cogs import utils as localutils
+
+
+class CacheInvalidation(utils.Cog):
+    """
+    Keeps the in-memory caches of every shard process in step with each other.
+    Anything that writes to a cached entity should go through the invalidate methods here rather than
+    evicting the entity from the local caches directly.
+    """
+
+    def __init__(self, bot:utils.Bot):
+        super().__init__(bot)
+        self.bus = localutils.invalidation.InvalidationBus.from_bot(bot)
+        self.bus.register("template", self.evict_template)
+        self.bus.register("template_name", self.evict_template_name)
+        self.bus.register("guild_settings", self.evict_guild_settings)
+        self.bus.register("profile", self.evict_profile)
+
+    @utils.redis_channel_handler(localutils.invalidation.InvalidationBus.CHANNEL)
+    async def handle_invalidation(self, payload:dict):
+        self.bus.receive(payload)
+
+    # Evicting entities from this process
+
+    @staticmethod
+    def evict_template(template_id:str):
+        localutils.UserProfile.embed_cache.invalidate_template(uuid.UUID(template_id))
+
+    @staticmethod
+    def evict_template_name(entity_id:list):
+        guild_id, template_name = entity_id
+        localutils.Template.invalidate_name_cache(guild_id, template_name)
+
+    @staticmethod
+    def evict_guild_settings(guild_id:int):
+        localutils.GuildSettings.invalidate(guild_id)
+
+    @staticmethod
+    def evict_profile(entity_id:list):
+        template_id, user_id, name = entity_id
+        localutils.UserProfile.embed_cache.invalidate_profile(uuid.UUID(template_id), user_id, name)
+
+    # Invalidating entities everywhere
+
+    async def invalidate_template(self, template_id:uuid.UUID):
+        """
+        Evict the rendered embeds of every profile of a template, eg after its fields have been changed.
+        """
+
+        await self.bus.publish("template", str(template_id))
+
+    async def invalidate_template_names(self, guild_id:int, *template_names:str):
+        """
+        Evict template names from the name cache, eg after a template has been created, renamed, or deleted.
+        """
+
+        for name in template_names:
+            if name is None:
+                continue
+            await self.bus.publish("template_name", [guild_id, name.lower()])
+
+    async def invalidate_guild_settings(self, guild_id:int):
+        """
+        Evict the cached settings for a guild; guild 0 evicts every guild, since they all fall back to its row.
+        """
+
+        await self.bus.publish("guild_settings", guild_id)
+
+    async def invalidate_profile(self, template_id:uuid.UUID, user_id:int, name:str):
+        """
+        Evict the rendered embeds of a profile, eg after it's been saved or deleted.
+        """
+
+        await self.bus.publish("profile", [str(template_id), user_id, name])
+
+
+def setup(bot:utils.Bot):
+    x = CacheInvalidation(bot)
+    bot.add_cog(x)
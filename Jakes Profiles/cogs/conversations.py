@@ -0,0 +1,65 @@
+import typing
+
+import discord
+import voxelbotutils as utils
+
+from cogs import utils as localutils
+
+
+class Conversations(utils.Cog):
+
+    def __init__(self, bot:utils.Bot):
+        super().__init__(bot)
+        self.router = localutils.ConversationRouter()
+
+    @utils.Cog.listener()
+    async def on_message(self, message:discord.Message):
+        """
+        Hand incoming messages over to any conversation that's waiting on them.
+        """
+
+        self.router.dispatch(message)
+
+    async def wait_for_message(self, channel:discord.abc.Snowflake, author:discord.abc.Snowflake, *, timeout:float, check:typing.Callable[[discord.Message], bool]=None) -> discord.Message:
+        """
+        Wait for the next message from the given author in the given channel.
+
+        Args:
+            channel (discord.abc.Snowflake): The channel to wait for a message in.
+            author (discord.abc.Snowflake): The user to wait for a message from.
+            timeout (float): How long to wait for the message, in seconds.
+            check (typing.Callable[[discord.Message], bool], optional): An additional check that the message must pass.
+
+        Returns:
+            discord.Message: The message that was sent.
+
+        Raises:
+            asyncio.TimeoutError: No message was received before the timeout.
+        """
+
+        localutils.database_instrumentation.warn_if_connection_held("wait_for_message")
+        return await self.router.wait_for_message(channel.id, author.id, timeout=timeout, check=check)
+
+    async def wait_for_dm(self, user:discord.User, *, timeout:float, check:typing.Callable[[discord.Message], bool]=None) -> discord.Message:
+        """
+        Wait for the next message that the given user sends in their DMs with the bot.
+
+        Args:
+            user (discord.User): The user to wait for a message from.
+            timeout (float): How long to wait for the message, in seconds.
+            check (typing.Callable[[discord.Message], bool], optional): An additional check that the message must pass.
+
+        Returns:
+            discord.Message: The message that was sent.
+
+        Raises:
+            asyncio.TimeoutError: No message was received before the timeout.
+        """
+
+        channel = user.dm_channel or await user.create_dm()
+        return await self.wait_for_message(channel, user, timeout=timeout, check=check)
+
+
+def setup(bot:utils.Bot):
+    x = Conversations(bot)
+    bot.add_cog(x)
@@ -0,0 +1,88 @@
+from discord.ext import tasks
+import voxelbotutils as utils
+
+from cogs import utils as localutils
+
+
+class DatabaseInstrumentation(utils.Cog):
+
+    def __init__(self, bot:utils.Bot):
+        super().__init__(bot)
+        config = bot.config.get("database_instrumentation", {})
+        self.enabled: bool = config.get("enabled", True)
+        self.recorder = localutils.database_instrumentation.QueryRecorder(
+            slow_query_threshold=config.get("slow_query_threshold", 250),
+            explain_slow_queries=config.get("explain_slow_queries", False),
+            explain_cooldown=config.get("explain_cooldown", 600),
+            long_hold_threshold=config.get("long_hold_threshold", 1_000),
+        )
+        self.original_database = bot.database
+        if self.enabled:
+            bot.database = localutils.database_instrumentation.InstrumentedDatabase(self.original_database, self.recorder)
+            self.watch_blocking_calls()
+            self.flush_query_stats.change_interval(seconds=config.get("flush_interval", 10))
+            self.flush_query_stats.start()
+
+    def cog_unload(self):
+        if self.enabled:
+            self.bot.database = self.original_database
+            self.unwatch_blocking_calls()
+            self.flush_query_stats.cancel()
+            self.bot.loop.create_task(self.flush())
+
+    def watch_blocking_calls(self):
+        """
+        Wrap the bot's HTTP requests and event waits so that they warn if they're made while a database connection is held.
+        """
+
+        original_request = self.bot.http.request
+        original_wait_for = self.bot.wait_for
+
+        async def request(route, *args, **kwargs):
+            localutils.database_instrumentation.warn_if_connection_held(f"Discord API {route.method} {route.path}")
+            return await original_request(route, *args, **kwargs)
+
+        def wait_for(event, *args, **kwargs):
+            localutils.database_instrumentation.warn_if_connection_held(f"wait_for('{event}')")
+            return original_wait_for(event, *args, **kwargs)
+
+        self.bot.http.request = request
+        self.bot.wait_for = wait_for
+
+    def unwatch_blocking_calls(self):
+        for obj, attr in [(self.bot.http, "request"), (self.bot, "wait_for")]:
+            try:
+                delattr(obj, attr)
+            except AttributeError:
+                pass
+
+    @tasks.loop(seconds=10)
+    async def flush_query_stats(self):
+        await self.flush()
+
+    async def flush(self):
+        """
+        Send the collected query timings, row counts and connection hold times over to statsd.
+        """
+
+        samples = self.recorder.pop_samples()
+        hold_samples = self.recorder.pop_hold_samples()
+        dropped, self.recorder.dropped_samples = self.recorder.dropped_samples, 0
+        if not samples and not hold_samples and not dropped:
+            return
+        async with self.bot.stats() as stats:
+            for site, site_samples in samples.items():
+                tags = {"site": site}
+                for duration, rows in site_samples:
+                    stats.histogram("profilebot.database.query.latency", value=duration, tags=tags)
+                    stats.histogram("profilebot.database.query.rows", value=rows, tags=tags)
+            for site, site_samples in hold_samples.items():
+                for duration in site_samples:
+                    stats.histogram("profilebot.database.connection.hold_time", value=duration, tags={"site": site})
+            if dropped:
+                stats.increment("profilebot.database.query.dropped_samples", value=dropped)
+
+
+def setup(bot:utils.Bot):
+    x = DatabaseInstrumentation(bot)
+    bot.add_cog(x)
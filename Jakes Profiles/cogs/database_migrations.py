@@ -0,0 +1,33 @@
+from discord.ext import commands
+import voxelbotutils as utils
+
+from cogs import utils as localutils
+
+
+class DatabaseMigrations(utils.Cog):
+
+    async def cache_setup(self, db):
+        """
+        Apply any outstanding database migrations on startup.
+        """
+
+        await localutils.migrations.ensure_migrations_applied(db)
+
+    @utils.command(hidden=True)
+    @commands.is_owner()
+    @commands.bot_has_permissions(send_messages=True)
+    async def checkqueryplans(self, ctx:utils.Context):
+        """
+        Make sure none of the bot's queries perform a sequential scan.
+        """
+
+        async with self.bot.database() as db:
+            failures = await localutils.migrations.check_query_plans(db)
+        if not failures:
+            return await ctx.send(f"All {len(localutils.migrations.QUERY_PLAN_CHECKS)} checked queries use indexes.")
+        return await ctx.send('\n'.join([f"Sequential scan in `{site}` on {', '.join(relations)}." for site, relations in failures.items()]))
+
+
+def setup(bot:utils.Bot):
+    x = DatabaseMigrations(bot)
+    bot.add_cog(x)
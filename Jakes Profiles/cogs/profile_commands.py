@@ -1,12 +1,12 @@
 import asyncio
+import datetime
 import re
 import typing
 import uuid
-import collections
 import string
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import voxelbotutils as utils
 import asyncpg
 
@@ -19,13 +19,33 @@ class ProfileCreation(utils.Cog):
     CROSS_EMOJI = "<:cross_no:596096897769275402>"
 
     COMMAND_REGEX = re.compile(
-        r"^(?P<command>set|get|delete|edit)(?P<template>\S{1,30})( .*)?$",
+        r"^(?P<command>set|get|delete|edit|resume)(?P<template>\S{1,30})( .*)?$",
         re.IGNORECASE
     )
 
+    DRAFT_MAX_AGE = datetime.timedelta(days=7)
+
     def __init__(self, bot:utils.Bot):
         super().__init__(bot)
-        self.set_profile_locks: typing.Dict[int, asyncio.Lock] = collections.defaultdict(asyncio.Lock)
+        self.set_profile_locks = localutils.locks.KeyedLock.from_bot("set_profile", bot)  # user_id
+        self.profile_update_locks = localutils.locks.KeyedLock.from_bot("profile_update", bot)  # (template_id, user_id, name)
+        self.draft_cleanup_loop.start()
+
+    def cog_unload(self):
+        self.draft_cleanup_loop.cancel()
+
+    @tasks.loop(hours=1)
+    async def draft_cleanup_loop(self):
+        """
+        Remove any profile drafts that haven't been touched in a while.
+        """
+
+        async with self.bot.database() as db:
+            await localutils.ProfileDraft.delete_expired(db, self.DRAFT_MAX_AGE)
+
+    @draft_cleanup_loop.before_loop
+    async def before_draft_cleanup_loop(self):
+        await self.bot.wait_until_ready()
 
     @utils.Cog.listener()
     async def on_command_error(self, ctx:utils.Context, error:commands.CommandError):
@@ -41,7 +61,7 @@ class ProfileCreation(utils.Cog):
         matches = self.COMMAND_REGEX.search(ctx.message.content[len(ctx.prefix):])
         if not matches:
             return
-        command_operator = matches.group("command")  # get/get/delete/edit
+        command_operator = matches.group("command")  # get/get/delete/edit/resume
         template_name = matches.group("template")  # template name
 
         # Filter out DMs
@@ -49,8 +69,10 @@ class ProfileCreation(utils.Cog):
             return  # Fail silently on DM invocation
 
         # Find the template they asked for on their server
-        async with self.bot.database() as db:
-            template = await localutils.Template.fetch_template_by_name(db, ctx.guild.id, template_name, fetch_fields=False)
+        template = localutils.Template.get_cached_template_by_name(ctx.guild.id, template_name)
+        if template is localutils.cache.TimedLRUCache.MISSING:
+            async with self.bot.database() as db:
+                template = await localutils.Template.fetch_template_by_name(db, ctx.guild.id, template_name, fetch_fields=False)
         if not template:
             self.logger.info(f"Failed at getting template '{template_name}' in guild {ctx.guild.id}")
             return  # Fail silently on template doesn't exist
@@ -66,6 +88,28 @@ class ProfileCreation(utils.Cog):
         except (commands.CommandInvokeError, commands.CommandError) as e:
             self.bot.dispatch("command_error", ctx, e)  # Throw any errors we get in this command into its own error handler
 
+    @utils.command(hidden=True)
+    @commands.is_owner()
+    @commands.bot_has_permissions(send_messages=True)
+    async def lockstats(self, ctx:utils.Context):
+        """
+        Shows how many setup and template editing locks are held and how contended they've been.
+        """
+
+        lock_sets = [self.set_profile_locks]
+        template_cog = self.bot.get_cog("ProfileTemplates")
+        if template_cog:
+            lock_sets.append(template_cog.template_editing_locks)
+        lines = []
+        for lock_set in lock_sets:
+            stats = lock_set.stats()
+            lines.append(
+                f"**{lock_set.name}** - {stats['keys']} keys, {stats['held']} held, {stats['waiting']} waiting; "
+                f"{stats['contended_acquisitions']}/{stats['acquisitions']} acquisitions contended "
+                f"({stats['total_wait_time']:.2f}s total wait){' (Redis)' if lock_set.redis else ''}"
+            )
+        return await ctx.send('\n'.join(lines))
+
     @utils.command(hidden=True)
     @commands.bot_has_permissions(send_messages=True)
     @commands.guild_only()
@@ -80,7 +124,7 @@ class ProfileCreation(utils.Cog):
         template: localutils.Template = ctx.template
 
         # See if the user is already setting up a profile
-        if self.set_profile_locks[ctx.author.id].locked():
+        if await self.set_profile_locks.locked(ctx.author.id):
             return await ctx.send("You're already setting up a profile.")
 
         # Only mods can see other people's profiles
@@ -91,14 +135,8 @@ class ProfileCreation(utils.Cog):
         async with self.bot.database() as db:
             await template.fetch_fields(db)
             user_profiles: typing.List[localutils.UserProfile] = await template.fetch_all_profiles_for_user(db, target_user.id)
-        if template.max_profile_count == 0:
-            await ctx.send(f"Currently the template **{template.name}** is not accepting any more applications.")
-            return
-        if len(user_profiles) >= template.max_profile_count:
-            if target_user == ctx.author:
-                await ctx.send(f"You're already at the maximum number of profiles set for **{template.name}**.")
-            else:
-                await ctx.send(f"{target_user.mention} is already at the maximum number of profiles set up for **{template.name}**.")
+            existing_draft = await localutils.ProfileDraft.fetch(db, target_user.id, template.template_id)
+        if not await self.check_profile_count(ctx, template, target_user, user_profiles):
             return
 
         # See if you we can send them the PM
@@ -107,12 +145,14 @@ class ProfileCreation(utils.Cog):
                 await ctx.author.send(f"Now talking you through setting up your **{template.name}** profile.")
             else:
                 await ctx.author.send(f"Now talking you through setting up {target_user.mention}'s **{template.name}** profile.", allowed_mentions=discord.AllowedMentions(users=False))
+            if existing_draft:
+                await ctx.author.send(f"You also have an unfinished profile called **{existing_draft.name}** - this will replace it, but you can run `resume{template.name.lower()}` on your server instead to carry on from where you left off.")
             await ctx.send("Sent you a DM!")
         except discord.Forbidden:
             return await ctx.send("I'm unable to send you DMs to set up the profile :/")
 
         # Drag the user into the create profile lock
-        async with self.set_profile_locks[ctx.author.id]:
+        async with self.set_profile_locks(ctx.author.id):
 
             # See if we need to ask for a name
             if template.max_profile_count == 1:
@@ -130,10 +170,7 @@ class ProfileCreation(utils.Cog):
                 await ctx.author.send(f"What name would you like to give this profile? This will be used to get the profile information (eg for the name \"test\", you could run `get{template.name.lower()} test`).")
                 while True:
                     try:
-                        user_message = await self.bot.wait_for(
-                            "message", timeout=120,
-                            check=lambda m: m.author == ctx.author and isinstance(m.channel, discord.DMChannel)
-                        )
+                        user_message = await self.bot.get_cog("Conversations").wait_for_dm(ctx.author, timeout=120)
                     except asyncio.TimeoutError:
                         try:
                             return await ctx.author.send(f"Your input for this field has timed out. Please try running `set{template.name}` on your server again.")
@@ -160,109 +197,209 @@ class ProfileCreation(utils.Cog):
                     except localutils.errors.FieldCheckFailure as e:
                         await ctx.author.send(e.message)
 
+            # Start a draft so they can pick this back up later
+            draft = localutils.ProfileDraft(target_user.id, template.template_id, name_content)
+            draft.checkpoint(self.bot.database)
+
             # Talk the user through each field
-            filled_field_dict = {}
-            for field in sorted(template.fields.values(), key=lambda x: x.index):
+            filled_field_dict = await self.talk_through_fields(ctx, template, target_user, draft)
+            if filled_field_dict is None:
+                return
 
-                # See if it's a command
-                if localutils.CommandProcessor.COMMAND_REGEX.search(field.prompt):
-                    filled_field_dict[field.field_id] = localutils.FilledField(
-                        user_id=target_user.id,
-                        name=name_content,
-                        field_id=field.field_id,
-                        value="Could not get field information",
-                        field=field,
-                    )
-                    continue
+        # And save
+        await self.finish_profile_setup(ctx, template, target_user, draft, filled_field_dict)
 
-                # Send the user the prompt
-                if field.optional:
-                    await ctx.author.send(f"{field.prompt.rstrip('.')}. Type **pass** to skip this field.")
-                else:
-                    await ctx.author.send(field.prompt)
+    @utils.command(hidden=True)
+    @commands.bot_has_permissions(send_messages=True)
+    @commands.guild_only()
+    @utils.checks.meta_command()
+    async def resume_profile_meta(self, ctx:utils.Context, target_user:typing.Optional[discord.Member]):
+        """
+        Talks a user through the rest of a profile that they didn't finish setting up.
+        """
 
-                # Get user input
-                while True:
-                    try:
-                        user_message = await self.bot.wait_for(
-                            "message", timeout=field.timeout,
-                            check=lambda m: m.author == ctx.author and isinstance(m.channel, discord.DMChannel)
-                        )
-                    except asyncio.TimeoutError:
-                        try:
-                            return await ctx.author.send(f"Your input for this field has timed out. Running `set{template.name}` on your server again to go back through this setup.")
-                        except discord.Forbidden:
-                            return
-                    try:
-                        if user_message.content.lower() == 'pass' and field.optional:
-                            field_content = None
-                        else:
-                            field_content = field.field_type.get_from_message(user_message)
-                        break
-                    except localutils.errors.FieldCheckFailure as e:
-                        await ctx.author.send(e.message)
+        # Set up some variables
+        target_user: discord.Member = target_user or ctx.author
+        template: localutils.Template = ctx.template
 
-                # Add field to list
+        # See if the user is already setting up a profile
+        if await self.set_profile_locks.locked(ctx.author.id):
+            return await ctx.send("You're already setting up a profile.")
+
+        # Only mods can see other people's profiles
+        if target_user != ctx.author and not localutils.checks.member_is_moderator(ctx.bot, ctx.author):
+            raise commands.MissingPermissions(["manage_roles"])
+
+        # Grab their draft
+        async with self.bot.database() as db:
+            await template.fetch_fields(db)
+            draft = await localutils.ProfileDraft.fetch(db, target_user.id, template.template_id)
+            user_profiles: typing.List[localutils.UserProfile] = await template.fetch_all_profiles_for_user(db, target_user.id, fetch_filled_fields=False)
+            if draft and draft.name.lower() in [i.name.lower() for i in user_profiles]:
+                await draft.delete(db)
+                draft = None
+        if draft is None:
+            if target_user == ctx.author:
+                return await ctx.send(f"You don't have an unfinished profile for **{template.name}**.")
+            return await ctx.send(f"{target_user.mention} doesn't have an unfinished profile for **{template.name}**.", allowed_mentions=discord.AllowedMentions(users=False))
+        if not await self.check_profile_count(ctx, template, target_user, user_profiles):
+            return
+
+        # See if you we can send them the PM
+        try:
+            await ctx.author.send(f"Continuing the **{template.name}** profile **{draft.name}** from where you left off.")
+            await ctx.send("Sent you a DM!")
+        except discord.Forbidden:
+            return await ctx.send("I'm unable to send you DMs to set up the profile :/")
+
+        # Talk them through the rest of the fields
+        async with self.set_profile_locks(ctx.author.id):
+            filled_field_dict = await self.talk_through_fields(ctx, template, target_user, draft)
+            if filled_field_dict is None:
+                return
+
+        # And save
+        await self.finish_profile_setup(ctx, template, target_user, draft, filled_field_dict)
+
+    async def send_multiple_profiles_message(self, ctx:utils.Context, template:localutils.Template, user_profiles:typing.List[localutils.UserProfile], user:typing.Optional[discord.Member]=None) -> None:
+        """
+        Tell the user that a profile name needs to be given since there are multiple profiles to choose from.
+        """
+
+        profile_names_string = [f'"{o}"' for o in [i.name.replace('*', '\\*').replace('`', '\\`').replace('_', '\\_') for i in user_profiles]]
+        if user:
+            await ctx.send(f"{user.mention} has multiple profiles set for the template **{template.name}** - {', '.join(profile_names_string)}.")
+        else:
+            await ctx.send(f"You have multiple profiles set for the template **{template.name}** - {', '.join(profile_names_string)}.")
+
+    async def send_profile_embeds(self, destination:discord.abc.Messageable, user_profile:localutils.UserProfile, member:discord.Member) -> discord.Message:
+        """
+        Send every part of a profile to the given destination, returning the last message sent.
+
+        Raises:
+            localutils.errors.EmbedBudgetError: The profile can't be sent within Discord's embed limits.
+        """
+
+        for embed in user_profile.build_embeds(self.bot, member):
+            message = await destination.send(embed=embed)
+        return message
+
+    async def check_profile_count(self, ctx:utils.Context, template:localutils.Template, target_user:discord.Member, user_profiles:typing.List[localutils.UserProfile]) -> bool:
+        """
+        Check that the target user is able to make another profile for the given template, telling them if not.
+        """
+
+        if template.max_profile_count == 0:
+            await ctx.send(f"Currently the template **{template.name}** is not accepting any more applications.")
+            return False
+        if len(user_profiles) >= template.max_profile_count:
+            if target_user == ctx.author:
+                await ctx.send(f"You're already at the maximum number of profiles set for **{template.name}**.")
+            else:
+                await ctx.send(f"{target_user.mention} is already at the maximum number of profiles set up for **{template.name}**.")
+            return False
+        return True
+
+    async def talk_through_fields(self, ctx:utils.Context, template:localutils.Template, target_user:discord.Member, draft:localutils.ProfileDraft) -> typing.Optional[typing.Dict[uuid.UUID, localutils.FilledField]]:
+        """
+        Talk the user through each of the template's fields that haven't yet been answered in their draft,
+        checkpointing each answer to the draft as it's given.
+        Returns the filled fields, or None if the user timed out.
+        """
+
+        filled_field_dict = {}
+        for compiled_field in template.compiled.fields:
+            field = compiled_field.field
+
+            # See if it's a command
+            if compiled_field.is_command:
                 filled_field_dict[field.field_id] = localutils.FilledField(
                     user_id=target_user.id,
-                    name=name_content,
+                    name=draft.name,
                     field_id=field.field_id,
-                    value=field_content,
+                    value="Could not get field information",
                     field=field,
                 )
+                continue
+
+            # See if they've already answered it
+            if field.field_id in draft.values:
+                filled_field_dict[field.field_id] = localutils.FilledField(
+                    user_id=target_user.id,
+                    name=draft.name,
+                    field_id=field.field_id,
+                    value=draft.values[field.field_id],
+                    field=field,
+                )
+                continue
+
+            # Send the user the prompt
+            if field.optional:
+                await ctx.author.send(f"{field.prompt.rstrip('.')}. Type **pass** to skip this field.")
+            else:
+                await ctx.author.send(field.prompt)
+
+            # Get user input
+            while True:
+                try:
+                    user_message = await self.bot.get_cog("Conversations").wait_for_dm(ctx.author, timeout=field.timeout)
+                except asyncio.TimeoutError:
+                    try:
+                        await ctx.author.send(f"Your input for this field has timed out. Run `resume{template.name.lower()}` on your server to carry on from where you left off.")
+                    except discord.Forbidden:
+                        pass
+                    return None
+                try:
+                    if user_message.content.lower() == 'pass' and field.optional:
+                        field_content = None
+                    else:
+                        field_content = field.field_type.get_from_message(user_message)
+                    break
+                except localutils.errors.FieldCheckFailure as e:
+                    await ctx.author.send(e.message)
+
+            # Add field to list
+            filled_field_dict[field.field_id] = localutils.FilledField(
+                user_id=target_user.id,
+                name=draft.name,
+                field_id=field.field_id,
+                value=field_content,
+                field=field,
+            )
+            draft.checkpoint(self.bot.database, field.field_id, field_content)
+
+        return filled_field_dict
+
+    async def finish_profile_setup(self, ctx:utils.Context, template:localutils.Template, target_user:discord.Member, draft:localutils.ProfileDraft, filled_field_dict:typing.Dict[uuid.UUID, localutils.FilledField]) -> None:
+        """
+        Submit and save a profile that the user has finished filling in, removing their draft.
+        """
 
         # Make the UserProfile object
         user_profile = localutils.UserProfile(
             user_id=target_user.id,
-            name=name_content,
+            name=draft.name,
             template_id=template.template_id,
             verified=template.verification_channel_id is None
         )
         user_profile.template = template
         user_profile.all_filled_fields = filled_field_dict
 
-        # Make sure the bot can send the embed at all
+        # Make sure the embed fits inside of Discord's limits before sending it anywhere
         try:
-            await ctx.author.send(embed=user_profile.build_embed(self.bot, target_user))
+            await self.send_profile_embeds(ctx.author, user_profile, target_user)
+        except localutils.errors.EmbedBudgetError as e:
+            # Clear out the answers, keeping the draft's name, so resuming asks for them again
+            draft.values.clear()
+            draft.checkpoint(self.bot.database)
+            return await ctx.author.send(f"Your profile can't be shown - {', '.join(e.problems)}.\nRun `resume{template.name.lower()}` on your server to answer the questions for **{draft.name}** again.")
         except discord.HTTPException as e:
             return await ctx.author.send(f"Your profile couldn't be sent to you - `{e}`.\nPlease try again later.")
 
-        # Delete the currently archived message, should one exist
-        current_profile_message = await user_profile.fetch_message(self.bot)
-        if current_profile_message:
-            try:
-                await current_profile_message.delete()
-            except discord.HTTPException:
-                pass
-
-        # Let's see if this worked
-        sent_profile_message = await self.bot.get_cog("ProfileVerification").send_profile_submission(ctx, user_profile, target_user)
-        if user_profile.template.should_send_message and sent_profile_message is None:
+        # Post and save the profile
+        await draft.wait_for_checkpoints()
+        if not await self.submit_profile(ctx, user_profile, target_user, draft):
             return
-        send_profile_message_id = None
-        send_profile_channel_id = None
-        if sent_profile_message:
-            send_profile_message_id = sent_profile_message.id
-            send_profile_channel_id = sent_profile_message.channel.id
-
-        # Database me up daddy
-        async with self.bot.database() as db:
-            try:
-                await db(
-                    """INSERT INTO created_profile (user_id, name, template_id, verified, posted_message_id, posted_channel_id)
-                    VALUES ($1, $2, $3, $4, $5, $6) ON CONFLICT (user_id, name, template_id)
-                    DO UPDATE SET verified=excluded.verified, posted_message_id=excluded.posted_message_id, posted_channel_id=excluded.posted_channel_id""",
-                    user_profile.user_id, user_profile.name, user_profile.template.template_id, user_profile.verified,
-                    send_profile_message_id, send_profile_channel_id
-                )
-            except asyncpg.ForeignKeyViolationError:
-                return await ctx.author.send("Unfortunately, it looks like the template was deleted while you were setting up your profile.")
-            for field in filled_field_dict.values():
-                await db(
-                    """INSERT INTO filled_field (user_id, name, field_id, value) VALUES ($1, $2, $3, $4)
-                    ON CONFLICT (user_id, name, field_id) DO UPDATE SET value=excluded.value""",
-                    field.user_id, name_content, field.field_id, field.value
-                )
 
         # Respond to user
         if template.get_verification_channel_id(target_user):
@@ -270,6 +407,62 @@ class ProfileCreation(utils.Cog):
         else:
             await ctx.author.send("Your profile has been created and saved.")
 
+    async def submit_profile(self, ctx:utils.Context, user_profile:localutils.UserProfile, target_user:discord.Member, draft:localutils.ProfileDraft=None) -> bool:
+        """
+        Post a new or edited profile for verification (or to the archive) and then save it. Both are done while
+        holding the profile's update lock, so edits to the same profile that overlap are run one after the other,
+        and each works from the message and field values that the one before it saved. The user is told if
+        it couldn't be saved.
+
+        Args:
+            ctx (utils.Context): The command invocation for the user setting the profile.
+            user_profile (localutils.UserProfile): The profile being submitted.
+            target_user (discord.Member): The owner of the profile (may not be the same as ctx.author).
+            draft (localutils.ProfileDraft, optional): The draft the profile was made from, to be removed once it's saved.
+
+        Returns:
+            bool: Whether or not the profile was saved.
+        """
+
+        failure_message = None
+        key = (user_profile.template_id, user_profile.user_id, user_profile.name)
+        async with self.profile_update_locks(key):
+
+            # Pick up anything saved to the profile since we fetched it
+            async with self.bot.database() as db:
+                profile_exists = await user_profile.fetch_saved_state(db)
+            if draft is None and not profile_exists:
+                failure_message = "Unfortunately, it looks like your profile was deleted while you were editing it."
+
+            # Post the profile, editing the current archived message should one exist
+            if failure_message is None:
+                sent_profile_message = await self.bot.get_cog("ProfileVerification").update_profile_submission(ctx, user_profile, target_user)
+                if user_profile.template.should_send_message and sent_profile_message is None:
+                    return False
+                user_profile.posted_message_id = None
+                user_profile.posted_channel_id = None
+                if sent_profile_message:
+                    user_profile.posted_message_id = sent_profile_message.id
+                    user_profile.posted_channel_id = sent_profile_message.channel.id
+
+                # Database me up daddy
+                async with self.bot.database() as db:
+                    try:
+                        await user_profile.save(db)
+                    except asyncpg.ForeignKeyViolationError:
+                        action = "setting up" if draft is not None else "editing"
+                        failure_message = f"Unfortunately, it looks like the template was deleted while you were {action} your profile."
+                    else:
+                        if draft is not None:
+                            await draft.delete(db)
+
+        # Tell them if it didn't work
+        if failure_message is not None:
+            await ctx.author.send(failure_message)
+            return False
+        await self.bot.get_cog("CacheInvalidation").invalidate_profile(user_profile.template_id, user_profile.user_id, user_profile.name)
+        return True
+
     @utils.command(hidden=True)
     @commands.bot_has_permissions(send_messages=True)
     @commands.guild_only()
@@ -289,7 +482,7 @@ class ProfileCreation(utils.Cog):
             return
 
         # See if the user is already setting up a profile
-        if self.set_profile_locks[ctx.author.id].locked():
+        if await self.set_profile_locks.locked(ctx.author.id):
             return await ctx.send("You're already setting up a profile.")
 
         # You can only edit someone else's profile if you're a moderator
@@ -301,15 +494,11 @@ class ProfileCreation(utils.Cog):
             await template.fetch_fields(db)
             try:
                 user_profile: localutils.UserProfile = await template.fetch_profile_for_user(db, target_user.id, profile_name)
-                user_profiles: typing.List[localutils.UserProfile] = await template.fetch_all_profiles_for_user(db, target_user.id, fetch_filled_fields=False)
+                multiple_profiles = None
             except ValueError:
-                user_profiles: typing.List[localutils.UserProfile] = await template.fetch_all_profiles_for_user(db, target_user.id)
-                profile_names_string = [f'"{o}"' for o in [i.name.replace('*', '\\*').replace('`', '\\`').replace('_', '\\_') for i in user_profiles]]
-                if target_user == ctx.author:
-                    await ctx.send(f"You have multiple profiles set for the template **{template.name}** - {', '.join(profile_names_string)}.")
-                else:
-                    await ctx.send(f"{target_user.mention} has multiple profiles set for the template **{template.name}** - {', '.join(profile_names_string)}.")
-                return
+                multiple_profiles: typing.List[localutils.UserProfile] = await template.fetch_all_profiles_for_user(db, target_user.id, fetch_filled_fields=False)
+        if multiple_profiles is not None:
+            return await self.send_multiple_profiles_message(ctx, template, multiple_profiles, None if target_user == ctx.author else target_user)
 
         # Check if they already have a profile set
         if user_profile is None:
@@ -336,14 +525,15 @@ class ProfileCreation(utils.Cog):
             return await ctx.send("I'm unable to send you a DM to set up the profile :/")
 
         # Drag them into a lock
-        async with self.set_profile_locks[ctx.author.id]:
+        async with self.set_profile_locks(ctx.author.id):
 
             # Talk the user through each field
             user_profile.all_filled_fields: typing.Dict[uuid.UUID, localutils.FilledField] = user_profile.filled_fields
-            for field in sorted(template.fields.values(), key=lambda x: x.index):
+            for compiled_field in template.compiled.fields:
+                field = compiled_field.field
 
                 # See if it's a command
-                if localutils.CommandProcessor.COMMAND_REGEX.search(field.prompt):
+                if compiled_field.is_command:
                     filled_field = localutils.FilledField(
                         user_id=target_user.id,
                         name=user_profile.name,
@@ -372,10 +562,7 @@ class ProfileCreation(utils.Cog):
                 # Get user input
                 while True:
                     try:
-                        user_message = await self.bot.wait_for(
-                            "message", timeout=field.timeout,
-                            check=lambda m: m.author == ctx.author and isinstance(m.channel, discord.DMChannel)
-                        )
+                        user_message = await self.bot.get_cog("Conversations").wait_for_dm(ctx.author, timeout=field.timeout)
                     except asyncio.TimeoutError:
                         try:
                             return await ctx.author.send(f"Your input for this field has timed out. Please try running `set{template.name}` on your server again.")
@@ -402,45 +589,17 @@ class ProfileCreation(utils.Cog):
         # Update verification
         user_profile.verified = template.verification_channel_id is None
 
-        # Make sure the bot can send the embed at all
+        # Make sure the embed fits inside of Discord's limits before sending it anywhere
         try:
-            await ctx.author.send(embed=user_profile.build_embed(self.bot, target_user))
+            await self.send_profile_embeds(ctx.author, user_profile, target_user)
+        except localutils.errors.EmbedBudgetError as e:
+            return await ctx.author.send(f"Your profile can't be shown - {', '.join(e.problems)}.\nPlease run `edit{template.name.lower()}` again.")
         except discord.HTTPException as e:
-            return await ctx.author.send(f"Your profile couldn't be sent to you, so the embed was probably hecked - `{e}`.\nPlease try again later.")
-
-        # Delete the currently archived message, should one exist
-        current_profile_message = await user_profile.fetch_message(self.bot)
-        if current_profile_message:
-            try:
-                await current_profile_message.delete()
-            except discord.HTTPException:
-                pass
+            return await ctx.author.send(f"Your profile couldn't be sent to you - `{e}`.\nPlease try again later.")
 
-        # Send profile over to the mods
-        sent_profile_message = await self.bot.get_cog("ProfileVerification").send_profile_submission(ctx, user_profile, target_user)
-        if user_profile.template.should_send_message and sent_profile_message is None:
+        # Post and save the profile - only the fields that they've changed will be written
+        if not await self.submit_profile(ctx, user_profile, target_user):
             return
-        send_profile_message_id = None
-        send_profile_channel_id = None
-        if sent_profile_message:
-            send_profile_message_id = sent_profile_message.id
-            send_profile_channel_id = sent_profile_message.channel.id
-
-        # Database me up daddy
-        async with self.bot.database() as db:
-            await db(
-                """INSERT INTO created_profile (user_id, name, template_id, verified, posted_message_id, posted_channel_id)
-                VALUES ($1, $2, $3, $4, $5, $6) ON CONFLICT (user_id, name, template_id)
-                DO UPDATE SET verified=excluded.verified, posted_message_id=excluded.posted_message_id, posted_channel_id=excluded.posted_channel_id""",
-                user_profile.user_id, user_profile.name, user_profile.template.template_id, user_profile.verified,
-                send_profile_message_id, send_profile_channel_id,
-            )
-            for field in user_profile.all_filled_fields.values():
-                await db(
-                    """INSERT INTO filled_field (user_id, name, field_id, value) VALUES ($1, $2, $3, $4)
-                    ON CONFLICT (user_id, name, field_id) DO UPDATE SET value=excluded.value""",
-                    field.user_id, user_profile.name, field.field_id, field.value
-                )
 
         # Respond to user
         await ctx.author.send("Your profile has been edited and saved.")
@@ -462,15 +621,12 @@ class ProfileCreation(utils.Cog):
         template: localutils.Template = ctx.template
         async with self.bot.database() as db:
             try:
-                user_profile = await template.fetch_profile_for_user(db, (user or ctx.author).id, profile_name, fetch_filled_fields=False)
+                user_profile: localutils.UserProfile = await template.fetch_profile_for_user(db, (user or ctx.author).id, profile_name, fetch_filled_fields=False)
+                multiple_profiles = None
             except ValueError:
-                user_profiles: typing.List[localutils.UserProfile] = await template.fetch_all_profiles_for_user(db, (user or ctx.author).id)
-                profile_names_string = [f'"{o}"' for o in [i.name.replace('*', '\\*').replace('`', '\\`').replace('_', '\\_') for i in user_profiles]]
-                if user:
-                    await ctx.send(f"{user.mention} has multiple profiles set for the template **{template.name}** - {', '.join(profile_names_string)}.")
-                else:
-                    await ctx.send(f"You have multiple profiles set for the template **{template.name}** - {', '.join(profile_names_string)}.")
-                return
+                multiple_profiles: typing.List[localutils.UserProfile] = await template.fetch_all_profiles_for_user(db, (user or ctx.author).id, fetch_filled_fields=False)
+        if multiple_profiles is not None:
+            return await self.send_multiple_profiles_message(ctx, template, multiple_profiles, user)
         if user_profile is None:
             if profile_name:
                 if user:
@@ -485,17 +641,13 @@ class ProfileCreation(utils.Cog):
             return
 
         # Delete the currently archived message, should one exist
-        current_profile_message = await user_profile.fetch_message(self.bot)
-        if current_profile_message:
-            try:
-                await current_profile_message.delete()
-            except discord.HTTPException:
-                pass
+        await self.bot.get_cog("ProfileVerification").delete_profile_submission(user_profile)
 
         # Remove it from the database
         user = user or ctx.author
         async with self.bot.database() as db:
             await db("DELETE FROM created_profile WHERE user_id=$1 AND template_id=$2 AND name=$3", user.id, template.template_id, user_profile.name)
+        await self.bot.get_cog("CacheInvalidation").invalidate_profile(template.template_id, user.id, user_profile.name)
         await ctx.send("This profile has been deleted.")
 
     @utils.command(hidden=True)
@@ -512,14 +664,11 @@ class ProfileCreation(utils.Cog):
         async with self.bot.database() as db:
             try:
                 user_profile: localutils.UserProfile = await template.fetch_profile_for_user(db, (user or ctx.author).id, profile_name)
+                multiple_profiles = None
             except ValueError:
-                user_profiles: typing.List[localutils.UserProfile] = await template.fetch_all_profiles_for_user(db, (user or ctx.author).id)
-                profile_names_string = [f'"{o}"' for o in [i.name.replace('*', '\\*').replace('`', '\\`').replace('_', '\\_') for i in user_profiles]]
-                if user:
-                    await ctx.send(f"{user.mention} has multiple profiles set for the template **{template.name}** - {', '.join(profile_names_string)}.")
-                else:
-                    await ctx.send(f"You have multiple profiles set for the template **{template.name}** - {', '.join(profile_names_string)}.")
-                return
+                multiple_profiles: typing.List[localutils.UserProfile] = await template.fetch_all_profiles_for_user(db, (user or ctx.author).id, fetch_filled_fields=False)
+        if multiple_profiles is not None:
+            return await self.send_multiple_profiles_message(ctx, template, multiple_profiles, user)
         if user_profile is None:
             if profile_name:
                 if user:
@@ -535,7 +684,7 @@ class ProfileCreation(utils.Cog):
 
         # See if verified
         if user_profile.verified or localutils.checks.member_is_moderator(ctx.bot, ctx.author):
-            return await ctx.send(embed=user_profile.build_embed(self.bot, user or ctx.author))
+            return await self.send_profile_embeds(ctx, user_profile, user or ctx.author)
 
         # Not verified
         if user:
@@ -558,7 +707,7 @@ class ProfileCreation(utils.Cog):
             return await ctx.send("No profile found.")
         guild = self.bot.get_guild(template.guild_id) or await self.bot.fetch_guild(template.guild_id)
         member = guild.get_member(user) or await guild.fetch_member(user)
-        return await ctx.send(embed=profile.build_embed(self.bot, member))
+        return await self.send_profile_embeds(ctx, profile, member)
 
 
 def setup(bot:utils.Bot):
@@ -0,0 +1,136 @@
+import typing
+
+import discord
+from discord.ext import commands, tasks
+import voxelbotutils as utils
+
+from cogs import utils as localutils
+
+
+class ProfileSearch(utils.Cog):
+
+    RESULTS_PER_PAGE = 10
+    SNIPPET_LENGTH = 80
+    INDEX_MISSING_WARNING = "Profiles saved a while ago are still being added to search, so some of them may be missing."
+
+    def __init__(self, bot:utils.Bot):
+        super().__init__(bot)
+        self.search_index_ready = False
+        self.search_backfill_after = None
+        self.search_backfill_done = False
+        self.search_index_loop.start()
+
+    def cog_unload(self):
+        self.search_index_loop.cancel()
+
+    @tasks.loop(seconds=1)
+    async def search_index_loop(self):
+        """
+        Fill in the search vectors of filled fields saved before search was added, a batch at a time, and then
+        build the search index, stopping once the index is there.
+        """
+
+        # See if there's anything to do
+        async with self.bot.database() as db:
+            index_state = await localutils.migrations.get_search_index_state(db)
+        if index_state:
+            self.search_index_ready = True
+            self.search_index_loop.stop()
+            return
+
+        # Fill in a batch of search vectors
+        if not self.search_backfill_done:
+            async with self.bot.database() as db:
+                last_key, _ = await localutils.migrations.backfill_search_vectors(db, self.search_backfill_after)
+            self.search_backfill_after = last_key
+            self.search_backfill_done = last_key is None
+            return
+
+        # And build the index
+        async with self.bot.database() as db:
+            if await localutils.migrations.create_search_index(db):
+                self.logger.info("Built the profile search index")
+
+    @search_index_loop.before_loop
+    async def before_search_index_loop(self):
+        await self.bot.wait_until_ready()
+
+    @utils.command(aliases=['search'])
+    @commands.bot_has_permissions(send_messages=True, embed_links=True, add_reactions=True)
+    @commands.guild_only()
+    async def searchprofiles(self, ctx:utils.Context, template:localutils.Template, *, query:str):
+        """
+        Searches through the profiles of a template for the given text.
+        """
+
+        # Check the query
+        if len(query) > localutils.Template.SEARCH_QUERY_MAX_LENGTH:
+            return await ctx.send(f"Your search can be at most {localutils.Template.SEARCH_QUERY_MAX_LENGTH} characters long.")
+        verified_only = not localutils.checks.member_is_moderator(self.bot, ctx.author)
+        search_terms = [i.strip('"-').lower() for i in query.split() if i.strip('"-') and i.lower() != "or"]
+
+        # Set up our page getter
+        async def fetch_page(after, limit):
+            async with self.bot.database() as db:
+                results = await template.search_profiles(db, query, verified_only=verified_only, after=after, limit=limit)
+                await localutils.UserProfile.fetch_filled_fields_for_profiles(db, [i[0] for i in results[:self.RESULTS_PER_PAGE]], template)
+            return results
+
+        def format_page(results, page_number):
+            embed = utils.Embed(title=f"Search results for \"{query[:200]}\"", use_random_colour=True)
+            lines = []
+            for index, (user_profile, rank) in enumerate(results, start=(page_number - 1) * self.RESULTS_PER_PAGE + 1):
+                line = f"`{index}.` <@{user_profile.user_id}> - **{discord.utils.escape_markdown(user_profile.name)}**"
+                if not user_profile.verified:
+                    line += " (unverified)"
+                snippet = self.get_snippet(user_profile, search_terms)
+                if snippet:
+                    line += f"\n> {snippet}"
+                lines.append(line)
+            embed.description = "\n".join(lines) or "There are no more results."
+            if not self.search_index_ready:
+                embed.description += f"\n\n*{self.INDEX_MISSING_WARNING}*"
+            embed.set_footer(text=f"Page {page_number} // Use {ctx.clean_prefix}get{template.name.lower()} @user [name] to see a profile")
+            return embed
+
+        # And paginate
+        paginator = localutils.pagination.KeysetPaginator(
+            fetch_page,
+            lambda result: (result[1], result[0].user_id, result[0].name),
+            format_page,
+            per_page=self.RESULTS_PER_PAGE,
+        )
+        message = await paginator.start(ctx)
+        if message is None:
+            text = f"No profiles for template **{template.name}** matched your search."
+            if not self.search_index_ready:
+                text += f" {self.INDEX_MISSING_WARNING}"
+            await ctx.send(text)
+
+    def get_snippet(self, user_profile:localutils.UserProfile, search_terms:typing.List[str]) -> typing.Optional[str]:
+        """
+        Get a bit of the first filled field that contains one of the search terms.
+        """
+
+        for compiled_field in user_profile.template.compiled.fields:
+            filled_field = user_profile.all_filled_fields.get(compiled_field.field.field_id)
+            if filled_field is None or filled_field.value is None or compiled_field.is_command:
+                continue
+            value = str(filled_field.value)
+            lowered = value.lower()
+            positions = [lowered.find(i) for i in search_terms if i in lowered]
+            if not positions:
+                continue
+            start = max([min(positions) - self.SNIPPET_LENGTH // 4, 0])
+            snippet = value[start:start + self.SNIPPET_LENGTH].replace("\n", " ")
+            if start > 0:
+                snippet = "..." + snippet
+            if start + self.SNIPPET_LENGTH < len(value):
+                snippet += "..."
+            return f"**{discord.utils.escape_markdown(compiled_field.field.name)}:** {discord.utils.escape_markdown(snippet)}"
+        return None
+
+
+def setup(bot:utils.Bot):
+    x = ProfileSearch(bot)
+    bot.add_cog(x)
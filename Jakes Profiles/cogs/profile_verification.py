@@ -2,6 +2,7 @@ import asyncio
 import typing
 
 import discord
+from discord.ext import commands
 import voxelbotutils as utils
 
 from cogs import utils as localutils
@@ -12,6 +13,58 @@ class ProfileVerification(utils.Cog):
     TICK_EMOJI = "<:tick_yes:596096897995899097>"
     CROSS_EMOJI = "<:cross_no:596096897769275402>"
 
+    PENDING_PER_PAGE = 10
+    BULK_VERIFICATION_CONCURRENCY = 5  # How many profiles have their DMs, archive posts, and roles sent at once
+
+    def __init__(self, bot:utils.Bot):
+        super().__init__(bot)
+        self.pending_verification_messages: typing.Set[int] = set()  # The IDs of verification messages for unverified profiles
+
+    async def cache_setup(self, db):
+        """
+        Load the IDs of the verification messages that are still waiting on a moderator.
+        """
+
+        await localutils.migrations.ensure_migrations_applied(db)
+        rows = await db(localutils.queries.PENDING_VERIFICATION_MESSAGE_IDS)
+        self.pending_verification_messages = {i['posted_message_id'] for i in rows}
+
+    @staticmethod
+    def get_posted_embed(embeds:typing.List[utils.Embed], template:localutils.Template, footer_text:str=None) -> utils.Embed:
+        """
+        Get the embed to post into a verification or archive channel. Only one message is posted per
+        profile, so profiles that had to be split over multiple embeds only have their first part posted,
+        with a note in the footer saying where to find the rest.
+        """
+
+        embed = embeds[0]
+        footer_parts = [footer_text] if footer_text else []
+        if len(embeds) > 1:
+            footer_parts.append(f"Showing part 1 of {len(embeds)} - use get{template.name.lower()} to see the whole profile")
+        if footer_parts:
+            embed.set_footer(text=" // ".join(footer_parts))
+        return embed
+
+    def get_verification_post(self, user_profile:localutils.UserProfile, target_user:discord.Member) -> typing.Tuple[str, utils.Embed]:
+        """
+        Get the content and embed of a profile's message in its verification channel.
+        """
+
+        template: localutils.Template = user_profile.template
+        embeds: typing.List[utils.Embed] = user_profile.build_embeds(self.bot, target_user)
+        embed = self.get_posted_embed(embeds, template, f'{template.name} // Verification Check')
+        content = f"New **{template.name}** submission from <@{user_profile.user_id}>\n{user_profile.user_id}/{template.template_id}/{user_profile.name}"
+        return content, embed
+
+    def get_archive_post(self, user_profile:localutils.UserProfile, target_user:discord.Member) -> typing.Tuple[str, utils.Embed]:
+        """
+        Get the content and embed of a profile's message in its archive channel.
+        """
+
+        embeds: typing.List[utils.Embed] = user_profile.build_embeds(self.bot, target_user)
+        embed = self.get_posted_embed(embeds, user_profile.template, embeds[0].footer.text)
+        return target_user.mention, embed
+
     async def send_profile_verification(self, user_profile:localutils.UserProfile, target_user:discord.Member) -> typing.Optional[discord.Message]:
         """
         Sends a profile in to the template's verification channel.
@@ -44,10 +97,9 @@ class ProfileVerification(utils.Cog):
             raise localutils.errors.TemplateVerificationChannelError(f"I can't reach a channel with the ID `{verification_channel_id}`.")
 
         # Send the data
-        embed: utils.Embed = user_profile.build_embed(self.bot, target_user)
-        embed.set_footer(text=f'{template.name} // Verification Check')
+        content, embed = self.get_verification_post(user_profile, target_user)
         try:
-            v = await channel.send(f"New **{template.name}** submission from <@{user_profile.user_id}>\n{user_profile.user_id}/{template.template_id}/{user_profile.name}", embed=embed)
+            v = await channel.send(content, embed=embed)
         except discord.HTTPException:
             raise localutils.errors.TemplateVerificationChannelError(f"I can't send messages to {channel.mention}.")
 
@@ -63,6 +115,7 @@ class ProfileVerification(utils.Cog):
             raise localutils.errors.TemplateVerificationChannelError(f"I can't add reactions in {channel.mention}.")
 
         # Wew nice we're done
+        self.pending_verification_messages.add(v.id)
         return v
 
     async def send_profile_archivation(self, user_profile:localutils.UserProfile, target_user:discord.Member) -> typing.Optional[discord.Message]:
@@ -94,9 +147,9 @@ class ProfileVerification(utils.Cog):
             raise localutils.errors.TemplateArchiveChannelError(f"I can't reach a channel with the ID `{archive_channel_id}`.")
 
         # Send the data
-        embed: utils.Embed = user_profile.build_embed(self.bot, target_user)
+        content, embed = self.get_archive_post(user_profile, target_user)
         try:
-            return await channel.send(target_user.mention, embed=embed)
+            return await channel.send(content, embed=embed)
         except discord.HTTPException:
             raise localutils.errors.TemplateArchiveChannelError(f"I can't send messages to {channel.mention}.")
 
@@ -160,126 +213,362 @@ class ProfileVerification(utils.Cog):
         # Wew it worked
         return return_message
 
-    @utils.Cog.listener('on_raw_reaction_add')
-    async def verification_emoji_check(self, payload:discord.RawReactionActionEvent):
+    async def update_profile_submission(self, ctx:utils.Context, user_profile:localutils.UserProfile, target_user:discord.Member) -> typing.Optional[typing.Union[discord.Message, discord.PartialMessage]]:
         """
-        Triggered when a reaction is added or removed, check for profile verification.
+        Update the verification or archive message for an edited profile.
+        The profile's existing message is edited in place if it's still in the right channel, without fetching it
+        first; it's only deleted and sent again if the profile now belongs in a different channel or the message
+        has gone. This should be called while holding the profile's update lock (see `ProfileCommands.submit_profile`),
+        so that the posted message IDs it works from can't be changed underneath it.
+
+        Args:
+            ctx (utils.Context): The command invocation for the user setting the profile.
+            user_profile (localutils.UserProfile): The profile being sent.
+            target_user (discord.Member): The owner of the profile (may not be the same as ctx.author).
+
+        Returns:
+            typing.Optional[typing.Union[discord.Message, discord.PartialMessage]]: The message containing the user's profile.
         """
 
-        # Check that both the channel and the message are readable
+        # See where the profile should be
+        template: localutils.Template = user_profile.template
+        verification_channel_id = template.get_verification_channel_id(target_user)
+        destination_channel_id = verification_channel_id or template.get_archive_channel_id(target_user)
+
+        # See if we can edit the message that's already there
+        can_edit = (
+            destination_channel_id is not None
+            and destination_channel_id == user_profile.posted_channel_id
+            and user_profile.posted_message_id is not None
+            and (verification_channel_id is None or user_profile.posted_message_id in self.pending_verification_messages)
+        )
+        channel = self.bot.get_channel(destination_channel_id) if can_edit else None
+        if channel is not None:
+            message: discord.PartialMessage = channel.get_partial_message(user_profile.posted_message_id)
+            if verification_channel_id:
+                content, embed = self.get_verification_post(user_profile, target_user)
+            else:
+                content, embed = self.get_archive_post(user_profile, target_user)
+            try:
+                await message.edit(content=content, embed=embed)
+                if verification_channel_id is None:
+                    await self.add_profile_user_roles(user_profile, target_user)
+                return message
+            except discord.NotFound:
+                pass
+            except discord.HTTPException:
+                await ctx.author.send(f"I can't edit messages in {channel.mention}.")
+                return None
+            except localutils.errors.TemplateSendError as e:
+                await ctx.author.send(str(e))
+                return None
+
+        # Delete the old message and send a new one
+        await self.delete_profile_submission(user_profile)
+        return await self.send_profile_submission(ctx, user_profile, target_user)
+
+    async def delete_profile_submission(self, user_profile:localutils.UserProfile) -> None:
+        """
+        Delete the verification or archive message for a profile, should one exist, without fetching it first.
+        """
+
+        if user_profile.posted_channel_id is None or user_profile.posted_message_id is None:
+            return
         try:
-            channel: discord.TextChannel = self.bot.get_channel(payload.channel_id) or await self.bot.fetch_channel(payload.channel_id)
-            message: discord.Message = await channel.fetch_message(payload.message_id)
+            await self.bot.http.delete_message(user_profile.posted_channel_id, user_profile.posted_message_id)
         except discord.HTTPException:
-            return
+            pass
+        self.pending_verification_messages.discard(user_profile.posted_message_id)
 
-        # Check that the message was sent by the bot
-        if message.author.id != self.bot.user.id:
-            return
+    async def resolve_profile_verification(self, user_profile:localutils.UserProfile, guild:discord.Guild, verify:bool, denial_reason:str="No reason provided.") -> bool:
+        """
+        Tell the owner of a profile that it's been verified or denied, and post verified profiles to the archive and give their
+        owner the template's role. The profile should already be verified (or deleted) in the database, and have its filled fields.
 
-        # Check the message's embed
-        if not message.embeds:
-            return
-        embed: discord.Embed = message.embeds[0]
-        if not embed.footer:
+        Args:
+            user_profile (localutils.UserProfile): The profile that's been verified or denied.
+            guild (discord.Guild): The guild the profile's template is in.
+            verify (bool): Whether the profile was verified (rather than denied).
+            denial_reason (str, optional): Why the profile was denied.
+
+        Returns:
+            bool: Whether or not the profile's owner could be told about the decision.
+        """
+
+        # Get the owner of the profile
+        try:
+            profile_user: discord.Member = guild.get_member(user_profile.user_id) or await guild.fetch_member(user_profile.user_id)
+        except discord.HTTPException:
+            return False
+
+        # Tell the user about the decision
+        user_told = True
+        try:
+            embeds: typing.List[utils.Embed] = user_profile.build_embeds(self.bot, profile_user)
+            if verify:
+                await profile_user.send(f"Your profile for **{user_profile.template.name}** (`{user_profile.name}`) on `{guild.name}` has been verified.", embed=embeds[0])
+            else:
+                await profile_user.send(f"Your profile for **{user_profile.template.name}** (`{user_profile.name}`) on `{guild.name}` has been denied with the reason `{denial_reason}`.", embed=embeds[0])
+            for embed in embeds[1:]:
+                await profile_user.send(embed=embed)
+        except (discord.HTTPException, localutils.errors.EmbedBudgetError):
+            self.logger.info(f"Couldn't DM user {user_profile.user_id} about their '{user_profile.template.name}' profile verification on {guild.id}")
+            user_told = False  # Can't send the user a DM, let's just ignore it
+
+        # Archive and add roles
+        if verify:
+
+            # Send the profile to the archive
+            try:
+                await self.send_profile_archivation(user_profile, profile_user)
+            except localutils.errors.TemplateArchiveChannelError:
+                pass
+
+            # Add the relevant role to the user
+            try:
+                await self.add_profile_user_roles(user_profile, profile_user)
+            except localutils.errors.TemplateRoleAddError:
+                pass
+
+        return user_told
+
+    @utils.Cog.listener('on_raw_reaction_add')
+    async def verification_emoji_check(self, payload:discord.RawReactionActionEvent):
+        """
+        Triggered when a reaction is added or removed, check for profile verification.
+        """
+
+        # Check that the message is one of our pending verification messages
+        if payload.message_id not in self.pending_verification_messages:
             return
-        if not embed.footer.text:
+        if payload.guild_id is None:
             return
-        if 'Verification Check' not in embed.footer.text:
+
+        # Check their emoji
+        if str(payload.emoji) not in [self.TICK_EMOJI, self.CROSS_EMOJI]:
             return
 
         # Get the member who added the reaction
         guild: discord.Guild = self.bot.get_guild(payload.guild_id) or await self.bot.fetch_guild(payload.guild_id)
-        moderator: discord.Member = guild.get_member(payload.user_id) or await guild.fetch_member(payload.user_id)
+        moderator: discord.Member = payload.member or guild.get_member(payload.user_id) or await guild.fetch_member(payload.user_id)
         if moderator.bot:
             return
         if not localutils.checks.member_is_moderator(self.bot, moderator):
             return
 
-        # And FINALLY we can check their emoji
-        if payload.emoji.id and str(payload.emoji) not in [self.TICK_EMOJI, self.CROSS_EMOJI]:
-            return
-
         # Check what they reacted with
         verify = str(payload.emoji) == self.TICK_EMOJI
+        self.pending_verification_messages.discard(payload.message_id)
 
-        # Check whom and what we're updating
+        # Grab the channel and message
         try:
-            profile_user_id, template_id, profile_name = message.content.split('\n')[-1].split('/')
-        except ValueError:
-            profile_user_id, template_id = message.content.split('\n')[-1].split('/')
-            profile_name = 'default'
-        profile_user_id = int(profile_user_id)
+            channel: discord.TextChannel = self.bot.get_channel(payload.channel_id) or await self.bot.fetch_channel(payload.channel_id)
+        except discord.HTTPException:
+            return
+        message: discord.PartialMessage = channel.get_partial_message(payload.message_id)
 
         # Decide whether to verify or to delete
         user_profile = None
         template = None
         async with self.bot.database() as db:
-            template = await localutils.Template.fetch_template_by_id(db, template_id)
-            user_profile = await template.fetch_profile_for_user(db, profile_user_id, profile_name)
             if verify:
-                await db("UPDATE created_profile SET verified=true WHERE user_id=$1 AND template_id=$2 AND name=$3", profile_user_id, template_id, profile_name)
+                profile_rows = await db(localutils.queries.VERIFY_PROFILE_BY_MESSAGE, payload.message_id)
             else:
-                await db("DELETE FROM created_profile WHERE user_id=$1 AND template_id=$2 AND name=$3", profile_user_id, template_id, profile_name)
+                profile_rows = await db(localutils.queries.PENDING_PROFILE_BY_MESSAGE, payload.message_id)
+            if profile_rows:
+                template = await localutils.Template.fetch_template_by_id(db, profile_rows[0]['template_id'])
+                user_profile = localutils.UserProfile.from_record(profile_rows[0], template)
+                await user_profile.fetch_filled_fields(db)
+                if not verify:
+                    await db("DELETE FROM created_profile WHERE user_id=$1 AND template_id=$2 AND name=$3", user_profile.user_id, user_profile.template_id, user_profile.name)
+        if not verify and user_profile is not None:
+            await self.bot.get_cog("CacheInvalidation").invalidate_profile(user_profile.template_id, user_profile.user_id, user_profile.name)
 
         # See if we need to say anything
         if user_profile is None:
-            await message.delete()
+            try:
+                await message.delete()
+            except discord.HTTPException:
+                pass
             return
 
         # Gets a denial message from the denier
         denial_reason = "No reason provided."
         messages_to_delete = [message]
+        bot_message_ids = {message.id}
         if verify is False and moderator.permissions_in(channel).send_messages:
             denial_ask_message = await channel.send("Why was that profile denied?")
             messages_to_delete.append(denial_ask_message)
+            bot_message_ids.add(denial_ask_message.id)
             try:
-                check = lambda m: m.author.id == moderator.id and m.channel.id == channel.id and len(m.content) > 0
-                denial_message = await self.bot.wait_for('message', check=check, timeout=120)
+                denial_message = await self.bot.get_cog("Conversations").wait_for_message(channel, moderator, timeout=120, check=lambda m: len(m.content) > 0)
                 messages_to_delete.append(denial_message)
                 denial_reason = denial_message.content
             except asyncio.TimeoutError:
                 denial_reason = "No reason provided."
 
-        # Tell the user about the decision
-        try:
-            profile_user: discord.Member = guild.get_member(profile_user_id) or await guild.fetch_member(profile_user_id)
-        except discord.HTTPException:
-            profile_user = None
-        if profile_user:
-            try:
-                embed: localutils.Embed = user_profile.build_embed(self.bot, profile_user)
-                if verify:
-                    await profile_user.send(f"Your profile for **{user_profile.template.name}** (`{user_profile.name}`) on `{guild.name}` has been verified.", embed=embed)
-                else:
-                    await profile_user.send(f"Your profile for **{user_profile.template.name}** (`{user_profile.name}`) on `{guild.name}` has been denied with the reason `{denial_reason}`.", embed=embed)
-            except discord.HTTPException:
-                self.logger.info(f"Couldn't DM user {user_profile.user_id} about their '{user_profile.template.name}' profile verification on {guild.id}")
-                pass  # Can't send the user a DM, let's just ignore it
-
-        # Archive and add roles
-        if verify:
-
-            # Send the profile to the archive
-            try:
-                await self.send_profile_archivation(user_profile, profile_user)
-            except localutils.errors.TemplateArchiveChannelError:
-                pass
-
-            # Add the relevant role to the user
-            try:
-                await self.add_profile_user_roles(user_profile, profile_user)
-            except localutils.errors.TemplateRoleAddError:
-                pass
+        # Tell the user and archive it
+        await self.resolve_profile_verification(user_profile, guild, verify, denial_reason)
 
         # Delete relevant messages
-        messages_to_delete = [i for i in messages_to_delete if channel.permissions_for(guild.me).manage_messages or i.author.id == self.bot.user.id]
+        can_manage_messages = channel.permissions_for(guild.me).manage_messages
+        messages_to_delete = [i for i in messages_to_delete if can_manage_messages or i.id in bot_message_ids]
         if len(messages_to_delete) == 1:
             await messages_to_delete[0].delete()
         elif len(messages_to_delete) > 1:
             await channel.purge(check=lambda m: m.id in [i.id for i in messages_to_delete], bulk=channel.permissions_for(guild.me).manage_messages)
 
 
+    @utils.command()
+    @commands.has_guild_permissions(manage_roles=True)
+    @commands.bot_has_permissions(send_messages=True, embed_links=True, add_reactions=True)
+    @commands.guild_only()
+    async def pending(self, ctx:utils.Context, template:localutils.Template):
+        """
+        Lists the profiles for a template that are waiting to be verified.
+        """
+
+        # Set up our page getter
+        async def fetch_page(after, limit):
+            async with self.bot.database() as db:
+                return await template.fetch_pending_profiles(db, after=after, limit=limit)
+
+        def format_page(user_profiles, page_number):
+            embed = utils.Embed(title=f"Pending profiles for {template.name}", use_random_colour=True)
+            lines = []
+            for index, user_profile in enumerate(user_profiles, start=(page_number - 1) * self.PENDING_PER_PAGE + 1):
+                line = f"`{index}.` <@{user_profile.user_id}> - **{discord.utils.escape_markdown(user_profile.name)}**"
+                if user_profile.posted_channel_id and user_profile.posted_message_id:
+                    line += f" ([submission](https://discord.com/channels/{ctx.guild.id}/{user_profile.posted_channel_id}/{user_profile.posted_message_id}))"
+                lines.append(line)
+            embed.description = "\n".join(lines) or "There are no more pending profiles."
+            embed.set_footer(text=f"Page {page_number} // Use {ctx.clean_prefix}approvepending or {ctx.clean_prefix}denypending to verify them in bulk")
+            return embed
+
+        # And paginate
+        paginator = localutils.pagination.KeysetPaginator(
+            fetch_page,
+            lambda user_profile: (user_profile.user_id, user_profile.name),
+            format_page,
+            per_page=self.PENDING_PER_PAGE,
+        )
+        message = await paginator.start(ctx)
+        if message is None:
+            await ctx.send(f"There are no profiles waiting to be verified for template **{template.name}**.")
+
+    @utils.command()
+    @commands.has_guild_permissions(manage_roles=True)
+    @commands.bot_has_permissions(send_messages=True, external_emojis=True, add_reactions=True)
+    @commands.guild_only()
+    async def approvepending(self, ctx:utils.Context, template:localutils.Template, users:commands.Greedy[utils.converters.UserID]):
+        """
+        Verifies all of the pending profiles for a template, or just those of the given users.
+        """
+
+        await self.bulk_verify_profiles(ctx, template, users, True)
+
+    @utils.command()
+    @commands.has_guild_permissions(manage_roles=True)
+    @commands.bot_has_permissions(send_messages=True, external_emojis=True, add_reactions=True)
+    @commands.guild_only()
+    async def denypending(self, ctx:utils.Context, template:localutils.Template, users:commands.Greedy[utils.converters.UserID], *, reason:str="No reason provided."):
+        """
+        Denies all of the pending profiles for a template, or just those of the given users.
+        """
+
+        await self.bulk_verify_profiles(ctx, template, users, False, reason)
+
+    async def bulk_verify_profiles(self, ctx:utils.Context, template:localutils.Template, user_ids:typing.List[int], verify:bool, denial_reason:str="No reason provided.") -> None:
+        """
+        Verify or deny a template's pending profiles in bulk, after asking for confirmation.
+        The database is updated with a single statement, and then the verification messages are deleted and the owners
+        told about the decision through a bounded pool of workers, so that hundreds of profiles don't all hit the API at once.
+
+        Args:
+            ctx (utils.Context): The command invocation.
+            template (localutils.Template): The template whose profiles are being verified.
+            user_ids (typing.List[int]): The users whose profiles should be verified - all pending profiles if this is empty.
+            verify (bool): Whether to verify (rather than deny) the profiles.
+            denial_reason (str, optional): Why the profiles were denied.
+        """
+
+        # Grab the profiles that are pending right now - only these are acted on, so nothing submitted after the
+        # moderator confirms gets approved or denied without being seen
+        user_filter = localutils.queries.PENDING_PROFILE_KEYS_USER_FILTER if user_ids else ""
+        args = [template.template_id, list(user_ids)] if user_ids else [template.template_id]
+        async with self.bot.database() as db:
+            key_rows = await db(localutils.queries.PENDING_PROFILE_KEYS.format(user_filter=user_filter), *args)
+        pending_count = len(key_rows)
+        if pending_count == 0:
+            return await ctx.send(f"There are no matching profiles waiting to be verified for template **{template.name}**.")
+
+        # Ask for confirmation
+        action, past_action = ("verify", "verified") if verify else ("deny", "denied")
+        confirmation_message = await ctx.send(f"Are you sure you want to {action} **{pending_count}** pending profiles for template **{template.name}**?")
+        valid_reactions = [self.TICK_EMOJI, self.CROSS_EMOJI]
+        for e in valid_reactions:
+            try:
+                await confirmation_message.add_reaction(e)
+            except discord.HTTPException:
+                try:
+                    await confirmation_message.edit(content="I'm unable to add reactions to my messages.")
+                except discord.HTTPException:
+                    pass
+                return
+        try:
+            r = await self.bot.wait_for(
+                "raw_reaction_add", timeout=120.0,
+                check=lambda p: p.message_id == confirmation_message.id and str(p.emoji) in valid_reactions and p.user_id == ctx.author.id
+            )
+        except asyncio.TimeoutError:
+            try:
+                await ctx.send(f"Timed out waiting for confirmation - no profiles have been {past_action}.")
+            except discord.HTTPException:
+                pass
+            return
+        if str(r.emoji) == self.CROSS_EMOJI:
+            return await ctx.send(f"Got it, no profiles have been {past_action}.")
+
+        # Update them all in one go - only profiles that are still pending are returned, so none are handled twice
+        key_args = [template.template_id, [i['user_id'] for i in key_rows], [i['name'] for i in key_rows]]
+        async with self.bot.database() as db:
+            if verify:
+                profile_rows = await db(localutils.queries.BULK_VERIFY_PROFILES, *key_args)
+            else:
+                profile_rows = await db(localutils.queries.BULK_DENY_PROFILES, *key_args)
+            user_profiles = [localutils.UserProfile.from_record(i, template) for i in profile_rows]
+            await localutils.UserProfile.fetch_filled_fields_for_profiles(db, user_profiles, template)
+        for user_profile in user_profiles:
+            self.pending_verification_messages.discard(user_profile.posted_message_id)
+        if not verify:
+            invalidation = self.bot.get_cog("CacheInvalidation")
+            for user_profile in user_profiles:
+                await invalidation.invalidate_profile(user_profile.template_id, user_profile.user_id, user_profile.name)
+        progress_message = await ctx.send(f"{past_action.capitalize()} **{len(user_profiles)}** profiles - now letting their owners know...")
+
+        # Tell everyone about it
+        async def resolve(user_profile):
+            await self.delete_profile_submission(user_profile)
+            return await self.resolve_profile_verification(user_profile, ctx.guild, verify, denial_reason)
+        results = await localutils.concurrency.run_bounded(
+            [lambda user_profile=i: resolve(user_profile) for i in user_profiles],
+            concurrency=self.BULK_VERIFICATION_CONCURRENCY,
+        )
+        for user_profile, result in zip(user_profiles, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Couldn't resolve verification for {user_profile.user_id}/{user_profile.template_id}/{user_profile.name}", exc_info=result)
+        not_told = len([i for i in results if i is not True])
+        content = f"{past_action.capitalize()} **{len(user_profiles)}** profiles for template **{template.name}**."
+        if len(user_profiles) < pending_count:
+            content += f" {pending_count - len(user_profiles)} had already been verified or deleted."
+        if not_told:
+            content += f" {not_told} of their owners couldn't be sent a DM about it."
+        try:
+            await progress_message.edit(content=content)
+        except discord.HTTPException:
+            await ctx.send(content)
+
+
 def setup(bot:utils.Bot):
     x = ProfileVerification(bot)
     bot.add_cog(x)
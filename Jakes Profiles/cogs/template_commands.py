@@ -1,8 +1,10 @@
 import asyncio
+import io
 import string
+import tempfile
+import time
 import uuid
 import typing
-import collections
 
 import discord
 from discord.ext import commands
@@ -23,7 +25,17 @@ class ProfileTemplates(utils.Cog):
 
     def __init__(self, bot:utils.Bot):
         super().__init__(bot)
-        self.template_editing_locks: typing.Dict[int, asyncio.Lock] = collections.defaultdict(asyncio.Lock)  # guild_id: asyncio.Lock
+        self.template_editing_locks = localutils.locks.KeyedLock.from_bot("template_editing", bot)  # guild_id
+        self.running_exports: typing.Set[int] = set()  # guild_id
+
+    @utils.Cog.listener()
+    async def on_command_completion(self, ctx:utils.Context):
+        """
+        The prefix command writes a guild_settings row for the guild, so its cached settings need reloading.
+        """
+
+        if ctx.guild is not None and ctx.command.qualified_name == "prefix":
+            await self.bot.get_cog("CacheInvalidation").invalidate_guild_settings(ctx.guild.id)
 
     @staticmethod
     def is_valid_template_name(template_name):
@@ -43,12 +55,7 @@ class ProfileTemplates(utils.Cog):
 
         # Grab the templates
         async with self.bot.database() as db:
-            templates = await db(
-                """SELECT template.template_id, template.name, COUNT(created_profile.*) FROM template
-                LEFT JOIN created_profile ON template.template_id=created_profile.template_id
-                WHERE guild_id=$1 GROUP BY template.template_id""",
-                guild_id or ctx.guild.id
-            )
+            templates = await db(localutils.queries.TEMPLATES_WITH_PROFILE_COUNTS, guild_id or ctx.guild.id)
 
         if not templates:
             return await ctx.send("There are no created templates for this guild.")
@@ -62,11 +69,12 @@ class ProfileTemplates(utils.Cog):
         Describe a template and its fields.
         """
 
-        embed = template.build_embed(self.bot, brief=brief)
+        embeds = template.build_embeds(self.bot, brief=brief)
         async with self.bot.database() as db:
-            user_profiles = await template.fetch_all_profiles(db, fetch_filled_fields=False)
-        embed.description += f"\nCurrently there are **{len(user_profiles)}** created profiles for this template."
-        return await ctx.send(embed=embed)
+            profile_count_rows = await db(localutils.queries.PROFILE_COUNT_FOR_TEMPLATE, template.template_id)
+        embeds[0].description += f"\nCurrently there are **{profile_count_rows[0]['count']}** created profiles for this template."
+        for embed in embeds:
+            await ctx.send(embed=embed)
 
     async def purge_message_list(self, channel:discord.TextChannel, message_list:typing.List[discord.Message]):
         """
@@ -86,7 +94,7 @@ class ProfileTemplates(utils.Cog):
         """
 
         # See if they're already editing that template
-        if self.template_editing_locks[ctx.guild.id].locked():
+        if await self.template_editing_locks.locked(ctx.guild.id):
             return await ctx.send("You're already editing a template.")
 
         # See if they're bot support
@@ -98,13 +106,12 @@ class ProfileTemplates(utils.Cog):
             pass
 
         # Grab the template edit lock
-        async with self.template_editing_locks[ctx.guild.id]:
+        async with self.template_editing_locks(ctx.guild.id):
 
             # Get the template fields
             async with self.bot.database() as db:
                 await template.fetch_fields(db)
-                guild_settings_rows = await db("SELECT * FROM guild_settings WHERE guild_id=$1 OR guild_id=0 ORDER BY guild_id DESC", ctx.guild.id)
-            guild_settings = guild_settings_rows[0]
+                guild_settings = await localutils.GuildSettings.fetch(db, ctx.guild.id)
 
             # Set up our initial vars so we can edit them later
             template_display_edit_message = await ctx.send("Loading template...")
@@ -206,7 +213,7 @@ class ProfileTemplates(utils.Cog):
                     v = await ctx.send(f"What do you want to set the template's **{attr.replace('_', ' ')}** to?")
                 messages_to_delete.append(v)
                 try:
-                    value_message = await self.bot.wait_for("message", check=lambda m: m.author.id == ctx.author.id and m.channel.id == ctx.channel.id, timeout=120)
+                    value_message = await self.bot.get_cog("Conversations").wait_for_message(ctx.channel, ctx.author, timeout=120)
                 except asyncio.TimeoutError:
                     try:
                         return await ctx.send("Timed out waiting for edit response.")
@@ -253,9 +260,9 @@ class ProfileTemplates(utils.Cog):
                             AND template_id<>$3""",
                             ctx.guild.id, converted, template.template_id,
                         )
-                        if name_in_use:
-                            await ctx.send("That template name is already in use.", delete_after=3)
-                            continue
+                    if name_in_use:
+                        await ctx.send("That template name is already in use.", delete_after=3)
+                        continue
                     if 30 < len(converted) < 1:
                         await ctx.send("That template name is invalid - not within 1 and 30 characters in length.", delete_after=3)
                         continue
@@ -266,9 +273,9 @@ class ProfileTemplates(utils.Cog):
                         pass
                     else:
                         original_converted = converted
-                        converted = max([min([converted, guild_settings['max_template_profile_count']]), 0])
+                        converted = max([min([converted, guild_settings.max_template_profile_count]), 0])
                         if original_converted > converted:
-                            await ctx.send(f"Your max profile count has been set to **{guild_settings['max_template_profile_count']}** instead of **{original_converted}**.", delete_after=3)
+                            await ctx.send(f"Your max profile count has been set to **{guild_settings.max_template_profile_count}** instead of **{original_converted}**.", delete_after=3)
 
                 # Validate field count
                 if attr == 'max_field_count':
@@ -276,14 +283,18 @@ class ProfileTemplates(utils.Cog):
                         pass
                     else:
                         original_converted = converted
-                        converted = max([min([converted, guild_settings['max_template_field_count']]), 0])
+                        converted = max([min([converted, guild_settings.max_template_field_count]), 0])
                         if original_converted > converted:
-                            await ctx.send(f"Your max field count has been set to **{guild_settings['max_template_field_count']}** instead of **{original_converted}**.", delete_after=3)
+                            await ctx.send(f"Your max field count has been set to **{guild_settings.max_template_field_count}** instead of **{original_converted}**.", delete_after=3)
 
                 # Store our new shit
+                previous_name = template.name
                 setattr(template, attr, converted)
                 async with self.bot.database() as db:
                     await db("UPDATE template SET {0}=$1 WHERE template_id=$2".format(attr), converted, template.template_id)
+                invalidation = self.bot.get_cog("CacheInvalidation")
+                await invalidation.invalidate_template_names(ctx.guild.id, previous_name, template.name)
+                await invalidation.invalidate_template(template.template_id)
                 should_edit = True
 
         # Tell them it's done
@@ -298,7 +309,7 @@ class ProfileTemplates(utils.Cog):
             )
         )
 
-    async def edit_field(self, ctx:utils.Context, template:localutils.Template, guild_settings:dict, is_bot_support:bool) -> bool:
+    async def edit_field(self, ctx:utils.Context, template:localutils.Template, guild_settings:localutils.GuildSettings, is_bot_support:bool) -> bool:
         """
         Talk the user through editing a field of a template.
         Returns whether or not the template display needs to be updated.
@@ -307,7 +318,7 @@ class ProfileTemplates(utils.Cog):
         # Ask which index they want to edit
         if len(template.fields) == 0:
             ask_field_edit_message: discord.Message = await ctx.send("Now talking you through creating a new field.")
-        elif len(template.fields) >= max([guild_settings['max_template_field_count'], template.max_field_count]) and not is_bot_support:
+        elif len(template.fields) >= max([guild_settings.max_template_field_count, template.max_field_count]) and not is_bot_support:
             ask_field_edit_message: discord.Message = await ctx.send("What is the index of the field you want to edit?")
         else:
             ask_field_edit_message: discord.Message = await ctx.send("What is the index of the field you want to edit? If you want to add a *new* field, type **new**.")
@@ -319,7 +330,7 @@ class ProfileTemplates(utils.Cog):
             # Wait for them to say which field they want to edit
             if len(template.fields) > 0:
                 try:
-                    field_index_message: discord.Message = await self.bot.wait_for("message", check=lambda m: m.author.id == ctx.author.id and m.channel.id == ctx.channel.id, timeout=120)
+                    field_index_message: discord.Message = await self.bot.get_cog("Conversations").wait_for_message(ctx.channel, ctx.author, timeout=120)
                     messages_to_delete.append(field_index_message)
                 except asyncio.TimeoutError:
                     try:
@@ -341,8 +352,8 @@ class ProfileTemplates(utils.Cog):
 
                 # They want to create a new field
                 if len(template.fields) == 0 or field_index_message.content.lower() == "new":
-                    if len(template.fields) < max([guild_settings['max_template_field_count'], template.max_field_count]) or is_bot_support:
-                        image_field_exists: bool = any([i for i in template.fields.values() if isinstance(i.field_type, localutils.ImageField)])
+                    if len(template.fields) < max([guild_settings.max_template_field_count, template.max_field_count]) or is_bot_support:
+                        image_field_exists: bool = template.compiled.image_field is not None
                         self.bot.loop.create_task(self.purge_message_list(ctx.channel, messages_to_delete))
                         field: localutils.Field = await self.create_new_field(
                             ctx=ctx,
@@ -364,6 +375,7 @@ class ProfileTemplates(utils.Cog):
                             except asyncpg.ForeignKeyViolationError:
                                 # The template was deleted while it was being edited
                                 return True
+                        await self.bot.get_cog("CacheInvalidation").invalidate_template(template.template_id)
                         return True
 
                     # They want a new field but they're at the max
@@ -465,8 +477,7 @@ class ProfileTemplates(utils.Cog):
 
                 # Ask the user for some content
                 try:
-                    check = lambda m: m.author.id == ctx.author.id and m.channel.id == ctx.channel.id
-                    field_value_message = await self.bot.wait_for("message", check=check, timeout=120)
+                    field_value_message = await self.bot.get_cog("Conversations").wait_for_message(ctx.channel, ctx.author, timeout=120)
                     messages_to_delete.append(field_value_message)
                     field_value = value_converter(field_value_message.content)
 
@@ -501,6 +512,7 @@ class ProfileTemplates(utils.Cog):
                 await db("UPDATE field SET {0}=$2 WHERE field_id=$1".format(attr), field_to_edit.field_id, field_value)
             else:
                 await db("UPDATE field SET deleted=true WHERE field_id=$1", field_to_edit.field_id)
+        await self.bot.get_cog("CacheInvalidation").invalidate_template(template.template_id)
 
         # And done
         self.bot.loop.create_task(self.purge_message_list(ctx.channel, messages_to_delete))
@@ -516,11 +528,11 @@ class ProfileTemplates(utils.Cog):
         """
 
         # See if they're already editing that template
-        if self.template_editing_locks[ctx.guild.id].locked():
+        if await self.template_editing_locks.locked(ctx.guild.id):
             return await ctx.send("You're already editing a template.")
 
         # Grab the template edit lock
-        async with self.template_editing_locks[ctx.guild.id]:
+        async with self.template_editing_locks(ctx.guild.id):
 
             # Ask for confirmation
             delete_confirmation_message = await ctx.send("By doing this, you'll delete all of the created profiles under this template as well. Would you like to proceed?")
@@ -553,9 +565,194 @@ class ProfileTemplates(utils.Cog):
             # Delete it from the database
             async with self.bot.database() as db:
                 await db("DELETE FROM template WHERE template_id=$1", template.template_id)
+            invalidation = self.bot.get_cog("CacheInvalidation")
+            await invalidation.invalidate_template_names(ctx.guild.id, template.name)
+            await invalidation.invalidate_template(template.template_id)
             self.logger.info(f"Template '{template.name}' deleted on guild {ctx.guild.id}")
             await ctx.send(f"All relevant data for template **{template.name}** (`{template.template_id}`) has been deleted.")
 
+    @utils.command()
+    @commands.has_guild_permissions(manage_roles=True)
+    @commands.bot_has_permissions(send_messages=True, attach_files=True)
+    @commands.guild_only()
+    async def exporttemplate(self, ctx:utils.Context, template:localutils.Template, file_format:str="ndjson"):
+        """
+        Exports all of the profiles for one of your templates as an NDJSON or CSV file.
+        """
+
+        # Check the format
+        file_format = file_format.lower()
+        if file_format not in localutils.Template.EXPORT_FORMATS:
+            return await ctx.send(f"The export format can only be one of {', '.join([f'`{i}`' for i in localutils.Template.EXPORT_FORMATS])}.")
+
+        # Only let one export run per guild at a time
+        if ctx.guild.id in self.running_exports:
+            return await ctx.send("There's already an export running for this server - please wait for it to finish.")
+        self.running_exports.add(ctx.guild.id)
+
+        # Run it in the background so the command isn't held up for big templates
+        try:
+            progress_message = await ctx.send(f"Started exporting the profiles for template **{template.name}**...")
+        except discord.HTTPException:
+            self.running_exports.discard(ctx.guild.id)
+            raise
+        self.bot.loop.create_task(self.run_template_export(ctx, template, file_format, progress_message))
+
+    async def run_template_export(self, ctx:utils.Context, template:localutils.Template, file_format:str, progress_message:discord.Message):
+        """
+        Write a template's profiles to a temporary file and upload it once it's done, editing the progress message as it goes.
+        Progress edits are scheduled rather than awaited so that the database cursor is never waiting on Discord.
+        """
+
+        last_progress_edit = 0.0
+
+        def on_progress(written:int):
+            nonlocal last_progress_edit
+            if time.monotonic() - last_progress_edit < 5:
+                return
+            last_progress_edit = time.monotonic()
+            self.bot.loop.create_task(self.edit_export_progress(progress_message, f"Exporting the profiles for template **{template.name}** - {written}/{total} done..."))
+
+        try:
+
+            # Write the profiles to a file on disk rather than into memory
+            with tempfile.TemporaryFile() as fp:
+                text_fp = io.TextIOWrapper(fp, encoding="utf-8", newline="")
+                async with self.bot.database() as db:
+                    count_rows = await db(localutils.queries.PROFILE_COUNT_FOR_TEMPLATE, template.template_id)
+                    total = count_rows[0]['count']
+                    written = await template.export_profiles(db, text_fp, file_format=file_format, on_progress=on_progress)
+                text_fp.detach()
+
+                # Upload the file
+                file_size = fp.tell()
+                if file_size > ctx.guild.filesize_limit:
+                    return await self.edit_export_progress(progress_message, f"The export for template **{template.name}** is too large to upload to this server ({file_size:,} bytes).")
+                fp.seek(0)
+                await ctx.send(
+                    f"Exported {written} profiles for template **{template.name}**.",
+                    file=discord.File(fp, filename=f"{template.name}.{file_format}"),
+                )
+                await self.edit_export_progress(progress_message, f"Finished exporting the profiles for template **{template.name}**.")
+
+        except discord.HTTPException:
+            await self.edit_export_progress(progress_message, f"I couldn't upload the export for template **{template.name}**.")
+        except Exception as e:
+            self.logger.error(f"Export of template {template.template_id} failed", exc_info=e)
+            await self.edit_export_progress(progress_message, f"Something went wrong exporting the profiles for template **{template.name}**.")
+        finally:
+            self.running_exports.discard(ctx.guild.id)
+
+    @staticmethod
+    async def edit_export_progress(message:discord.Message, content:str):
+        try:
+            await message.edit(content=content)
+        except discord.HTTPException:
+            pass
+
+    @utils.command()
+    @commands.has_guild_permissions(manage_roles=True)
+    @commands.bot_has_permissions(send_messages=True, attach_files=True)
+    @commands.guild_only()
+    async def downloadtemplate(self, ctx:utils.Context, template:localutils.Template, file_format:str="json"):
+        """
+        Gives you one of your templates as a JSON or TOML document that can be edited and loaded back with the uploadtemplate command.
+        """
+
+        file_format = file_format.lower()
+        if file_format not in localutils.TemplateDocument.FORMATS:
+            return await ctx.send(f"The document format can only be one of {', '.join([f'`{i}`' for i in localutils.TemplateDocument.FORMATS])}.")
+        document = localutils.TemplateDocument.from_template(template)
+        await ctx.send(
+            f"Here's the document for template **{template.name}** - you can edit it and load it back in with `{ctx.clean_prefix}uploadtemplate`.",
+            file=discord.File(io.BytesIO(document.dumps(file_format).encode()), filename=f"{template.name}.{file_format}"),
+        )
+
+    @utils.command()
+    @commands.has_guild_permissions(manage_roles=True)
+    @commands.bot_has_permissions(send_messages=True)
+    @commands.guild_only()
+    async def uploadtemplate(self, ctx:utils.Context, *, document:str=None):
+        """
+        Creates or overwrites a template from a JSON or TOML document, given as an attachment or in a code block.
+        If there's already a template with the document's name then it's overwritten, keeping the profile data of any fields whose names match.
+        """
+
+        # Grab the text of the document
+        file_format = None
+        if ctx.message.attachments:
+            attachment = ctx.message.attachments[0]
+            if attachment.size > 100_000:
+                return await ctx.send("That document is too large.")
+            extension = attachment.filename.rsplit(".", 1)[-1].lower()
+            file_format = extension if extension in localutils.TemplateDocument.FORMATS else None
+            try:
+                document = (await attachment.read()).decode()
+            except UnicodeDecodeError:
+                return await ctx.send("That document isn't a text file.")
+            except discord.HTTPException:
+                return await ctx.send("I couldn't download that document - please try again later.")
+        if not document:
+            return await ctx.send(f"You need to give a template document, either as an attachment or in a code block - you can get one for an existing template with `{ctx.clean_prefix}downloadtemplate`.")
+        code_block = localutils.TemplateDocument.CODE_BLOCK_REGEX.search(document)
+        if code_block:
+            document = code_block.group("content")
+            if code_block.group("language") in localutils.TemplateDocument.FORMATS:
+                file_format = code_block.group("language")
+
+        # See if they're bot support
+        is_bot_support = False
+        try:
+            await utils.checks.is_bot_support().predicate(ctx)
+            is_bot_support = True
+        except commands.CommandError:
+            pass
+
+        # Check the document before we touch anything
+        document = localutils.TemplateDocument.loads(document, file_format)
+        if await self.template_editing_locks.locked(ctx.guild.id):
+            return await ctx.send("You're already editing a template.")
+        async with self.template_editing_locks(ctx.guild.id):
+            failure_message = None
+            async with self.bot.database() as db:
+                guild_settings = await localutils.GuildSettings.fetch(db, ctx.guild.id)
+                template = await localutils.Template.fetch_template_by_name(db, ctx.guild.id, document.name, fetch_fields=False)
+                if template is None:
+                    template_list = await db(localutils.queries.TEMPLATE_IDS_FOR_GUILD, ctx.guild.id)
+                    if len(template_list) >= guild_settings.max_template_count:
+                        failure_message = f"You already have {guild_settings.max_template_count} templates set for this server, which is the maximum number allowed."
+                if failure_message is None:
+                    problems = document.get_guild_problems(ctx.guild, guild_settings, template, is_bot_support=is_bot_support)
+                    if problems:
+                        raise localutils.errors.TemplateDocumentError(problems)
+
+                    # Save it all in one go
+                    try:
+                        template_id, _ = await document.apply(db, ctx.guild.id, template.template_id if template else None)
+                    except asyncpg.UniqueViolationError:
+                        failure_message = f"This server already has a template with name **{document.name}**."
+                    except asyncpg.ForeignKeyViolationError:
+                        failure_message = "That template was deleted while it was being overwritten."
+
+            # Tell them if it didn't work, now the connection's been given back
+            if failure_message is not None:
+                return await ctx.send(failure_message)
+
+            # Clear out the caches
+            invalidation = self.bot.get_cog("CacheInvalidation")
+            await invalidation.invalidate_template_names(ctx.guild.id, document.name, template.name if template else None)
+            await invalidation.invalidate_template(template_id)
+
+        # Tell them it's done
+        self.logger.info(f"Template '{document.name}' {'overwritten' if template else 'created'} from a document on guild {ctx.guild.id}")
+        await ctx.send(
+            (
+                f"{'Updated' if template else 'Created'} template **{document.name}** with {len(document.fields)} fields. Users can create profiles with "
+                f"`{ctx.clean_prefix}set{document.name.lower()}`, edit with `{ctx.clean_prefix}edit{document.name.lower()}`, "
+                f"and show them with `{ctx.clean_prefix}get{document.name.lower()}`."
+            )
+        )
+
     @utils.command()
     @commands.has_guild_permissions(manage_roles=True)
     @commands.bot_has_permissions(send_messages=True, manage_messages=True, external_emojis=True, add_reactions=True, embed_links=True)
@@ -566,18 +763,18 @@ class ProfileTemplates(utils.Cog):
         """
 
         # Only allow them to make one template at once
-        if self.template_editing_locks[ctx.guild.id].locked():
+        if await self.template_editing_locks.locked(ctx.guild.id):
             return await ctx.send("You're already creating a template.")
 
         # See if they have too many templates already
         async with self.bot.database() as db:
-            template_list = await db("SELECT template_id FROM template WHERE guild_id=$1", ctx.guild.id)
-            guild_settings = await db("SELECT * FROM guild_settings WHERE guild_id=$1 OR guild_id=0 ORDER BY guild_id DESC", ctx.guild.id)
-        if len(template_list) >= guild_settings[0]['max_template_count']:
-            return await ctx.send(f"You already have {guild_settings[0]['max_template_count']} templates set for this server, which is the maximum number allowed.")
+            template_list = await db(localutils.queries.TEMPLATE_IDS_FOR_GUILD, ctx.guild.id)
+            guild_settings = await localutils.GuildSettings.fetch(db, ctx.guild.id)
+        if len(template_list) >= guild_settings.max_template_count:
+            return await ctx.send(f"You already have {guild_settings.max_template_count} templates set for this server, which is the maximum number allowed.")
 
         # And now we start creating the template itself
-        async with self.template_editing_locks[ctx.guild.id]:
+        async with self.template_editing_locks(ctx.guild.id):
 
             # Send the flavour text behind getting a template name
             if template_name is None:
@@ -589,7 +786,7 @@ class ProfileTemplates(utils.Cog):
                 # Get message
                 if template_name is None:
                     try:
-                        name_message = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author and m.channel == ctx.channel, timeout=120)
+                        name_message = await self.bot.get_cog("Conversations").wait_for_message(ctx.channel, ctx.author, timeout=120)
 
                     # Catch timeout
                     except asyncio.TimeoutError:
@@ -613,7 +810,7 @@ class ProfileTemplates(utils.Cog):
 
                 # Check name is unique
                 async with self.bot.database() as db:
-                    template_exists = await db("SELECT * FROM template WHERE guild_id=$1 AND LOWER(name)=LOWER($2)", ctx.guild.id, template_name)
+                    template_exists = await db(localutils.queries.TEMPLATE_BY_NAME, ctx.guild.id, template_name)
                 if template_exists:
                     await ctx.send(f"This server already has a template with name **{template_name}**. Please run this command again to provide another one.")
                     return
@@ -639,6 +836,7 @@ class ProfileTemplates(utils.Cog):
                 VALUES ($1, $2, $3, $4, $5, $6)""",
                 template.template_id, template.name, template.colour, template.guild_id, template.verification_channel_id, template.archive_channel_id
             )
+        await self.bot.get_cog("CacheInvalidation").invalidate_template_names(ctx.guild.id, template.name)
 
         # Output to user
         self.logger.info(f"New template '{template.name}' created on guild {ctx.guild.id}")
@@ -650,7 +848,6 @@ class ProfileTemplates(utils.Cog):
         """
 
         # Here are some things we can use later
-        message_check = lambda m: m.author == ctx.author and m.channel == ctx.channel
         okay_reaction_check = lambda p: str(p.emoji) in prompt_emoji and p.user_id == ctx.author.id
         prompt_emoji = [self.TICK_EMOJI, self.CROSS_EMOJI]
         messages_to_delete = []
@@ -690,7 +887,7 @@ class ProfileTemplates(utils.Cog):
         messages_to_delete.append(v)
         while True:
             try:
-                field_name_message = await self.bot.wait_for('message', check=message_check, timeout=120)
+                field_name_message = await self.bot.get_cog("Conversations").wait_for_message(ctx.channel, ctx.author, timeout=120)
                 messages_to_delete.append(field_name_message)
             except asyncio.TimeoutError:
                 try:
@@ -712,7 +909,7 @@ class ProfileTemplates(utils.Cog):
         messages_to_delete.append(v)
         while True:
             try:
-                field_prompt_message = await self.bot.wait_for('message', check=message_check, timeout=120)
+                field_prompt_message = await self.bot.get_cog("Conversations").wait_for_message(ctx.channel, ctx.author, timeout=120)
                 messages_to_delete.append(field_prompt_message)
             except asyncio.TimeoutError:
                 try:
@@ -727,7 +924,7 @@ class ProfileTemplates(utils.Cog):
                 v = await ctx.send("You need to actually give text for the prompt :/")
                 messages_to_delete.append(v)
         field_prompt = field_prompt_message.content
-        prompt_is_command = bool(localutils.CommandProcessor.COMMAND_REGEX.search(field_prompt))
+        prompt_is_command = localutils.CommandProcessor.is_command(field_prompt)
 
         # If it's a command, then we don't need to deal with this
         if not prompt_is_command:
@@ -749,7 +946,7 @@ class ProfileTemplates(utils.Cog):
             messages_to_delete.append(v)
             while True:
                 try:
-                    field_timeout_message = await self.bot.wait_for('message', check=message_check, timeout=120)
+                    field_timeout_message = await self.bot.get_cog("Conversations").wait_for_message(ctx.channel, ctx.author, timeout=120)
                     messages_to_delete.append(field_timeout_message)
                 except asyncio.TimeoutError:
                     await ctx.send("Creating a new field has timed out. The profile is being created with the fields currently added.")
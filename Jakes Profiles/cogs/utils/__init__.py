@@ -1,8 +1,13 @@
 # flake8: noqa
-from cogs.utils import checks, errors
+from cogs.utils import checks, errors, cache, queries, migrations, locks, database_instrumentation, invalidation, pagination, concurrency
+from cogs.utils.guild_settings import GuildSettings
 from cogs.utils.profiles.field import Field
 from cogs.utils.profiles.field_type import FieldType, TextField, NumberField, ImageField
 from cogs.utils.profiles.template import Template
+from cogs.utils.profiles.compiled_template import CompiledTemplate, CompiledField
+from cogs.utils.profiles.template_document import TemplateDocument, FieldDocument
 from cogs.utils.profiles.user_profile import UserProfile
 from cogs.utils.profiles.filled_field import FilledField
 from cogs.utils.profiles.command_processor import CommandProcessor
+from cogs.utils.conversations import ConversationRouter
+from cogs.utils.profiles.profile_draft import ProfileDraft
@@ -0,0 +1,90 @@
+import collections
+import time
+import typing
+
+
+class TimedLRUCache(object):
+    """
+    A small in-process cache with both a TTL and an LRU size bound.
+    Stored values may be None, so lookups that miss return the given default (which is
+    `TimedLRUCache.MISSING` unless otherwise specified) rather than None.
+
+    Args:
+        max_size (int): The maximum number of items that the cache will hold before evicting the least recently used.
+        ttl (float): The number of seconds that an item is valid for after being set.
+        on_evict (typing.Callable, optional): Called with the key of each item that expires or is pushed out by the size
+            bound - items that are explicitly popped or cleared don't trigger it.
+    """
+
+    MISSING = object()
+
+    __slots__ = ("max_size", "ttl", "on_evict", "_items", "hits", "misses")
+
+    def __init__(self, max_size:int=1_000, ttl:float=300.0, *, on_evict:typing.Callable[[typing.Hashable], typing.Any]=None):
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.on_evict = on_evict
+        self._items: typing.Dict[typing.Hashable, typing.Tuple[float, typing.Any]] = collections.OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return self.get(key, self.MISSING) is not self.MISSING
+
+    def get(self, key:typing.Hashable, default:typing.Any=MISSING) -> typing.Any:
+        """
+        Get an item from the cache, or return the default if it isn't there or has expired.
+        """
+
+        try:
+            expires_at, value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        if expires_at < time.monotonic():
+            del self._items[key]
+            if self.on_evict is not None:
+                self.on_evict(key)
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key:typing.Hashable, value:typing.Any) -> None:
+        """
+        Store an item in the cache, evicting the least recently used items if we're at capacity.
+        """
+
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            evicted_key, _ = self._items.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted_key)
+
+    def pop(self, key:typing.Hashable, default:typing.Any=None) -> typing.Any:
+        """
+        Remove an item from the cache, returning its value.
+        """
+
+        try:
+            return self._items.pop(key)[1]
+        except KeyError:
+            return default
+
+    def pop_where(self, predicate:typing.Callable[[typing.Hashable], bool]) -> int:
+        """
+        Remove every item whose key matches the given predicate, returning how many were removed.
+        """
+
+        to_remove = [i for i in self._items if predicate(i)]
+        for i in to_remove:
+            del self._items[i]
+        return len(to_remove)
+
+    def clear(self) -> None:
+        self._items.clear()
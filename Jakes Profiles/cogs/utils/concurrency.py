@@ -0,0 +1,30 @@
+import asyncio
+import typing
+
+
+async def run_bounded(jobs:typing.Iterable[typing.Callable[[], typing.Awaitable]], *, concurrency:int=5) -> typing.List[typing.Any]:
+    """
+    Run a set of coroutine functions with at most a given number of them running at once.
+    Jobs are pulled from the iterable by a fixed pool of workers as earlier ones finish, so a long list
+    of jobs doesn't make a task per job up front. A job that raises doesn't stop the others.
+
+    Args:
+        jobs (typing.Iterable[typing.Callable[[], typing.Awaitable]]): The coroutine functions to run.
+        concurrency (int, optional): How many jobs can run at once.
+
+    Returns:
+        typing.List[typing.Any]: The result of each job in the order they were given - or the exception it raised.
+    """
+
+    job_iterator = enumerate(jobs)
+    results: typing.Dict[int, typing.Any] = dict()
+
+    async def worker():
+        for index, job in job_iterator:
+            try:
+                results[index] = await job()
+            except Exception as e:
+                results[index] = e
+
+    await asyncio.gather(*[worker() for _ in range(max(concurrency, 1))])
+    return [results[i] for i in range(len(results))]
@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+import itertools
+import typing
+
+import discord
+
+
+class ConversationWaiter(object):
+    """
+    A single conversation waiting on the next message from a given author in a given channel.
+
+    Args:
+        key (typing.Tuple[int, int]): The (channel_id, author_id) pair that's being waited on.
+        future (asyncio.Future): The future that will be given the message.
+        deadline (float): The loop time at which the waiter will time out.
+        check (typing.Callable[[discord.Message], bool], optional): An additional check that the message must pass.
+    """
+
+    __slots__ = ("key", "future", "deadline", "check")
+
+    def __init__(self, key:typing.Tuple[int, int], future:asyncio.Future, deadline:float, check:typing.Callable[[discord.Message], bool]=None):
+        self.key: typing.Tuple[int, int] = key
+        self.future: asyncio.Future = future
+        self.deadline: float = deadline
+        self.check: typing.Optional[typing.Callable[[discord.Message], bool]] = check
+
+
+class ConversationRouter(object):
+    """
+    Routes incoming messages to the conversations that are waiting on them.
+
+    Unlike `Bot.wait_for`, which runs every pending check against every incoming message, waiters are
+    stored by (channel_id, author_id) so routing a message is a single dict lookup. All timeouts are
+    kept in one heap, with a single timer handle scheduled for the earliest deadline.
+    """
+
+    def __init__(self):
+        self.waiters: typing.Dict[typing.Tuple[int, int], typing.List[ConversationWaiter]] = dict()
+        self._deadlines: typing.List[typing.Tuple[float, int, ConversationWaiter]] = list()
+        self._counter = itertools.count()
+        self._timer: typing.Optional[asyncio.TimerHandle] = None
+        self._timer_deadline: typing.Optional[float] = None
+
+    def __len__(self):
+        return sum([len(i) for i in self.waiters.values()])
+
+    async def wait_for_message(self, channel_id:int, author_id:int, *, timeout:float, check:typing.Callable[[discord.Message], bool]=None) -> discord.Message:
+        """
+        Wait for the next message from a given author in a given channel.
+
+        Args:
+            channel_id (int): The ID of the channel to wait for a message in.
+            author_id (int): The ID of the user to wait for a message from.
+            timeout (float): How long to wait for the message, in seconds.
+            check (typing.Callable[[discord.Message], bool], optional): An additional check that the message must pass.
+
+        Returns:
+            discord.Message: The message that was sent.
+
+        Raises:
+            asyncio.TimeoutError: No message was received before the timeout.
+        """
+
+        loop = asyncio.get_event_loop()
+        key = (channel_id, author_id)
+        waiter = ConversationWaiter(key, loop.create_future(), loop.time() + timeout, check)
+        self.waiters.setdefault(key, list()).append(waiter)
+        heapq.heappush(self._deadlines, (waiter.deadline, next(self._counter), waiter))
+        self._schedule_timer(loop)
+        try:
+            return await waiter.future
+        finally:
+            self._remove_waiter(waiter)
+
+    def dispatch(self, message:discord.Message) -> bool:
+        """
+        Give a message to every conversation waiting on it. Returns whether or not any conversation took the message.
+        """
+
+        waiters = self.waiters.get((message.channel.id, message.author.id))
+        if not waiters:
+            return False
+        handled = False
+        for waiter in list(waiters):
+            if waiter.future.done():
+                continue
+            try:
+                if waiter.check is not None and not waiter.check(message):
+                    continue
+            except Exception as e:
+                waiter.future.set_exception(e)
+                continue
+            waiter.future.set_result(message)
+            handled = True
+        return handled
+
+    def _remove_waiter(self, waiter:ConversationWaiter) -> None:
+        waiters = self.waiters.get(waiter.key)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
+        if not waiters:
+            del self.waiters[waiter.key]
+
+    def _schedule_timer(self, loop:asyncio.AbstractEventLoop) -> None:
+        """
+        Make sure that the timer handle fires at the earliest deadline in the heap.
+        """
+
+        if not self._deadlines:
+            return
+        earliest = self._deadlines[0][0]
+        if self._timer is not None and self._timer_deadline <= earliest:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(earliest, self._expire_waiters, loop)
+        self._timer_deadline = earliest
+
+    def _expire_waiters(self, loop:asyncio.AbstractEventLoop) -> None:
+        """
+        Time out every waiter whose deadline has passed, and reschedule the timer for the next one.
+        """
+
+        self._timer = None
+        self._timer_deadline = None
+        now = loop.time()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, waiter = heapq.heappop(self._deadlines)
+            if not waiter.future.done():
+                waiter.future.set_exception(asyncio.TimeoutError())
+        self._schedule_timer(loop)
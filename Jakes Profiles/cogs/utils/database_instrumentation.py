@@ -0,0 +1,243 @@
+import asyncio
+import contextvars
+import datetime
+import logging
+import sys
+import time
+import typing
+import uuid
+
+
+logger = logging.getLogger("profilebot.database")
+
+
+class HeldConnection(object):
+    """
+    A database connection that's currently checked out, and the blocking calls made while it's held.
+
+    Args:
+        site (str): Where the connection was checked out.
+        task (asyncio.Task): The task that checked out the connection.
+    """
+
+    __slots__ = ("site", "task", "acquired_at", "blocking_calls")
+
+    def __init__(self, site:str, task:typing.Optional[asyncio.Task]):
+        self.site: str = site
+        self.task: typing.Optional[asyncio.Task] = task
+        self.acquired_at: float = time.perf_counter()
+        self.blocking_calls: typing.List[str] = list()
+
+
+# The connections held by the current task, outermost first
+held_connections: contextvars.ContextVar[typing.Tuple[HeldConnection, ...]] = contextvars.ContextVar("held_connections", default=())
+
+
+def warn_if_connection_held(operation:str) -> None:
+    """
+    Warn if the current task is about to make a blocking call (eg to the Discord API, or waiting
+    for user input) while it's holding a database connection.
+    Tasks spawned inside of a connection block inherit the held connections, so only the task that
+    actually checked the connection out is checked.
+    """
+
+    held = held_connections.get()
+    if not held:
+        return
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    for connection in held:
+        if connection.task is not task:
+            continue
+        connection.blocking_calls.append(operation)
+        logger.warning(f"{operation} called while holding a database connection checked out at {connection.site}")
+
+
+def get_call_site(frame) -> str:
+    """
+    Name a query's call site after the module and function that issued it, eg `template.fetch_fields`.
+    """
+
+    module = frame.f_globals.get("__name__", "unknown").rsplit(".", 1)[-1]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+def redact_parameter(value) -> str:
+    """
+    Describe a query parameter without giving away its value.
+    """
+
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "<bool>"
+    if isinstance(value, (str, bytes, list, tuple, set, frozenset)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    if isinstance(value, (int, float, uuid.UUID, datetime.datetime, datetime.timedelta)):
+        return f"<{type(value).__name__}>"
+    return "<redacted>"
+
+
+class QueryRecorder(object):
+    """
+    Collects the latency and returned row count of each query by its call site, and how long connections
+    are held by where they were checked out, until they're flushed to statsd.
+    Samples are capped per call site between flushes so that a busy site can't grow the buffer without bound.
+
+    Args:
+        slow_query_threshold (float): Queries that take longer than this many milliseconds are logged.
+        explain_slow_queries (bool): Whether or not to log the EXPLAIN ANALYZE output for slow SELECT queries.
+        explain_cooldown (float): The minimum number of seconds between EXPLAINs for the same call site.
+        long_hold_threshold (float): Connections held for longer than this many milliseconds are logged.
+        max_samples_per_site (int): How many samples to keep for each call site between flushes.
+    """
+
+    def __init__(self, *, slow_query_threshold:float=250, explain_slow_queries:bool=False, explain_cooldown:float=600, long_hold_threshold:float=1_000, max_samples_per_site:int=1_000):
+        self.slow_query_threshold: float = slow_query_threshold
+        self.explain_slow_queries: bool = explain_slow_queries
+        self.explain_cooldown: float = explain_cooldown
+        self.long_hold_threshold: float = long_hold_threshold
+        self.max_samples_per_site: int = max_samples_per_site
+        self.samples: typing.Dict[str, typing.List[typing.Tuple[float, int]]] = dict()  # site: [(milliseconds, rows)]
+        self.hold_samples: typing.Dict[str, typing.List[float]] = dict()  # site: [milliseconds]
+        self.dropped_samples: int = 0
+        self.last_explained: typing.Dict[str, float] = dict()
+
+    def record(self, site:str, duration:float, rows:int) -> None:
+        site_samples = self.samples.setdefault(site, list())
+        if len(site_samples) >= self.max_samples_per_site:
+            self.dropped_samples += 1
+            return
+        site_samples.append((duration, rows))
+
+    def record_hold(self, site:str, duration:float) -> None:
+        site_samples = self.hold_samples.setdefault(site, list())
+        if len(site_samples) >= self.max_samples_per_site:
+            self.dropped_samples += 1
+            return
+        site_samples.append(duration)
+
+    def pop_samples(self) -> typing.Dict[str, typing.List[typing.Tuple[float, int]]]:
+        samples, self.samples = self.samples, dict()
+        return samples
+
+    def pop_hold_samples(self) -> typing.Dict[str, typing.List[float]]:
+        samples, self.hold_samples = self.hold_samples, dict()
+        return samples
+
+    def should_explain(self, site:str, sql:str) -> bool:
+        """
+        Only plain SELECTs are explained, since EXPLAIN ANALYZE actually runs the query.
+        """
+
+        if not self.explain_slow_queries or not sql.lstrip().upper().startswith("SELECT"):
+            return False
+        now = time.monotonic()
+        if now - self.last_explained.get(site, -self.explain_cooldown) < self.explain_cooldown:
+            return False
+        self.last_explained[site] = now
+        return True
+
+
+class InstrumentedConnection(object):
+    """
+    Wraps a `DatabaseConnection` so that each query is timed and attributed to its call site.
+    """
+
+    def __init__(self, connection, database:'InstrumentedDatabase'):
+        self.connection = connection
+        self.database: InstrumentedDatabase = database
+
+    @property
+    def conn(self):
+        return self.connection.conn
+
+    def __call__(self, sql:str, *args) -> typing.Awaitable[list]:
+        # The call site is grabbed here rather than in the coroutine, while the caller is still the frame above
+        return self._run(get_call_site(sys._getframe(1)), sql, *args)
+
+    async def _run(self, site:str, sql:str, *args) -> list:
+        start = time.perf_counter()
+        rows = await self.connection(sql, *args)
+        duration = (time.perf_counter() - start) * 1_000
+        self.database.recorder.record(site, duration, len(rows) if rows is not None else 0)
+        if duration >= self.database.recorder.slow_query_threshold:
+            self.database.log_slow_query(site, sql, args, duration)
+        return rows
+
+    def __getattr__(self, item):
+        return getattr(self.connection, item)
+
+
+class InstrumentedDatabase(object):
+    """
+    A drop-in replacement for `bot.database` that hands out instrumented connections.
+
+    Args:
+        database (typing.Callable): The database connection factory being wrapped, eg the original `bot.database`.
+        recorder (QueryRecorder): Where the query timings are stored.
+    """
+
+    def __init__(self, database:typing.Callable, recorder:QueryRecorder):
+        self.database: typing.Callable = database
+        self.recorder: QueryRecorder = recorder
+
+    def __call__(self, *args, **kwargs) -> '_InstrumentedAcquire':
+        return _InstrumentedAcquire(self, self.database(*args, **kwargs))
+
+    def __getattr__(self, item):
+        return getattr(self.database, item)
+
+    def log_slow_query(self, site:str, sql:str, args:tuple, duration:float) -> None:
+        query = " ".join(sql.split())
+        parameters = ", ".join([redact_parameter(i) for i in args])
+        logger.warning(f"Slow query at {site} took {duration:.1f}ms - {query} [{parameters}]")
+        if self.recorder.should_explain(site, sql):
+            asyncio.ensure_future(self.explain_query(site, sql, args))
+
+    async def explain_query(self, site:str, sql:str, args:tuple) -> None:
+        """
+        Log the EXPLAIN ANALYZE output of a slow query, using a separate connection so the caller isn't held up.
+        """
+
+        try:
+            async with self.database() as db:
+                rows = await db(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", *args)
+        except Exception as e:
+            logger.warning(f"Couldn't explain slow query at {site} - {e}")
+            return
+        plan = "\n".join([i["QUERY PLAN"] for i in rows])
+        logger.warning(f"Query plan for slow query at {site}:\n{plan}")
+
+
+class _InstrumentedAcquire(object):
+
+    def __init__(self, database:InstrumentedDatabase, context):
+        self.database: InstrumentedDatabase = database
+        self.context = context
+        self.held: typing.Optional[HeldConnection] = None
+        self.token: typing.Optional[contextvars.Token] = None
+
+    async def __aenter__(self) -> InstrumentedConnection:
+        site = get_call_site(sys._getframe(1))
+        connection = await self.context.__aenter__()
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        self.held = HeldConnection(site, task)
+        self.token = held_connections.set(held_connections.get() + (self.held,))
+        return InstrumentedConnection(connection, self.database)
+
+    async def __aexit__(self, *args):
+        try:
+            return await self.context.__aexit__(*args)
+        finally:
+            held_connections.reset(self.token)
+            duration = (time.perf_counter() - self.held.acquired_at) * 1_000
+            self.database.recorder.record_hold(self.held.site, duration)
+            if duration >= self.database.recorder.long_hold_threshold or self.held.blocking_calls:
+                blocking_calls = ", ".join(self.held.blocking_calls) or "none"
+                logger.warning(f"Database connection checked out at {self.held.site} was held for {duration:.1f}ms (blocking calls: {blocking_calls})")
@@ -2,3 +2,5 @@
 from cogs.utils.profiles.field_type import FieldCheckFailure
 from cogs.utils.profiles.template import TemplateNotFoundError, TemplateSendError, TemplateVerificationChannelError, TemplateArchiveChannelError, TemplateRoleAddError
 from cogs.utils.profiles.command_processor import InvalidCommandText
+from cogs.utils.profiles.embed_budget import EmbedBudgetError
+from cogs.utils.profiles.template_document import TemplateDocumentError
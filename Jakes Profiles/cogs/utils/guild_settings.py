@@ -0,0 +1,88 @@
+import typing
+
+from cogs.utils import queries
+from cogs.utils.cache import TimedLRUCache
+
+
+class GuildSettings(object):
+    """
+    The per-guild limits for templates, taken from the guild's own row in `guild_settings` if it
+    has one, otherwise from the global default row (guild_id=0).
+
+    The default row is only loaded once per process. Guilds' own rows are loaded the first time
+    they're asked for and kept in a bounded cache - anything that writes to `guild_settings` should
+    invalidate the guild afterwards through the CacheInvalidation cog, so that every shard process
+    evicts it.
+    """
+
+    DEFAULT_GUILD_ID = 0
+
+    # guild_id: settings
+    cache = TimedLRUCache(max_size=5_000, ttl=3_600)
+    default: typing.Optional['GuildSettings'] = None
+
+    __slots__ = ("guild_id", "max_template_count", "max_template_field_count", "max_template_profile_count",)
+
+    def __init__(self, guild_id:int, max_template_count:int, max_template_field_count:int, max_template_profile_count:int, **kwargs):
+        self.guild_id: int = guild_id
+        self.max_template_count: int = max_template_count
+        self.max_template_field_count: int = max_template_field_count
+        self.max_template_profile_count: int = max_template_profile_count
+
+    @classmethod
+    def from_row(cls, row:dict, default:'GuildSettings'=None) -> 'GuildSettings':
+        """
+        Make a settings object from a database row, filling any null limits from the given default.
+        """
+
+        row = dict(row)
+        if default is not None:
+            for attr in cls.__slots__[1:]:
+                if row.get(attr) is None:
+                    row[attr] = getattr(default, attr)
+        return cls(**row)
+
+    @classmethod
+    async def fetch_default(cls, db) -> 'GuildSettings':
+        """
+        Get the global default settings, loading them if they haven't been already.
+        """
+
+        if cls.default is None:
+            rows = await db(queries.GUILD_SETTINGS_BY_ID, cls.DEFAULT_GUILD_ID)
+            cls.default = cls.from_row(rows[0])
+        return cls.default
+
+    @classmethod
+    async def fetch(cls, db, guild_id:int) -> 'GuildSettings':
+        """
+        Get the settings for a given guild.
+
+        Args:
+            db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+            guild_id (int): The ID of the guild to get the settings for.
+
+        Returns:
+            cogs.utils.guild_settings.GuildSettings: The guild's settings.
+        """
+
+        settings = cls.cache.get(guild_id, None)
+        if settings is not None:
+            return settings
+        default = await cls.fetch_default(db)
+        rows = await db(queries.GUILD_SETTINGS_BY_ID, guild_id)
+        settings = cls.from_row(rows[0], default) if rows else default
+        cls.cache.set(guild_id, settings)
+        return settings
+
+    @classmethod
+    def invalidate(cls, guild_id:int) -> None:
+        """
+        Remove a guild's settings from the cache, so they're reloaded the next time they're used.
+        """
+
+        if guild_id == cls.DEFAULT_GUILD_ID:
+            cls.default = None
+            cls.cache.clear()
+        else:
+            cls.cache.pop(guild_id)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import typing
+import uuid
+
+
+logger = logging.getLogger("profilebot.invalidation")
+
+
+class InvalidationBus(object):
+    """
+    Tells every shard process to evict a cached entity when it's changed.
+
+    Each invalidation is applied to this process straight away and then published over Redis as
+    a compact message - `{"t": entity type, "i": entity ID, "v": version, "o": origin}` - which every other
+    process picks up and applies. The version is a counter per publishing process, so duplicated
+    messages are dropped. When Redis is disabled (or publishing fails) the invalidation
+    is only applied locally.
+
+    Args:
+        redis (typing.Callable, optional): The bot's Redis context manager, eg `bot.redis`.
+        channel (str, optional): The Redis channel that the messages are published to.
+    """
+
+    CHANNEL = "profilebot.invalidation"
+
+    def __init__(self, *, redis:typing.Callable=None, channel:str=CHANNEL):
+        self.redis: typing.Optional[typing.Callable] = redis
+        self.channel: str = channel
+        self.origin: str = uuid.uuid4().hex
+        self.version: int = 0
+        self.handlers: typing.Dict[str, typing.Callable[[typing.Any], None]] = dict()
+        self.last_seen_versions: typing.Dict[str, int] = dict()  # origin: version
+
+    @classmethod
+    def from_bot(cls, bot) -> 'InvalidationBus':
+        """
+        Make a bus that publishes over Redis only if Redis is enabled in the bot's config.
+        """
+
+        use_redis = bot.config.get("redis", {}).get("enabled", False)
+        return cls(redis=bot.redis if use_redis else None)
+
+    def register(self, entity:str, handler:typing.Callable[[typing.Any], None]) -> None:
+        """
+        Set the function that evicts an entity type from the local caches; it's given the entity ID.
+        """
+
+        self.handlers[entity] = handler
+
+    def apply(self, entity:str, entity_id) -> None:
+        handler = self.handlers.get(entity)
+        if handler is None:
+            logger.warning(f"No invalidation handler registered for {entity}")
+            return
+        handler(entity_id)
+
+    async def publish(self, entity:str, entity_id) -> typing.Dict[str, typing.Any]:
+        """
+        Invalidate an entity in this process and then in every other one.
+
+        Args:
+            entity (str): The type of the entity, eg `template`.
+            entity_id: The ID of the entity - anything that survives being sent as JSON.
+
+        Returns:
+            typing.Dict[str, typing.Any]: The message that was published.
+        """
+
+        self.version += 1
+        message = {"t": entity, "i": entity_id, "v": self.version, "o": self.origin}
+        self.apply(entity, entity_id)
+        if self.redis is None:
+            return message
+        try:
+            async with self.redis() as re:
+                await re.conn.publish_json(self.channel, message)
+        except Exception as e:
+            logger.warning(f"Couldn't publish invalidation for {entity} {entity_id!r} - {e}")
+        return message
+
+    def receive(self, message:typing.Dict[str, typing.Any]) -> bool:
+        """
+        Apply an invalidation message that was published by a process.
+        Messages from this process have already been applied, and repeated messages are ignored.
+
+        Returns:
+            bool: Whether or not the message was applied.
+        """
+
+        origin, version = message["o"], message["v"]
+        if origin == self.origin or version <= self.last_seen_versions.get(origin, 0):
+            return False
+        self.last_seen_versions[origin] = version
+        self.apply(message["t"], message["i"])
+        return True
+
+
+class LocalRedis(object):
+    """
+    An in-process stand-in for the bot's Redis connection that supports just enough to pass
+    invalidation messages around - `async with LocalRedis()() as re: await re.conn.publish_json(...)`.
+    Messages go through JSON just like they would over Redis, and are delivered to every subscriber
+    of the channel before `publish_json` returns.
+    """
+
+    def __init__(self):
+        self.subscribers: typing.Dict[str, typing.List[typing.Callable]] = dict()
+        self.published: int = 0
+
+    def __call__(self) -> '_LocalRedisConnection':
+        return _LocalRedisConnection(self)
+
+    def subscribe(self, channel:str, callback:typing.Callable[[dict], typing.Any]) -> None:
+        self.subscribers.setdefault(channel, list()).append(callback)
+
+    def unsubscribe(self, channel:str, callback:typing.Callable[[dict], typing.Any]) -> None:
+        try:
+            self.subscribers.get(channel, list()).remove(callback)
+        except ValueError:
+            pass
+
+    async def publish_json(self, channel:str, data) -> int:
+        self.published += 1
+        text = json.dumps(data)
+        subscribers = list(self.subscribers.get(channel, list()))
+        for callback in subscribers:
+            result = callback(json.loads(text))
+            if asyncio.iscoroutine(result):
+                await result
+        return len(subscribers)
+
+
+class _LocalRedisConnection(object):
+
+    def __init__(self, redis:LocalRedis):
+        self.conn: LocalRedis = redis
+
+    async def __aenter__(self) -> '_LocalRedisConnection':
+        return self
+
+    async def __aexit__(self, *args):
+        pass
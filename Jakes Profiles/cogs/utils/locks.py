@@ -0,0 +1,215 @@
+import asyncio
+import time
+import typing
+import uuid
+
+
+class _LockEntry(object):
+    """
+    A lock for a single key, along with how many tasks are holding or waiting on it.
+    """
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users: int = 0
+
+
+class KeyedLock(object):
+    """
+    A set of locks keyed on an arbitrary hashable (eg a user or guild ID).
+
+    A lock only exists while something is holding or waiting on it - once the last user releases
+    it, it's removed from the registry, so idle keys don't hold any memory.
+
+    If a Redis connection factory is given, acquiring a key also takes a matching lock in Redis,
+    so that the same key is locked across every shard process. The Redis lock is given a TTL that's
+    refreshed while it's held, so a crashed process can't hold a key forever.
+
+    Args:
+        name (str): The name of the lock set, used to namespace the Redis keys.
+        redis (typing.Callable, optional): The bot's Redis context manager, eg `bot.redis`.
+        redis_ttl (float, optional): How long a Redis lock lives without being refreshed, in seconds.
+
+    Attrs:
+        acquisitions (int): How many times a lock has been acquired.
+        contended_acquisitions (int): How many of those acquisitions had to wait for another holder.
+        total_wait_time (float): The total time spent waiting to acquire locks, in seconds.
+    """
+
+    # Only delete the Redis key if we're still the one holding it
+    REDIS_RELEASE_SCRIPT = """
+    if redis.call("GET", KEYS[1]) == ARGV[1] then
+        return redis.call("DEL", KEYS[1])
+    end
+    return 0
+    """
+
+    # Only extend the Redis key if we're still the one holding it
+    REDIS_REFRESH_SCRIPT = """
+    if redis.call("GET", KEYS[1]) == ARGV[1] then
+        return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    def __init__(self, name:str, *, redis:typing.Callable=None, redis_ttl:float=30):
+        self.name: str = name
+        self.redis: typing.Optional[typing.Callable] = redis
+        self.redis_ttl: float = redis_ttl
+        self.locks: typing.Dict[typing.Hashable, _LockEntry] = dict()
+        self.acquisitions: int = 0
+        self.contended_acquisitions: int = 0
+        self.total_wait_time: float = 0.0
+
+    def __len__(self):
+        return len(self.locks)
+
+    @classmethod
+    def from_bot(cls, name:str, bot) -> 'KeyedLock':
+        """
+        Make a lock set for the given bot, using Redis if it's enabled in the bot's `[locks]` config.
+        """
+
+        use_redis = bot.config.get("redis", {}).get("enabled", False) and bot.config.get("locks", {}).get("use_redis", False)
+        return cls(name, redis=bot.redis if use_redis else None, redis_ttl=bot.config.get("locks", {}).get("redis_ttl", 30))
+
+    def __call__(self, key:typing.Hashable) -> '_KeyedLockContext':
+        """
+        Get a context manager that holds the lock for the given key.
+        """
+
+        return _KeyedLockContext(self, key)
+
+    def get_redis_key(self, key:typing.Hashable) -> str:
+        return f"profilebot:lock:{self.name}:{key}"
+
+    async def locked(self, key:typing.Hashable) -> bool:
+        """
+        Whether or not the lock for a given key is currently held, by this process or (in Redis mode) any other.
+        """
+
+        entry = self.locks.get(key)
+        if entry is not None and entry.lock.locked():
+            return True
+        if self.redis is None:
+            return False
+        async with self.redis() as re:
+            return bool(await re.conn.execute("EXISTS", self.get_redis_key(key)))
+
+    def stats(self) -> typing.Dict[str, typing.Union[int, float]]:
+        """
+        Get a summary of the locks currently held and how contended they've been.
+        """
+
+        return {
+            "keys": len(self.locks),
+            "held": len([i for i in self.locks.values() if i.lock.locked()]),
+            "waiting": sum([max(i.users - 1, 0) for i in self.locks.values()]),
+            "acquisitions": self.acquisitions,
+            "contended_acquisitions": self.contended_acquisitions,
+            "total_wait_time": self.total_wait_time,
+        }
+
+    async def acquire(self, key:typing.Hashable) -> typing.Optional[str]:
+        """
+        Acquire the lock for a given key, waiting for it if it's held.
+        Returns the token for the Redis lock, if one was taken.
+        """
+
+        entry = self.locks.get(key)
+        if entry is None:
+            entry = self.locks[key] = _LockEntry()
+        entry.users += 1
+        contended = entry.lock.locked()
+        start = time.monotonic()
+        try:
+            await entry.lock.acquire()
+        except BaseException:
+            self._drop_user(key, entry)
+            raise
+        token = None
+        if self.redis is not None:
+            try:
+                token, redis_contended = await self._acquire_redis(key)
+            except BaseException:
+                entry.lock.release()
+                self._drop_user(key, entry)
+                raise
+            contended = contended or redis_contended
+        self.acquisitions += 1
+        if contended:
+            self.contended_acquisitions += 1
+            self.total_wait_time += time.monotonic() - start
+        return token
+
+    async def release(self, key:typing.Hashable, token:typing.Optional[str]=None) -> None:
+        """
+        Release the lock for a given key, removing it from the registry if nothing else is waiting on it.
+        """
+
+        entry = self.locks[key]
+        try:
+            if token is not None:
+                async with self.redis() as re:
+                    await re.conn.eval(self.REDIS_RELEASE_SCRIPT, keys=[self.get_redis_key(key)], args=[token])
+        finally:
+            entry.lock.release()
+            self._drop_user(key, entry)
+
+    def _drop_user(self, key:typing.Hashable, entry:_LockEntry) -> None:
+        entry.users -= 1
+        if entry.users <= 0 and self.locks.get(key) is entry:
+            del self.locks[key]
+
+    async def _acquire_redis(self, key:typing.Hashable) -> typing.Tuple[str, bool]:
+        """
+        Take the Redis lock for a key, polling with a backoff until it's free.
+        Returns the token stored in the key and whether or not we had to wait for it.
+        """
+
+        token = uuid.uuid4().hex
+        redis_key = self.get_redis_key(key)
+        delay = 0.05
+        contended = False
+        while True:
+            async with self.redis() as re:
+                if await re.conn.execute("SET", redis_key, token, "NX", "PX", int(self.redis_ttl * 1_000)):
+                    return token, contended
+            contended = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1)
+
+    async def _refresh_redis(self, key:typing.Hashable, token:str) -> None:
+        """
+        Keep extending the TTL of a held Redis lock until cancelled.
+        """
+
+        redis_key = self.get_redis_key(key)
+        while True:
+            await asyncio.sleep(self.redis_ttl / 3)
+            async with self.redis() as re:
+                await re.conn.eval(self.REDIS_REFRESH_SCRIPT, keys=[redis_key], args=[token, int(self.redis_ttl * 1_000)])
+
+
+class _KeyedLockContext(object):
+
+    __slots__ = ("registry", "key", "token", "refresher")
+
+    def __init__(self, registry:KeyedLock, key:typing.Hashable):
+        self.registry: KeyedLock = registry
+        self.key: typing.Hashable = key
+        self.token: typing.Optional[str] = None
+        self.refresher: typing.Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self.token = await self.registry.acquire(self.key)
+        if self.token is not None:
+            self.refresher = asyncio.ensure_future(self.registry._refresh_redis(self.key, self.token))
+        return self
+
+    async def __aexit__(self, *args):
+        if self.refresher is not None:
+            self.refresher.cancel()
+        await self.registry.release(self.key, self.token)
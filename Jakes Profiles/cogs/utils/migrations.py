@@ -0,0 +1,386 @@
+"""
+A small versioned migration runner for the bot's database.
+
+Migrations live in `config/migrations/` as `NNNN_description.pgsql` files, and are applied in
+order of their version number. Each applied migration is recorded in the `schema_version` table,
+so each will only ever be run once per database.
+
+This can also be run directly to apply migrations or check the database's query plans:
+
+    python -m cogs.utils.migrations [--check] [--build-search-index] [--config config/config.toml]
+
+Anything too slow to run inside a migration at startup (eg reading through the whole of a large table) is
+done in batches after the migration that needs it instead - the bot does this in the background (see
+`ProfileSearch`), or it can be run by hand with `--build-search-index` - see `build_search_index`.
+"""
+
+import asyncio
+import datetime
+import json
+import logging
+import pathlib
+import re
+import typing
+import uuid
+
+from cogs.utils import queries
+
+
+MIGRATION_DIRECTORY = pathlib.Path(__file__).resolve().parents[2] / "config" / "migrations"
+MIGRATION_FILENAME_REGEX = re.compile(r"^(?P<version>\d+)_(?P<name>\w+)\.pgsql$")
+MIGRATION_LOCK_ID = 0x50524f46  # An arbitrary key for the advisory lock so multiple shards don't migrate at once
+SEARCH_INDEX_NAME = "filled_field_search_vector_idx"
+SEARCH_INDEX_LOCK_ID = 0x53524348  # The advisory lock for building the search index, so only one process builds it
+
+logger = logging.getLogger("profilebot.migrations")
+
+
+class Migration(object):
+    """
+    A single migration file.
+
+    Args:
+        version (int): The version number of the migration.
+        name (str): The name of the migration, taken from the filename.
+        path (pathlib.Path): The location of the migration file.
+    """
+
+    __slots__ = ("version", "name", "path")
+
+    def __init__(self, version:int, name:str, path:pathlib.Path):
+        self.version: int = version
+        self.name: str = name
+        self.path: pathlib.Path = path
+
+    def __repr__(self):
+        return f"<Migration {self.version:04d}_{self.name}>"
+
+    def read(self) -> str:
+        return self.path.read_text()
+
+
+class QueryPlanCheck(object):
+    """
+    A query that the bot issues, with some representative parameters, so that its plan can be checked.
+
+    Args:
+        site (str): Where the query is issued from.
+        sql (str): The query itself.
+        args (tuple): The parameters to pass to the query.
+    """
+
+    __slots__ = ("site", "sql", "args")
+
+    def __init__(self, site:str, sql:str, *args):
+        self.site: str = site
+        self.sql: str = sql
+        self.args: tuple = args
+
+
+_EXAMPLE_UUID = uuid.UUID(int=0)
+_EXAMPLE_SNOWFLAKE = 141231597155385344
+
+# The queries that the cogs issue against tables that could grow large
+QUERY_PLAN_CHECKS: typing.List[QueryPlanCheck] = [
+    QueryPlanCheck("template.fetch_template_by_id", queries.TEMPLATE_BY_ID, _EXAMPLE_UUID),
+    QueryPlanCheck("template.fetch_template_by_name", queries.TEMPLATE_BY_NAME, _EXAMPLE_SNOWFLAKE, "test"),
+    QueryPlanCheck("template_commands.templates", queries.TEMPLATES_WITH_PROFILE_COUNTS, _EXAMPLE_SNOWFLAKE),
+    QueryPlanCheck("template_commands.createtemplate", queries.TEMPLATE_IDS_FOR_GUILD, _EXAMPLE_SNOWFLAKE),
+    QueryPlanCheck("template_commands.describetemplate", queries.PROFILE_COUNT_FOR_TEMPLATE, _EXAMPLE_UUID),
+    QueryPlanCheck("template.fetch_fields", queries.FIELDS_FOR_TEMPLATE, _EXAMPLE_UUID),
+    QueryPlanCheck("template_document.apply", queries.LIVE_FIELDS_FOR_UPDATE, _EXAMPLE_UUID),
+    QueryPlanCheck("template.fetch_profile_for_user", queries.PROFILE_FOR_USER_BY_NAME, _EXAMPLE_UUID, _EXAMPLE_SNOWFLAKE, "default"),
+    QueryPlanCheck("template.fetch_all_profiles_for_user", queries.PROFILES_FOR_USER, _EXAMPLE_UUID, _EXAMPLE_SNOWFLAKE),
+    QueryPlanCheck("template.fetch_all_profiles", queries.PROFILES_FOR_TEMPLATE, _EXAMPLE_UUID),
+    QueryPlanCheck("template.iterate_all_profiles", queries.PROFILES_FOR_TEMPLATE_FIRST_PAGE, _EXAMPLE_UUID, 500),
+    QueryPlanCheck("template.iterate_all_profiles.after", queries.PROFILES_FOR_TEMPLATE_PAGE_AFTER, _EXAMPLE_UUID, _EXAMPLE_SNOWFLAKE, "default", 500),
+    QueryPlanCheck(
+        "template.search_profiles",
+        queries.SEARCH_PROFILES.format(key_filter=""),
+        _EXAMPLE_UUID, "python", [_EXAMPLE_UUID], True, 10,
+    ),
+    QueryPlanCheck(
+        "template.search_profiles.after",
+        queries.SEARCH_PROFILES.format(key_filter=queries.SEARCH_PROFILES_AFTER_FILTER),
+        _EXAMPLE_UUID, "python", [_EXAMPLE_UUID], True, 10, 1_000_000, _EXAMPLE_SNOWFLAKE, "default",
+    ),
+    QueryPlanCheck(
+        "migrations.build_search_index",
+        queries.SEARCH_VECTOR_BACKFILL.format(key_filter=queries.SEARCH_VECTOR_BACKFILL_AFTER_FILTER),
+        1_000, _EXAMPLE_SNOWFLAKE, "default", _EXAMPLE_UUID,
+    ),
+    QueryPlanCheck("user_profile.fetch_saved_state", queries.PROFILE_POSTED_MESSAGE, _EXAMPLE_SNOWFLAKE, "default", _EXAMPLE_UUID),
+    QueryPlanCheck("user_profile.fetch_filled_fields", queries.FILLED_FIELDS_FOR_PROFILE, _EXAMPLE_SNOWFLAKE, "default", [_EXAMPLE_UUID]),
+    QueryPlanCheck("user_profile.fetch_filled_fields_for_profiles", queries.FILLED_FIELDS_FOR_PROFILES, [_EXAMPLE_SNOWFLAKE], ["default"], [_EXAMPLE_UUID]),
+    QueryPlanCheck("profile_verification.cache_setup", queries.PENDING_VERIFICATION_MESSAGE_IDS),
+    QueryPlanCheck("profile_verification.verification_emoji_check", queries.PENDING_PROFILE_BY_MESSAGE, _EXAMPLE_SNOWFLAKE),
+    QueryPlanCheck("profile_verification.verification_emoji_check.verify", queries.VERIFY_PROFILE_BY_MESSAGE, _EXAMPLE_SNOWFLAKE),
+    QueryPlanCheck("template.fetch_pending_profiles", queries.PENDING_PROFILES_FIRST_PAGE, _EXAMPLE_UUID, 10),
+    QueryPlanCheck("template.fetch_pending_profiles.after", queries.PENDING_PROFILES_PAGE_AFTER, _EXAMPLE_UUID, _EXAMPLE_SNOWFLAKE, "default", 10),
+    QueryPlanCheck(
+        "profile_verification.bulk_verify_profiles.pending",
+        queries.PENDING_PROFILE_KEYS.format(user_filter=queries.PENDING_PROFILE_KEYS_USER_FILTER),
+        _EXAMPLE_UUID, [_EXAMPLE_SNOWFLAKE],
+    ),
+    QueryPlanCheck("profile_verification.bulk_verify_profiles.verify", queries.BULK_VERIFY_PROFILES, _EXAMPLE_UUID, [_EXAMPLE_SNOWFLAKE], ["default"]),
+    QueryPlanCheck("profile_verification.bulk_verify_profiles.deny", queries.BULK_DENY_PROFILES, _EXAMPLE_UUID, [_EXAMPLE_SNOWFLAKE], ["default"]),
+    QueryPlanCheck("profile_draft.fetch", queries.DRAFT_FIELDS, _EXAMPLE_SNOWFLAKE, _EXAMPLE_UUID),
+    QueryPlanCheck("profile_draft.delete_expired", queries.DELETE_EXPIRED_DRAFTS, datetime.timedelta(days=7)),
+    QueryPlanCheck("guild_settings.fetch", queries.GUILD_SETTINGS_BY_ID, _EXAMPLE_SNOWFLAKE),
+]
+
+
+def get_migrations(directory:pathlib.Path=MIGRATION_DIRECTORY) -> typing.List[Migration]:
+    """
+    Get all of the migrations in the given directory, ordered by their version.
+    """
+
+    migrations = []
+    for path in directory.glob("*.pgsql"):
+        match = MIGRATION_FILENAME_REGEX.search(path.name)
+        if match is None:
+            raise ValueError(f"Invalid migration filename {path.name}")
+        migrations.append(Migration(int(match.group("version")), match.group("name"), path))
+    migrations.sort(key=lambda x: x.version)
+    versions = [i.version for i in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError("Multiple migrations have been given the same version number")
+    return migrations
+
+
+async def apply_migrations(db, directory:pathlib.Path=MIGRATION_DIRECTORY) -> typing.List[Migration]:
+    """
+    Apply any migrations that haven't yet been applied to the database.
+    Each migration is run in its own transaction alongside the insert into schema_version.
+
+    Args:
+        db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+        directory (pathlib.Path, optional): The directory to load migrations from.
+
+    Returns:
+        typing.List[Migration]: The migrations that were applied.
+    """
+
+    await db.conn.execute(
+        """CREATE TABLE IF NOT EXISTS schema_version(version INTEGER PRIMARY KEY, name TEXT,
+        applied_at TIMESTAMP DEFAULT (NOW() AT TIME ZONE 'utc'))"""
+    )
+    applied = []
+    for migration in get_migrations(directory):
+        async with db.conn.transaction():
+            await db("SELECT pg_advisory_xact_lock($1)", MIGRATION_LOCK_ID)
+            if await db("SELECT version FROM schema_version WHERE version=$1", migration.version):
+                continue
+            logger.info(f"Applying database migration {migration!r}")
+            await db.conn.execute(migration.read())
+            await db("INSERT INTO schema_version (version, name) VALUES ($1, $2)", migration.version, migration.name)
+        applied.append(migration)
+    return applied
+
+
+_migrations_applied = False
+_migrations_lock = None
+
+
+async def ensure_migrations_applied(db) -> None:
+    """
+    Apply the database migrations if they haven't been already in this process.
+    Anything relying on a table or index added by a migration should await this first.
+    """
+
+    global _migrations_applied, _migrations_lock
+    if _migrations_applied:
+        return
+    if _migrations_lock is None:
+        _migrations_lock = asyncio.Lock()
+    async with _migrations_lock:
+        if _migrations_applied:
+            return
+        await apply_migrations(db)
+        _migrations_applied = True
+
+
+async def get_search_index_state(db) -> typing.Optional[bool]:
+    """
+    See whether the GIN index that profile searches use has been built.
+
+    Returns:
+        typing.Optional[bool]: Whether the index is valid - False if a concurrent build left it invalid, and None if
+            it doesn't exist.
+    """
+
+    rows = await db(
+        """SELECT pg_index.indisvalid FROM pg_index INNER JOIN pg_class ON pg_class.oid=pg_index.indexrelid
+        WHERE pg_class.relname=$1""",
+        SEARCH_INDEX_NAME,
+    )
+    if not rows:
+        return None
+    return rows[0]['indisvalid']
+
+
+async def backfill_search_vectors(db, after:typing.Tuple[int, str, uuid.UUID]=None, *, batch_size:int=1_000) -> typing.Tuple[typing.Optional[tuple], int]:
+    """
+    Fill in the search vectors of a batch of filled fields saved before migration 0005, walking the table in
+    primary key order. Fields saved since the migration already have their search vector, so they're left alone.
+
+    Args:
+        db (cogs.utils.database.DatabaseConnection): A connection to the database that isn't inside a transaction.
+        after (typing.Tuple[int, str, uuid.UUID], optional): The key that the previous batch finished at.
+        batch_size (int, optional): How many filled fields to look at.
+
+    Returns:
+        typing.Tuple[typing.Optional[tuple], int]: The key to start the next batch after (None once the whole
+            table has been walked), and how many filled fields had their search vector filled in.
+    """
+
+    key_filter = "" if after is None else queries.SEARCH_VECTOR_BACKFILL_AFTER_FILTER
+    rows = await db(queries.SEARCH_VECTOR_BACKFILL.format(key_filter=key_filter), batch_size, *(after or ()))
+    if not rows:
+        return None, 0
+    return (rows[0]['user_id'], rows[0]['name'], rows[0]['field_id']), rows[0]['filled_count']
+
+
+async def create_search_index(db) -> bool:
+    """
+    Build the GIN index that profile searches use, without blocking writes to filled_field while it's built.
+    Any index that a previous concurrent build left invalid is replaced. Only one process builds it at a time.
+
+    Args:
+        db (cogs.utils.database.DatabaseConnection): A connection to the database that isn't inside a transaction.
+
+    Returns:
+        bool: Whether the index was built here - False if another process is already building it.
+    """
+
+    rows = await db("SELECT pg_try_advisory_lock($1) AS locked", SEARCH_INDEX_LOCK_ID)
+    if not rows[0]['locked']:
+        return False
+    try:
+        if await get_search_index_state(db) is False:
+            await db.conn.execute(f"DROP INDEX CONCURRENTLY {SEARCH_INDEX_NAME}")
+        await db.conn.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {SEARCH_INDEX_NAME} ON filled_field USING GIN (search_vector)")
+    finally:
+        await db("SELECT pg_advisory_unlock($1)", SEARCH_INDEX_LOCK_ID)
+    return True
+
+
+async def build_search_index(db, *, batch_size:int=1_000) -> int:
+    """
+    Fill in the search vector of every filled field saved before migration 0005, and then build the GIN index
+    that profile searches use. Each batch is committed on its own and the index is built concurrently, so the bot
+    can keep running while this does. The bot does the same in the background (see `ProfileSearch`); this is for
+    running it by hand.
+
+    Args:
+        db (cogs.utils.database.DatabaseConnection): A connection to the database that isn't inside a transaction.
+        batch_size (int, optional): How many filled fields to look at in each batch.
+
+    Returns:
+        int: How many filled fields had their search vector filled in.
+    """
+
+    # Fill in the search vectors
+    total_filled = 0
+    last_key, filled_count = await backfill_search_vectors(db, batch_size=batch_size)
+    while last_key is not None:
+        total_filled += filled_count
+        logger.info(f"Filled in {total_filled} search vectors so far")
+        last_key, filled_count = await backfill_search_vectors(db, last_key, batch_size=batch_size)
+
+    # And build the index
+    if not await create_search_index(db):
+        raise RuntimeError("The search index is already being built by another process")
+    return total_filled
+
+
+def _get_sequential_scans(plan:dict) -> typing.List[str]:
+    """
+    Walk an EXPLAIN (FORMAT JSON) plan node and return the relations that are sequentially scanned.
+    """
+
+    scans = []
+    if plan.get("Node Type") == "Seq Scan":
+        scans.append(plan.get("Relation Name", "unknown"))
+    for child in plan.get("Plans", []):
+        scans.extend(_get_sequential_scans(child))
+    return scans
+
+
+async def check_query_plans(db, checks:typing.List[QueryPlanCheck]=None) -> typing.Dict[str, typing.List[str]]:
+    """
+    Run EXPLAIN on each of the queries that the bot issues, and find any that would perform a
+    sequential scan. Sequential scans are disabled in the planner while checking, so that small
+    (eg development) tables don't hide a missing index.
+
+    Args:
+        db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+        checks (typing.List[QueryPlanCheck], optional): The queries to check. Defaults to all of the bot's queries.
+
+    Returns:
+        typing.Dict[str, typing.List[str]]: The call sites of any failing queries, and the relations that they scan.
+    """
+
+    failures = {}
+    for check in checks or QUERY_PLAN_CHECKS:
+        async with db.conn.transaction():
+            await db("SET LOCAL enable_seqscan = off")
+            rows = await db(f"EXPLAIN (FORMAT JSON) {check.sql}", *check.args)
+        plan = rows[0]["QUERY PLAN"]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans = _get_sequential_scans(plan[0]["Plan"])
+        if scans:
+            failures[check.site] = scans
+    return failures
+
+
+class _StandaloneConnection(object):
+    """
+    A stand-in for the bot's database wrapper so this module can be run on its own.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __call__(self, sql:str, *args):
+        return await self.conn.fetch(sql, *args)
+
+
+async def _main(config_path:str, check:bool, search_index:bool) -> int:
+    import asyncpg
+    import toml
+
+    config = toml.load(config_path)["database"]
+    config.pop("enabled", None)
+    conn = await asyncpg.connect(**config)
+    db = _StandaloneConnection(conn)
+    try:
+        applied = await apply_migrations(db)
+        print(f"Applied {len(applied)} migration(s): {', '.join(repr(i) for i in applied) or 'none'}")
+        if search_index:
+            filled_count = await build_search_index(db)
+            print(f"Filled in {filled_count} search vector(s) and built {SEARCH_INDEX_NAME}")
+        if not check:
+            return 0
+        failures = await check_query_plans(db)
+        for site, relations in failures.items():
+            print(f"Sequential scan in {site} on {', '.join(relations)}")
+        if failures:
+            return 1
+        print(f"All {len(QUERY_PLAN_CHECKS)} checked queries use indexes")
+        return 0
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Apply the bot's database migrations.")
+    parser.add_argument("--check", action="store_true", help="Fail if any of the bot's queries does a sequential scan")
+    parser.add_argument("--build-search-index", action="store_true", help="Fill in old search vectors and build the profile search index")
+    parser.add_argument("--config", default="config/config.toml", help="The bot config file to read the database details from")
+    args = parser.parse_args()
+    sys.exit(asyncio.get_event_loop().run_until_complete(_main(args.config, args.check, args.build_search_index)))
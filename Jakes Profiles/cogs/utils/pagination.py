@@ -0,0 +1,115 @@
+import asyncio
+import typing
+
+import discord
+
+
+PageItem = typing.TypeVar("PageItem")
+
+
+class KeysetPaginator(typing.Generic[PageItem]):
+    """
+    Shows a list of items a page at a time in a single message, with reactions to move between the pages.
+    Each page is fetched from the database when it's shown, starting after the key of the last item on the previous
+    page rather than at an offset, so moving through the pages costs the same however far in you are.
+
+    Args:
+        fetch_page (typing.Callable): An async function taking the key to start after (None for the first page) and
+            how many items to get, returning the items.
+        get_key (typing.Callable): Gets the key of an item, to pass to `fetch_page` for the next page.
+        format_page (typing.Callable): Builds the embed for a page, given the items on it and the page's number (starting at 1).
+        per_page (int, optional): How many items are shown on each page.
+        timeout (float, optional): How long to wait for a reaction before the paginator stops.
+    """
+
+    PREVIOUS_EMOJI = "\N{BLACK LEFT-POINTING TRIANGLE}"
+    NEXT_EMOJI = "\N{BLACK RIGHT-POINTING TRIANGLE}"
+
+    def __init__(
+            self, fetch_page:typing.Callable[[typing.Any, int], typing.Awaitable[typing.List[PageItem]]],
+            get_key:typing.Callable[[PageItem], typing.Any],
+            format_page:typing.Callable[[typing.List[PageItem], int], discord.Embed],
+            *, per_page:int=10, timeout:float=120):
+        self.fetch_page = fetch_page
+        self.get_key = get_key
+        self.format_page = format_page
+        self.per_page: int = per_page
+        self.timeout: float = timeout
+        self.page_keys: typing.List[typing.Any] = [None]  # The key each page starts after - the last is the current page
+        self.items: typing.List[PageItem] = list()
+        self.has_next_page: bool = False
+
+    @property
+    def page_number(self) -> int:
+        return len(self.page_keys)
+
+    async def load_page(self) -> typing.List[PageItem]:
+        """
+        Fetch the current page, getting one more item than is shown to see if there's a page after it.
+        """
+
+        items = await self.fetch_page(self.page_keys[-1], self.per_page + 1)
+        self.has_next_page = len(items) > self.per_page
+        self.items = items[:self.per_page]
+        return self.items
+
+    async def next_page(self) -> typing.List[PageItem]:
+        if self.has_next_page:
+            self.page_keys.append(self.get_key(self.items[-1]))
+        return await self.load_page()
+
+    async def previous_page(self) -> typing.List[PageItem]:
+        if len(self.page_keys) > 1:
+            self.page_keys.pop()
+        return await self.load_page()
+
+    async def start(self, ctx) -> typing.Optional[discord.Message]:
+        """
+        Send the first page to the context's channel and then handle the reactions on it until it times out.
+
+        Returns:
+            typing.Optional[discord.Message]: The message that the pages are shown in - None if there's nothing to show.
+        """
+
+        # Send the first page
+        await self.load_page()
+        if not self.items:
+            return None
+        message = await ctx.send(embed=self.format_page(self.items, self.page_number))
+        if not self.has_next_page:
+            return message
+
+        # Add the reactions
+        valid_emoji = [self.PREVIOUS_EMOJI, self.NEXT_EMOJI]
+        for e in valid_emoji:
+            try:
+                await message.add_reaction(e)
+            except discord.HTTPException:
+                return message
+
+        # Move between the pages
+        check = lambda p: p.message_id == message.id and p.user_id == ctx.author.id and str(p.emoji) in valid_emoji
+        while True:
+            try:
+                payload = await ctx.bot.wait_for("raw_reaction_add", check=check, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                break
+            if str(payload.emoji) == self.NEXT_EMOJI:
+                await self.next_page()
+            else:
+                await self.previous_page()
+            try:
+                await message.remove_reaction(payload.emoji, ctx.author)
+            except discord.HTTPException:
+                pass
+            try:
+                await message.edit(embed=self.format_page(self.items, self.page_number))
+            except discord.HTTPException:
+                return message
+
+        # Clean up the reactions
+        try:
+            await message.clear_reactions()
+        except discord.HTTPException:
+            pass
+        return message
@@ -1,5 +1,5 @@
+import functools
 import typing
-import re
 
 import discord
 from discord.ext import commands
@@ -9,85 +9,233 @@ class InvalidCommandText(commands.BadArgument):
     pass
 
 
-class CommandProcessor(object):
+class CommandCondition(object):
+    """
+    A single `NAME(params) SAYS "text"` clause of a command.
 
-    COMMAND_REGEX = re.compile(
-        r'^{{.+?}}$',
-        re.IGNORECASE | re.MULTILINE | re.VERBOSE | re.DOTALL
-    )
-    VALID_COMMAND_REGEX = re.compile(
-        r'''
-        {{
-            DEFAULT\s*(?<!\\)\"(?P<default>.+?)(?<!\\)\"
-            (\s*
-                (?P<command>
-                    (?P<commandname>HASROLE|HASANYROLE|FIELDVALUE)
-                    \((?P<commandparams>(?:\d{16,23}(?:,\s*)?)+|(?:(?<!\\)\".+(?<!\\)\"(?:,\s*)?)+)\)
-                    \s*SAYS\s*(?<!\\)\"(?P<text>.+?)(?<!\\)\"
-                )
-            )+
-        }}
-        ''',
-        re.IGNORECASE | re.MULTILINE | re.VERBOSE | re.DOTALL
-    )
-    COMMAND_PARAMETERS_REGEX = re.compile(
-        r'''
-        (?P<command>
-            (?P<commandname>HASROLE|HASANYROLE|FIELDVALUE)
-            \((?P<commandparams>(?:\d{16,23}(?:,\s*)?)+|(?:(?<!\\)\".+(?<!\\)\"(?:,\s*)?)+)\)
-            \s*SAYS\s*(?<!\\)\"(?P<text>.+?)(?<!\\)\"
-        )
-        ''',
-        re.IGNORECASE | re.MULTILINE | re.VERBOSE | re.DOTALL
-    )
+    Args:
+        name (str): The uppercased name of the command, eg `HASROLE`.
+        params (typing.Tuple[str]): The parameters given to the command, with quotes stripped.
+        text (str): The text that's returned should the condition be met.
+    """
 
-    @classmethod
-    def get_is_command(cls, text:str) -> typing.Tuple[bool, bool]:
-        """Returns whether or not the given text is a command as well as whether or not it's a _valid_ command"""
+    __slots__ = ("name", "params", "role_ids", "text")
 
-        return (
-            cls.COMMAND_REGEX.search(text) is not None,
-            cls.VALID_COMMAND_REGEX.search(text) is not None,
-        )
+    def __init__(self, name:str, params:typing.Tuple[str], text:str):
+        self.name: str = name
+        self.params: typing.Tuple[str] = params
+        self.role_ids: typing.FrozenSet[int] = frozenset(int(i) for i in params if i.isdigit())
+        self.text: str = text
 
-    @classmethod
-    def get_value(cls, text:str, member:typing.Optional[discord.Member]=None) -> typing.Optional[str]:
-        """Return the value for a field"""
 
-        # See if it's a command
-        valid_command = cls.VALID_COMMAND_REGEX.search(text)
-        if valid_command is None:
-            raise InvalidCommandText()
+class CommandProgram(object):
+    """
+    A parsed `{{DEFAULT "..." HASROLE(...) SAYS "..."}}` command, ready to be evaluated against a member.
+
+    Args:
+        default (str): The text returned if none of the conditions are met.
+        conditions (typing.Tuple[CommandCondition]): Each of the conditions, in the order they're checked.
+    """
 
-        # Get the command values
-        default_text = valid_command.group("default")
-        command_list = cls.COMMAND_PARAMETERS_REGEX.finditer(text)
+    __slots__ = ("default", "conditions", "role_ids")
 
-        # Work out how we're applying each thing
-        for command in command_list:
-            command_name = command.group("commandname")
-            command_params = command.group("commandparams")
+    def __init__(self, default:str, conditions:typing.Tuple[CommandCondition]):
+        self.default: str = default
+        self.conditions: typing.Tuple[CommandCondition] = conditions
+        self.role_ids: typing.FrozenSet[int] = frozenset().union(*[i.role_ids for i in conditions])
+
+    def evaluate(self, member:typing.Optional[discord.Member]=None) -> str:
+        """
+        Get the value of the command for a given member.
+        The member's roles are put into a set once, so each condition is checked in time linear to its parameters.
+        """
+
+        member_roles = None
+        for condition in self.conditions:
 
             # hasrole command processing
-            if command_name.upper() in ["HASROLE", "HASANYROLE"]:
+            if condition.name in ("HASROLE", "HASANYROLE"):
                 if member is None:
                     raise ValueError("No provided member")
-                role_strings_to_check = [i.strip(' "') for i in command_params.split(',')]
-                role_ids_to_check = [int(i) for i in role_strings_to_check if i.isdigit()]
+                if member_roles is None:
+                    member_roles = set(member._roles)
 
                 # hasrole check
-                if command_name.upper() == "HASROLE":
-                    if len([i for i in role_ids_to_check if i in member._roles]) == len(role_ids_to_check):
-                        return command.group("text").replace('\\n', '\n').replace('\\"', '"')
+                if condition.name == "HASROLE":
+                    if condition.role_ids.issubset(member_roles):
+                        return condition.text
 
                 # hasanyrole check
-                elif command_name.upper() == "HASANYROLE":
-                    if any([i for i in role_ids_to_check if i in member._roles]):
-                        return command.group("text").replace('\\n', '\n').replace('\\"', '"')
+                elif not condition.role_ids.isdisjoint(member_roles):
+                    return condition.text
 
             # fieldvalue can't apply here so we'll ignore it
-            if command_name.upper() == "FIELDVALUE":
+            elif condition.name == "FIELDVALUE":
                 return "Could not process field value"
 
         # Guess we'll have to return the default
-        return default_text
+        return self.default
+
+
+class _CommandParser(object):
+    """
+    A single-pass parser for the command language. Every method either advances the position or
+    raises ValueError, so parsing is linear in the length of the text.
+    """
+
+    COMMAND_NAMES = ("HASANYROLE", "HASROLE", "FIELDVALUE")
+
+    __slots__ = ("text", "upper_text", "position")
+
+    def __init__(self, text:str, position:int):
+        self.text: str = text
+        self.upper_text: str = text.upper()
+        self.position: int = position
+
+    def skip_whitespace(self) -> None:
+        while self.position < len(self.text) and self.text[self.position].isspace():
+            self.position += 1
+
+    def peek(self, token:str) -> bool:
+        return self.upper_text.startswith(token, self.position)
+
+    def expect(self, token:str) -> None:
+        self.skip_whitespace()
+        if not self.peek(token):
+            raise ValueError(f"Expected {token} at position {self.position}")
+        self.position += len(token)
+
+    def read_string(self) -> str:
+        """
+        Read a non-empty double-quoted string; quotes preceded by a backslash don't end the string.
+        """
+
+        self.expect('"')
+        start = self.position
+        while True:
+            end = self.text.find('"', self.position)
+            if end == -1:
+                raise ValueError("Unterminated string")
+            self.position = end + 1
+            if self.text[end - 1] != '\\' or end == start:
+                break
+        if end == start:
+            raise ValueError("Empty string")
+        return self.text[start:end]
+
+    def read_params(self) -> typing.Tuple[str]:
+        """
+        Read a comma separated list of either role IDs or strings. A trailing comma is allowed.
+        """
+
+        self.expect("(")
+        self.skip_whitespace()
+        params = []
+        quoted = self.peek('"')
+        while True:
+            self.skip_whitespace()
+            if self.peek(")") and params:
+                break
+            if quoted:
+                params.append(self.read_string())
+            else:
+                start = self.position
+                while self.position < len(self.text) and self.text[self.position].isdigit():
+                    self.position += 1
+                if not 16 <= self.position - start <= 23:
+                    raise ValueError("Invalid ID parameter")
+                params.append(self.text[start:self.position])
+            self.skip_whitespace()
+            if self.peek(","):
+                self.position += 1
+            elif not self.peek(")"):
+                raise ValueError(f"Expected , or ) at position {self.position}")
+        self.position += 1
+        return tuple(params)
+
+    def read_condition(self) -> CommandCondition:
+        self.skip_whitespace()
+        for name in self.COMMAND_NAMES:
+            if self.peek(name):
+                self.position += len(name)
+                break
+        else:
+            raise ValueError(f"Expected a command name at position {self.position}")
+        params = self.read_params()
+        self.expect("SAYS")
+        text = self.read_string().replace('\\n', '\n').replace('\\"', '"')
+        return CommandCondition(name, params, text)
+
+    def read_program(self) -> CommandProgram:
+        self.expect("DEFAULT")
+        default = self.read_string()
+        conditions = [self.read_condition()]
+        while True:
+            self.skip_whitespace()
+            if self.peek("}}"):
+                break
+            conditions.append(self.read_condition())
+        return CommandProgram(default, tuple(conditions))
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile(text:str) -> typing.Optional[CommandProgram]:
+    start = text.find("{{")
+    if start == -1:
+        return None
+    try:
+        return _CommandParser(text, start + 2).read_program()
+    except ValueError:
+        return None
+
+
+class CommandProcessor(object):
+    """
+    Handles the command language that can be used in field prompts and template channel/role IDs:
+
+        {{DEFAULT "text" HASROLE(role_id, ...) SAYS "text" HASANYROLE(role_id, ...) SAYS "text"}}
+
+    Commands are compiled into a `CommandProgram` once, and the compiled version is memoized by its text.
+    """
+
+    @staticmethod
+    def compile(text:str) -> typing.Optional[CommandProgram]:
+        """Returns the compiled program for the given text, or None if it isn't a valid command"""
+
+        return _compile(text)
+
+    @staticmethod
+    def is_command(text:str) -> bool:
+        """
+        Returns whether or not the given text looks like a command - that is, a line starts with `{{` and a later line
+        ends with `}}`, with something in between. Only the first possible start and the last possible end need
+        checking, so this is a couple of scans of the text rather than a backtracking search.
+        """
+
+        if text.startswith("{{"):
+            start = 0
+        else:
+            start = text.find("\n{{")
+            if start == -1:
+                return False
+            start += 1
+        end = len(text) - 2 if text.endswith("}}") else text.rfind("}}\n")
+        return end >= start + 3
+
+    @classmethod
+    def get_is_command(cls, text:str) -> typing.Tuple[bool, bool]:
+        """Returns whether or not the given text is a command as well as whether or not it's a _valid_ command"""
+
+        return (
+            cls.is_command(text),
+            cls.compile(text) is not None,
+        )
+
+    @classmethod
+    def get_value(cls, text:str, member:typing.Optional[discord.Member]=None) -> typing.Optional[str]:
+        """Return the value for a field"""
+
+        program = cls.compile(text)
+        if program is None:
+            raise InvalidCommandText()
+        return program.evaluate(member)
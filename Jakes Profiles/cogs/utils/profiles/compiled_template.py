@@ -0,0 +1,83 @@
+import types
+import typing
+import uuid
+
+from cogs.utils.profiles.field import Field
+from cogs.utils.profiles.field_type import ImageField
+from cogs.utils.profiles.command_processor import CommandProcessor, CommandProgram
+
+
+class CompiledField(typing.NamedTuple):
+    """
+    A live field of a template along with everything that can be worked out from it ahead of time.
+
+    Args:
+        field (Field): The field itself.
+        is_command (bool): Whether or not the field's prompt looks like a command.
+        is_valid_command (bool): Whether or not the field's prompt is a command that can be run.
+        program (typing.Optional[CommandProgram]): The compiled prompt, if it's a valid command.
+    """
+
+    field: Field
+    is_command: bool
+    is_valid_command: bool
+    program: typing.Optional[CommandProgram]
+
+    @classmethod
+    def from_field(cls, field:Field) -> 'CompiledField':
+        is_command, is_valid_command = CommandProcessor.get_is_command(field.prompt)
+        return cls(field, is_command, is_valid_command, CommandProcessor.compile(field.prompt))
+
+    @property
+    def field_type_string(self) -> str:
+        """
+        The field type as it's shown on the template embed.
+        """
+
+        if self.is_command:
+            if self.is_valid_command:
+                return "COMMAND"
+            return "COMMAND::INVALID"
+        return str(self.field.field_type)
+
+
+class CompiledTemplate(typing.NamedTuple):
+    """
+    An immutable snapshot of a template's live fields, built once when the fields are fetched.
+    Since nothing in here can be changed it can be shared freely between the cache, renders, and
+    concurrent profile setup sessions; editing a template's fields makes a new snapshot rather
+    than changing an old one.
+
+    Args:
+        fields (typing.Tuple[CompiledField]): The non-deleted fields, ordered by their index.
+        fields_by_id (typing.Mapping[uuid.UUID, CompiledField]): The same fields, by their ID.
+        image_field (typing.Optional[Field]): The field that holds the profile image, if there is one.
+        role_ids (typing.FrozenSet[int]): Every role ID that's checked by any of the field prompts.
+    """
+
+    fields: typing.Tuple[CompiledField, ...]
+    fields_by_id: typing.Mapping[uuid.UUID, CompiledField]
+    image_field: typing.Optional[Field]
+    role_ids: typing.FrozenSet[int]
+
+    @classmethod
+    def from_fields(cls, fields:typing.Iterable[Field]) -> 'CompiledTemplate':
+        """
+        Compile the given fields, ignoring any that are deleted.
+        """
+
+        compiled_fields = tuple(sorted(
+            [CompiledField.from_field(i) for i in fields if i.deleted is False],
+            key=lambda x: x.field.index,
+        ))
+        image_field = None
+        for i in compiled_fields:
+            if isinstance(i.field.field_type, ImageField):
+                image_field = i.field
+                break
+        return cls(
+            fields=compiled_fields,
+            fields_by_id=types.MappingProxyType({i.field.field_id: i for i in compiled_fields}),
+            image_field=image_field,
+            role_ids=frozenset().union(*[i.program.role_ids for i in compiled_fields if i.program is not None]),
+        )
@@ -0,0 +1,177 @@
+import typing
+import urllib.parse
+
+import discord
+from discord.ext import commands
+
+
+# Discord's limits for a single embed
+TITLE_LIMIT = 256
+DESCRIPTION_LIMIT = 4096
+FIELD_COUNT_LIMIT = 25
+FIELD_NAME_LIMIT = 256
+FIELD_VALUE_LIMIT = 1024
+FOOTER_LIMIT = 2048
+AUTHOR_LIMIT = 256
+TOTAL_LIMIT = 6000
+VALID_URL_SCHEMES = frozenset({"http", "https", "attachment"})
+
+CONTINUED_SUFFIX = " (continued)"
+
+
+class EmbedBudgetError(commands.BadArgument):
+    """
+    An embed can't be sent since it breaks one of Discord's limits in a way that can't be split up.
+
+    Args:
+        problems (typing.List[str]): What's wrong with the embed.
+    """
+
+    def __init__(self, problems:typing.List[str]):
+        self.problems: typing.List[str] = problems
+        super().__init__("That embed can't be sent - " + ", ".join(problems) + ".")
+
+
+def is_valid_url(url:str) -> bool:
+    """
+    Returns whether or not Discord would accept the given text as an embed URL.
+    """
+
+    if not url or any(i.isspace() for i in url):
+        return False
+    try:
+        split = urllib.parse.urlsplit(url)
+    except ValueError:
+        return False
+    return split.scheme.lower() in VALID_URL_SCHEMES and bool(split.netloc)
+
+
+def get_embed_length(data:dict) -> int:
+    """
+    Count the characters of an embed's dict that go towards Discord's total limit.
+    """
+
+    return (
+        len(data.get("title", ""))
+        + len(data.get("description", ""))
+        + len(data.get("footer", {}).get("text", ""))
+        + len(data.get("author", {}).get("name", ""))
+        + sum([len(i.get("name", "")) + len(i.get("value", "")) for i in data.get("fields", [])])
+    )
+
+
+def get_embed_problems(embed:discord.Embed) -> typing.List[str]:
+    """
+    Check an embed against Discord's limits without sending it.
+
+    Returns:
+        typing.List[str]: Each of the limits that the embed breaks - empty if it's fine to send.
+    """
+
+    data = embed.to_dict()
+    problems = []
+    if len(data.get("title", "")) > TITLE_LIMIT:
+        problems.append(f"the title is longer than {TITLE_LIMIT} characters")
+    if len(data.get("description", "")) > DESCRIPTION_LIMIT:
+        problems.append(f"the description is longer than {DESCRIPTION_LIMIT} characters")
+    if len(data.get("footer", {}).get("text", "")) > FOOTER_LIMIT:
+        problems.append(f"the footer is longer than {FOOTER_LIMIT} characters")
+    if len(data.get("author", {}).get("name", "")) > AUTHOR_LIMIT:
+        problems.append(f"the author name is longer than {AUTHOR_LIMIT} characters")
+    fields = data.get("fields", [])
+    if len(fields) > FIELD_COUNT_LIMIT:
+        problems.append(f"there are more than {FIELD_COUNT_LIMIT} fields")
+    for field in fields:
+        name, value = field.get("name", ""), field.get("value", "")
+        if not name or not value:
+            problems.append("a field is empty")
+        if len(name) > FIELD_NAME_LIMIT:
+            problems.append(f"the field name `{name[:50]}...` is longer than {FIELD_NAME_LIMIT} characters")
+        if len(value) > FIELD_VALUE_LIMIT:
+            problems.append(f"the value of field `{name[:50]}` is longer than {FIELD_VALUE_LIMIT} characters")
+    if get_embed_length(data) > TOTAL_LIMIT:
+        problems.append(f"it's longer than {TOTAL_LIMIT} characters in total")
+    if "url" in data and not is_valid_url(data["url"]):
+        problems.append(f"`{data['url'][:100]}` isn't a valid URL")
+    for key in ("image", "thumbnail"):
+        url = data.get(key, {}).get("url")
+        if url is not None and not is_valid_url(url):
+            problems.append(f"`{url[:100]}` isn't a valid {key} URL")
+    return problems
+
+
+def validate_embeds(embeds:typing.List[discord.Embed]) -> typing.List[discord.Embed]:
+    """
+    Check that every one of the given embeds can be sent, raising `EmbedBudgetError` if any can't.
+    """
+
+    problems = []
+    for embed in embeds:
+        problems.extend([i for i in get_embed_problems(embed) if i not in problems])
+    if problems:
+        raise EmbedBudgetError(problems)
+    return embeds
+
+
+def _split_value(value:str) -> typing.List[str]:
+    """
+    Split a field value into chunks that each fit in a field, breaking on whitespace where there is some.
+    """
+
+    chunks = []
+    while len(value) > FIELD_VALUE_LIMIT:
+        split_at = max(value.rfind("\n", 0, FIELD_VALUE_LIMIT), value.rfind(" ", 0, FIELD_VALUE_LIMIT))
+        if split_at <= 0:
+            split_at = FIELD_VALUE_LIMIT
+        chunks.append(value[:split_at])
+        value = value[split_at:].lstrip()
+    if value:
+        chunks.append(value)
+    return chunks
+
+
+def split_embed(embed:discord.Embed) -> typing.List[discord.Embed]:
+    """
+    Split an embed into as many embeds as it takes for each to fit inside of Discord's field count and
+    total length limits. Field values that are too long for one field are carried on in another of the same name.
+    The first embed keeps the description and images; the rest have "(continued)" added to their title.
+    Embeds that already fit are returned as they are.
+    """
+
+    # See if there's anything to do
+    data = embed.to_dict()
+    fields = data.get("fields", [])
+    if len(fields) <= FIELD_COUNT_LIMIT and get_embed_length(data) <= TOTAL_LIMIT and all([len(i.get("value", "")) <= FIELD_VALUE_LIMIT for i in fields]):
+        return [embed]
+
+    # Split long field values
+    split_fields = []
+    for field in fields:
+        for index, chunk in enumerate(_split_value(field.get("value", ""))):
+            split_fields.append({
+                "name": field.get("name", "") if index == 0 else field.get("name", "")[:FIELD_NAME_LIMIT - len(CONTINUED_SUFFIX)] + CONTINUED_SUFFIX,
+                "value": chunk,
+                "inline": field.get("inline", False),
+            })
+
+    # Work out the parts that every embed shares
+    continued = {i: o for i, o in data.items() if i not in ("fields", "description", "image", "thumbnail")}
+    if "title" in continued:
+        continued["title"] = continued["title"][:TITLE_LIMIT - len(CONTINUED_SUFFIX)] + CONTINUED_SUFFIX
+
+    # Fill each embed with as many fields as fit
+    first = dict(data)
+    first["fields"] = []
+    parts = [first]
+    length = get_embed_length(first)
+    for field in split_fields:
+        field_length = len(field["name"]) + len(field["value"])
+        current = parts[-1]
+        if len(current["fields"]) >= FIELD_COUNT_LIMIT or length + field_length > TOTAL_LIMIT:
+            current = dict(continued)
+            current["fields"] = []
+            parts.append(current)
+            length = get_embed_length(current)
+        current["fields"].append(field)
+        length += field_length
+    return [type(embed).from_dict(i) for i in parts]
@@ -0,0 +1,145 @@
+import typing
+import uuid
+
+import discord
+
+from cogs.utils.cache import TimedLRUCache
+
+
+ProfileKey = typing.Tuple[uuid.UUID, int, str]  # (template_id, user_id, name)
+
+
+class EmbedCache(object):
+    """
+    A bounded cache of rendered profile embeds - each entry is every part of a profile that's been split
+    across multiple embeds.
+
+    Embeds are keyed on the profile's identity, a stamp of the content that was rendered, and a fingerprint
+    of the viewing member's roles - only the roles that the template's commands actually check are included
+    in the fingerprint, so members with unrelated roles share cache entries.
+
+    The content stamp is made from the profile's saved field values and the parts of its template that show
+    up in the embed, so a render of a profile that was fetched before a save can't be served once the save
+    has happened, even if it was cached after the save's invalidation went out.
+
+    Invalidating a profile or template evicts its cached embeds, looking them up through an index of the
+    cache's keys rather than scanning the whole cache.
+    """
+
+    __slots__ = ("cache", "keys_by_profile", "profiles_by_template")
+
+    def __init__(self, max_size:int=2_000, ttl:float=3_600):
+        self.cache = TimedLRUCache(max_size=max_size, ttl=ttl, on_evict=self.forget_key)
+        self.keys_by_profile: typing.Dict[ProfileKey, typing.Set[tuple]] = dict()
+        self.profiles_by_template: typing.Dict[uuid.UUID, typing.Set[ProfileKey]] = dict()
+
+    @property
+    def hits(self) -> int:
+        return self.cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self.cache.misses
+
+    def __len__(self):
+        return len(self.cache)
+
+    @staticmethod
+    def get_role_fingerprint(user_profile, member:typing.Optional[discord.Member]) -> typing.Optional[typing.FrozenSet[int]]:
+        """
+        Get the roles of the member that could change how the given profile is rendered.
+        """
+
+        if member is None:
+            return None
+        relevant_role_ids = user_profile.template.compiled.role_ids
+        if not relevant_role_ids:
+            return frozenset()
+        return relevant_role_ids.intersection(member._roles)
+
+    @staticmethod
+    def get_content_stamp(user_profile) -> tuple:
+        """
+        Get everything about a profile and its template that ends up in the profile's embed.
+        """
+
+        template = user_profile.template
+        return (
+            frozenset((user_profile._saved_values or dict()).items()),
+            template.name,
+            template.colour,
+            tuple([
+                (i.field.field_id, i.field.name, i.field.prompt, type(i.field.field_type))
+                for i in template.compiled.fields
+            ]),
+        )
+
+    def get_key(self, user_profile, member:typing.Optional[discord.Member]) -> tuple:
+        profile_key = (user_profile.template_id, user_profile.user_id, user_profile.name)
+        return (profile_key, self.get_content_stamp(user_profile), self.get_role_fingerprint(user_profile, member))
+
+    def get(self, user_profile, member:typing.Optional[discord.Member]) -> typing.Optional[typing.List[discord.Embed]]:
+        """
+        Get a copy of the cached embeds for a given profile and viewer, if there are any.
+        """
+
+        embeds = self.cache.get(self.get_key(user_profile, member), None)
+        if embeds is None:
+            return None
+        return [i.copy() for i in embeds]
+
+    def set(self, user_profile, member:typing.Optional[discord.Member], embeds:typing.List[discord.Embed]) -> None:
+        """
+        Store a copy of the rendered embeds for a given profile and viewer.
+        """
+
+        key = self.get_key(user_profile, member)
+        profile_key = key[0]
+        self.keys_by_profile.setdefault(profile_key, set()).add(key)
+        self.profiles_by_template.setdefault(profile_key[0], set()).add(profile_key)
+        self.cache.set(key, tuple([i.copy() for i in embeds]))
+
+    def forget_key(self, key:tuple) -> None:
+        """
+        Remove a key that's expired or been pushed out of the cache from the index.
+        """
+
+        profile_key = key[0]
+        keys = self.keys_by_profile.get(profile_key)
+        if keys is None:
+            return
+        keys.discard(key)
+        if keys:
+            return
+        del self.keys_by_profile[profile_key]
+        profile_keys = self.profiles_by_template.get(profile_key[0])
+        if profile_keys is not None:
+            profile_keys.discard(profile_key)
+            if not profile_keys:
+                del self.profiles_by_template[profile_key[0]]
+
+    def _evict_profile(self, profile_key:ProfileKey) -> int:
+        keys = self.keys_by_profile.pop(profile_key, ())
+        for key in keys:
+            self.cache.pop(key)
+        return len(keys)
+
+    def invalidate_profile(self, template_id:uuid.UUID, user_id:int, name:str) -> int:
+        """
+        Evict the cached embeds of a profile, returning how many were removed.
+        """
+
+        profile_key = (template_id, user_id, name)
+        profile_keys = self.profiles_by_template.get(template_id)
+        if profile_keys is not None:
+            profile_keys.discard(profile_key)
+            if not profile_keys:
+                del self.profiles_by_template[template_id]
+        return self._evict_profile(profile_key)
+
+    def invalidate_template(self, template_id:uuid.UUID) -> int:
+        """
+        Evict the cached embeds of all of a template's profiles, returning how many were removed.
+        """
+
+        return sum([self._evict_profile(i) for i in self.profiles_by_template.pop(template_id, ())])
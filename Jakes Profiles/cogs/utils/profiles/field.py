@@ -1,6 +1,6 @@
 import uuid
 
-from cogs.utils.profiles.field_type import FieldType, TextField, ImageField, NumberField, BooleanField
+from cogs.utils.profiles.field_type import FieldType, get_field_type
 
 
 class Field(object):
@@ -28,12 +28,18 @@ class Field(object):
         self.name: str = name
         self.prompt: str = prompt
         self.timeout: int = timeout
-        self.field_type: FieldType = {
-            '1000-CHAR': TextField(),
-            'INT': NumberField(),
-            'IMAGE': ImageField(),
-            'BOOLEAN': BooleanField(),
-        }[getattr(field_type, 'name', field_type)]
+        self.field_type: FieldType = get_field_type(field_type)
         self.template_id: uuid.UUID = template_id
         self.optional: bool = optional
         self.deleted: bool = deleted
+
+    @classmethod
+    def from_record(cls, record) -> 'Field':
+        """
+        Build a field from a row of the field table.
+        """
+
+        return cls(
+            record['field_id'], record['name'], record['index'], record['prompt'], record['timeout'],
+            record['field_type'], record['template_id'], record['optional'], record['deleted'],
+        )
@@ -1,4 +1,5 @@
-import re
+import typing
+import urllib.parse
 
 
 class FieldCheckFailure(Exception):
@@ -8,8 +9,13 @@ class FieldCheckFailure(Exception):
 
 
 class FieldType(object):
-    """The typing of a given profile field"""
+    """The typing of a given profile field
 
+    Field types hold no per-field state, so a single instance of each is shared between every field -
+    see `get_field_type`.
+    """
+
+    __slots__ = ()
     name = None
 
     def __str__(self):
@@ -87,22 +93,55 @@ class NumberField(FieldType):
 class ImageField(FieldType):
 
     name = 'IMAGE'
-    matcher = re.compile(r"^(http(s?):)([/|.|\w|\s|-])*\.(?:jpg|gif|png|jpeg|gif)$")
+    valid_schemes = frozenset({"http", "https"})
+    valid_extensions = (".jpg", ".jpeg", ".png", ".gif")
+    valid_content_types = frozenset({"image/jpeg", "image/png", "image/gif"})
+    max_url_length = 1000
+    max_attachment_size = 8 * 1024 * 1024
+
+    @classmethod
+    def is_valid_url(cls, value:str) -> bool:
+        """Returns whether or not the given text is a http(s) URL to an image - query strings and fragments are allowed"""
+
+        if len(value) > cls.max_url_length or any(i.isspace() for i in value):
+            return False
+        try:
+            url = urllib.parse.urlsplit(value)
+        except ValueError:
+            return False
+        return (
+            url.scheme.lower() in cls.valid_schemes
+            and bool(url.netloc)
+            and url.path.lower().endswith(cls.valid_extensions)
+        )
 
     @classmethod
     def check(cls, value):
-        if cls.matcher.search(value):
+        if cls.is_valid_url(value):
             return True
         raise FieldCheckFailure("No valid image URL found.")
 
+    @classmethod
+    def check_attachment(cls, attachment):
+        """Checks an uploaded file by what Discord says it is, rather than by its URL"""
+
+        content_type = getattr(attachment, "content_type", None)
+        if content_type is None:
+            return cls.check(attachment.url)
+        if content_type.split(";")[0].strip().lower() not in cls.valid_content_types:
+            raise FieldCheckFailure("The file you uploaded isn't a PNG, JPEG, or GIF image.")
+        if attachment.size > cls.max_attachment_size:
+            raise FieldCheckFailure(f"The image you uploaded is too large - images can be at most {cls.max_attachment_size // 1024 // 1024}MB.")
+        return True
+
     @classmethod
     def get_from_message(cls, message):
         if message.attachments:
-            content = message.attachments[0].url
-        else:
-            content = message.content
-        cls.check(content)
-        return content
+            attachment = message.attachments[0]
+            cls.check_attachment(attachment)
+            return attachment.url
+        cls.check(message.content)
+        return message.content
 
 
 class BooleanField(FieldType):
@@ -122,3 +161,18 @@ class BooleanField(FieldType):
 # FieldType.NUMBERFIELD = NumberField
 # FieldType.IMAGEFIELD = ImageField
 # FieldType.BOOLEANFIELD = BooleanField
+
+
+# The shared instance of each field type, by its database name
+FIELD_TYPES: typing.Dict[str, FieldType] = {
+    i.name: i()
+    for i in (TextField, NumberField, ImageField, BooleanField)
+}
+
+
+def get_field_type(field_type:typing.Union[str, FieldType, typing.Type[FieldType]]) -> FieldType:
+    """
+    Get the shared instance of a field type from its database name, its class, or an instance of it.
+    """
+
+    return FIELD_TYPES[getattr(field_type, 'name', field_type)]
@@ -23,3 +23,19 @@ class FilledField(object):
         self.field_id: uuid.UUID = field_id
         self.value: str = value
         self.field: Field = field
+
+    @classmethod
+    def from_record(cls, record, field:Field=None, *, user_id:int=None, name:str=None) -> 'FilledField':
+        """
+        Build a filled field from a row of the filled_field table.
+        A user ID and profile name can be given so that every field of a profile shares the profile's
+        objects rather than each holding their own copy from their row.
+        """
+
+        return cls(
+            record['user_id'] if user_id is None else user_id,
+            record['name'] if name is None else name,
+            record['field_id'],
+            record['value'],
+            field,
+        )
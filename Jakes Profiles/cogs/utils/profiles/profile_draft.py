@@ -0,0 +1,133 @@
+import asyncio
+import datetime
+import logging
+import typing
+import uuid
+
+from cogs.utils import queries
+
+
+logger = logging.getLogger("profilebot.drafts")
+
+
+class ProfileDraft(object):
+    """
+    A profile that a user is part of the way through setting up.
+    Each answer is checkpointed to the database in the background as it's given, so that
+    an interrupted setup (eg by the bot restarting) can be resumed from the first unanswered field.
+
+    Args:
+        user_id (int): The ID of the user who the profile is for.
+        template_id (uuid.UUID): The ID of the template that the profile is being made for.
+        name (str): The name given to the profile.
+    Attrs:
+        values (typing.Dict[uuid.UUID, typing.Optional[str]]): The answers given so far, by field ID.
+    """
+
+    __slots__ = ("user_id", "template_id", "name", "values", "_last_write")
+
+    def __init__(self, user_id:int, template_id:uuid.UUID, name:str):
+        self.user_id: int = user_id
+        self.template_id: uuid.UUID = template_id
+        self.name: str = name
+        self.values: typing.Dict[uuid.UUID, typing.Optional[str]] = dict()
+        self._last_write: typing.Optional[asyncio.Task] = None
+
+    @classmethod
+    async def fetch(cls, db, user_id:int, template_id:uuid.UUID) -> typing.Optional['ProfileDraft']:
+        """
+        Get the draft for a given user and template, should there be one.
+        """
+
+        draft_rows = await db(queries.DRAFT, user_id, template_id)
+        if not draft_rows:
+            return None
+        draft = cls(user_id, template_id, draft_rows[0]['name'])
+        field_rows = await db(queries.DRAFT_FIELDS, user_id, template_id)
+        draft.values = {i['field_id']: i['value'] for i in field_rows}
+        return draft
+
+    @classmethod
+    async def delete_expired(cls, db, max_age:datetime.timedelta) -> None:
+        """
+        Delete every draft that hasn't been written to within the given time.
+        """
+
+        await db(queries.DELETE_EXPIRED_DRAFTS, max_age)
+
+    def checkpoint(self, database:typing.Callable, field_id:uuid.UUID=None, value:typing.Optional[str]=None) -> asyncio.Task:
+        """
+        Write the draft to the database in the background. If a field ID is given, its answer is stored;
+        otherwise the draft is (re)started with no answers.
+        Writes are chained so that they land in the order they were made.
+
+        Args:
+            database (typing.Callable): The bot's database context manager, eg `bot.database`.
+            field_id (uuid.UUID, optional): The field that's been answered.
+            value (typing.Optional[str], optional): The answer for the field.
+
+        Returns:
+            asyncio.Task: The task doing the write.
+        """
+
+        if field_id is not None:
+            self.values[field_id] = value
+        previous_write = self._last_write
+
+        async def write():
+            if previous_write is not None:
+                await asyncio.wait([previous_write])
+            try:
+                async with database() as db:
+                    if field_id is None:
+                        await self.start(db)
+                    else:
+                        await self.save_value(db, field_id, value)
+            except Exception as e:
+                logger.warning(f"Failed to checkpoint draft for user {self.user_id} on template {self.template_id} - {e}")
+
+        self._last_write = asyncio.ensure_future(write())
+        return self._last_write
+
+    async def wait_for_checkpoints(self) -> None:
+        """
+        Wait for any background writes to finish. Failed writes are ignored, since the draft is only a backup.
+        """
+
+        if self._last_write is not None:
+            await asyncio.wait([self._last_write])
+
+    async def start(self, db) -> None:
+        """
+        Store the draft in the database, removing any answers from a previous draft for the same template.
+        """
+
+        async with db.conn.transaction():
+            await db(
+                """INSERT INTO profile_draft (user_id, template_id, name) VALUES ($1, $2, $3)
+                ON CONFLICT (user_id, template_id) DO UPDATE SET name=excluded.name, updated_at=excluded.updated_at""",
+                self.user_id, self.template_id, self.name,
+            )
+            await db("DELETE FROM profile_draft_field WHERE user_id=$1 AND template_id=$2", self.user_id, self.template_id)
+
+    async def save_value(self, db, field_id:uuid.UUID, value:typing.Optional[str]) -> None:
+        """
+        Store a single answer for the draft, updating the draft's last written time.
+        """
+
+        await db(
+            """WITH touched AS (
+                UPDATE profile_draft SET updated_at=(NOW() AT TIME ZONE 'utc') WHERE user_id=$1 AND template_id=$2
+            )
+            INSERT INTO profile_draft_field (user_id, template_id, field_id, value) VALUES ($1, $2, $3, $4)
+            ON CONFLICT (user_id, template_id, field_id) DO UPDATE SET value=excluded.value""",
+            self.user_id, self.template_id, field_id, value,
+        )
+
+    async def delete(self, db) -> None:
+        """
+        Remove the draft from the database, once it's no longer needed. Any background writes should be
+        waited for with `wait_for_checkpoints` before taking the connection, so they can't re-create the draft.
+        """
+
+        await db("DELETE FROM profile_draft WHERE user_id=$1 AND template_id=$2", self.user_id, self.template_id)
@@ -1,3 +1,5 @@
+import csv
+import json
 import typing
 import uuid
 import re
@@ -6,9 +8,13 @@ import discord
 from discord.ext import commands
 import voxelbotutils as utils
 
+from cogs.utils.cache import TimedLRUCache
+from cogs.utils import queries
 from cogs.utils.profiles.field import Field
 from cogs.utils.profiles.filled_field import FilledField
 from cogs.utils.profiles.command_processor import CommandProcessor, InvalidCommandText
+from cogs.utils.profiles.compiled_template import CompiledTemplate
+from cogs.utils.profiles import embed_budget
 
 
 class TemplateNotFoundError(commands.BadArgument):
@@ -44,7 +50,10 @@ class Template(object):
 
     TEMPLATE_ID_REGEX = re.compile(r"^(?P<uuid>.{8}-.{4}-.{4}-.{4}-.{12})$")
 
-    __slots__ = ("template_id", "colour", "guild_id", "verification_channel_id", "name", "archive_channel_id", "role_id", "max_profile_count", "max_field_count", "all_fields",)
+    # (guild_id, lower(name)): template row - a None value means that the template doesn't exist
+    name_cache = TimedLRUCache(max_size=10_000, ttl=600)
+
+    __slots__ = ("template_id", "colour", "guild_id", "verification_channel_id", "name", "archive_channel_id", "role_id", "max_profile_count", "max_field_count", "all_fields", "compiled",)
 
     def __init__(self, template_id:uuid.UUID, colour:int, guild_id:int, verification_channel_id:str, name:str, archive_channel_id:str, role_id:str, max_profile_count:int, max_field_count:int):
         self.template_id: uuid.UUID = template_id
@@ -57,6 +66,7 @@ class Template(object):
         self.max_profile_count: int = max_profile_count
         self.max_field_count: int = max_field_count
         self.all_fields: typing.Dict[uuid.UUID, Field] = dict()
+        self.compiled: CompiledTemplate = CompiledTemplate.from_fields(())
 
     @property
     def should_send_message(self) -> bool:
@@ -110,10 +120,10 @@ class Template(object):
     @property
     def fields(self) -> typing.Dict[uuid.UUID, Field]:
         """
-        Returns a list of `utils.Field` objects for this particular profile.
+        Returns a dict of the non-deleted `utils.Field` objects for this particular profile, in index order.
         """
 
-        return {i: o for i, o in self.all_fields.items() if o.deleted is False}
+        return {i.field.field_id: i.field for i in self.compiled.fields}
 
     async def fetch_profile_for_user(self, db, user_id:int, profile_name:str=None, *, fetch_filled_fields:bool=True) -> 'cogs.utils.profiles.user_profile.UserProfile':
         """
@@ -137,14 +147,14 @@ class Template(object):
 
         # Grab the user profile
         if profile_name is None:
-            profile_rows = await db("SELECT * FROM created_profile WHERE template_id=$1 AND user_id=$2", self.template_id, user_id)
+            profile_rows = await db(queries.PROFILES_FOR_USER, self.template_id, user_id)
         else:
-            profile_rows = await db("SELECT * FROM created_profile WHERE template_id=$1 AND user_id=$2 AND LOWER(name)=LOWER($3)", self.template_id, user_id, profile_name)
+            profile_rows = await db(queries.PROFILE_FOR_USER_BY_NAME, self.template_id, user_id, profile_name)
         if not profile_rows:
             return None
         if profile_name is None and len(profile_rows) > 1:
             raise ValueError("Too many saved profiles to have no set profile name")
-        user_profile = UserProfile(**profile_rows[0], template=self)
+        user_profile = UserProfile.from_record(profile_rows[0], self)
         if fetch_filled_fields:
             await user_profile.fetch_filled_fields(db)
         return user_profile
@@ -165,10 +175,10 @@ class Template(object):
         from cogs.utils.profiles.user_profile import UserProfile
 
         # Grab the user profile
-        profile_rows = await db("SELECT * FROM created_profile WHERE template_id=$1 AND user_id=$2", self.template_id, user_id)
-        profiles = [UserProfile(**i, template=self) for i in profile_rows]
+        profile_rows = await db(queries.PROFILES_FOR_USER, self.template_id, user_id)
+        profiles = [UserProfile.from_record(i, self) for i in profile_rows]
         if fetch_filled_fields:
-            [await i.fetch_filled_fields(db) for i in profiles]
+            await UserProfile.fetch_filled_fields_for_profiles(db, profiles, self)
         return profiles
 
     async def fetch_all_profiles(self, db,  *, fetch_filled_fields:bool=True) -> typing.List['cogs.utils.profiles.user_profile.UserProfile']:
@@ -186,12 +196,161 @@ class Template(object):
         from cogs.utils.profiles.user_profile import UserProfile
 
         # Grab the user profile
-        profile_rows = await db("SELECT * FROM created_profile WHERE template_id=$1", self.template_id)
-        profiles = [UserProfile(**i, template=self) for i in profile_rows]
+        profile_rows = await db(queries.PROFILES_FOR_TEMPLATE, self.template_id)
+        profiles = [UserProfile.from_record(i, self) for i in profile_rows]
         if fetch_filled_fields:
-            [await i.fetch_filled_fields(db) for i in profiles]
+            await UserProfile.fetch_filled_fields_for_profiles(db, profiles, self)
         return profiles
 
+    async def iterate_all_profiles(self, db, *, batch_size:int=500, fetch_filled_fields:bool=True) -> typing.AsyncIterator['cogs.utils.profiles.user_profile.UserProfile']:
+        """
+        Iterate over all of the profiles for this template, fetching them from the database in batches
+        so that large templates don't need to be held in memory all at once.
+
+        Args:
+            db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+            batch_size (int, optional): How many profiles to fetch from the database at a time.
+            fetch_filled_fields (bool, optional): Whether or not to populate the filled fields for the UserProfile.
+
+        Yields:
+            cogs.utils.profiles.user_profile.UserProfile: Each of the profiles for the template, ordered by user ID and name.
+        """
+
+        # Grab our imports here to avoid circular importing
+        from cogs.utils.profiles.user_profile import UserProfile
+
+        # Page through the profiles using the last key we saw
+        last_key = None
+        while True:
+            if last_key is None:
+                profile_rows = await db(queries.PROFILES_FOR_TEMPLATE_FIRST_PAGE, self.template_id, batch_size)
+            else:
+                profile_rows = await db(queries.PROFILES_FOR_TEMPLATE_PAGE_AFTER, self.template_id, *last_key, batch_size)
+            if not profile_rows:
+                return
+            profiles = [UserProfile.from_record(i, self) for i in profile_rows]
+            if fetch_filled_fields:
+                await UserProfile.fetch_filled_fields_for_profiles(db, profiles, self)
+            for profile in profiles:
+                yield profile
+            if len(profile_rows) < batch_size:
+                return
+            last_key = (profiles[-1].user_id, profiles[-1].name)
+
+    async def fetch_pending_profiles(self, db, *, after:typing.Tuple[int, str]=None, limit:int=10) -> typing.List['cogs.utils.profiles.user_profile.UserProfile']:
+        """
+        Get a page of the profiles for this template that are waiting to be verified, ordered by user ID and name.
+
+        Args:
+            db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+            after (typing.Tuple[int, str], optional): The (user_id, name) of the last profile of the previous page.
+            limit (int, optional): How many profiles to get.
+
+        Returns:
+            typing.List[cogs.utils.profiles.user_profile.UserProfile]: The pending profiles, without their filled fields.
+        """
+
+        # Grab our imports here to avoid circular importing
+        from cogs.utils.profiles.user_profile import UserProfile
+
+        # Get the profiles
+        if after is None:
+            profile_rows = await db(queries.PENDING_PROFILES_FIRST_PAGE, self.template_id, limit)
+        else:
+            profile_rows = await db(queries.PENDING_PROFILES_PAGE_AFTER, self.template_id, *after, limit)
+        return [UserProfile.from_record(i, self) for i in profile_rows]
+
+    EXPORT_FORMATS = ("ndjson", "csv")
+
+    async def export_profiles(self, db, fp:typing.TextIO, *, file_format:str="ndjson", batch_size:int=500, on_progress:typing.Callable[[int], typing.Any]=None) -> int:
+        """
+        Write every profile for this template out to a file, one profile per line (or row).
+        Profiles and their filled fields are fetched in batches through `iterate_all_profiles` and written
+        as they arrive, so memory use doesn't grow with the size of the template. Only the template's
+        live fields are included, in index order.
+
+        Args:
+            db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+            fp (typing.TextIO): The file to write to - for CSV this should have been opened with `newline=""`.
+            file_format (str, optional): Either `ndjson` or `csv`.
+            batch_size (int, optional): How many profiles to fetch from the database at a time.
+            on_progress (typing.Callable[[int], typing.Any], optional): Called with the number of profiles written after each batch.
+
+        Returns:
+            int: How many profiles were written.
+        """
+
+        if file_format not in self.EXPORT_FORMATS:
+            raise ValueError(f"Invalid export format {file_format}")
+        fields = [i.field for i in self.compiled.fields]
+
+        # Set up the writer
+        if file_format == "csv":
+            writer = csv.writer(fp)
+            writer.writerow(["user_id", "name", "verified", *[i.name for i in fields]])
+
+            def write_profile(user_profile, values):
+                writer.writerow([user_profile.user_id, user_profile.name, user_profile.verified, *[values.get(i.field_id, "") for i in fields]])
+        else:
+
+            def write_profile(user_profile, values):
+                fp.write(json.dumps({
+                    "user_id": str(user_profile.user_id),
+                    "name": user_profile.name,
+                    "verified": user_profile.verified,
+                    "fields": {i.name: values[i.field_id] for i in fields if i.field_id in values},
+                }) + "\n")
+
+        # Stream the profiles, all from the same snapshot of the database
+        written = 0
+        async with db.conn.transaction(isolation="repeatable_read", readonly=True):
+            async for user_profile in self.iterate_all_profiles(db, batch_size=batch_size):
+                values = {
+                    field_id: filled_field.value
+                    for field_id, filled_field in user_profile.all_filled_fields.items()
+                    if filled_field.value is not None
+                }
+                write_profile(user_profile, values)
+                written += 1
+                if on_progress is not None and written % batch_size == 0:
+                    on_progress(written)
+        fp.flush()
+        if on_progress is not None:
+            on_progress(written)
+        return written
+
+    SEARCH_QUERY_MAX_LENGTH = 200
+
+    async def search_profiles(self, db, query:str, *, verified_only:bool=True, after:typing.Tuple[int, int, str]=None, limit:int=10) -> typing.List[typing.Tuple['cogs.utils.profiles.user_profile.UserProfile', int]]:
+        """
+        Search the filled fields of this template's profiles, best matches first.
+        The query is given in web search syntax (`"quoted phrases"`, `or`, `-excluded`), and is matched against each
+        field on its own through the GIN index on filled_field.search_vector; a profile's rank is the total rank of its matching fields,
+        as a whole number of millionths so that pages can be keyed on it without float comparisons skipping or repeating profiles.
+
+        Args:
+            db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+            query (str): What to search for.
+            verified_only (bool, optional): Whether or not to leave out profiles that haven't been verified.
+            after (typing.Tuple[int, int, str], optional): The (rank, user_id, name) of the last profile of the previous page.
+            limit (int, optional): How many profiles to get.
+
+        Returns:
+            typing.List[typing.Tuple[cogs.utils.profiles.user_profile.UserProfile, int]]: Each matching profile
+                (without its filled fields) and its rank.
+        """
+
+        # Grab our imports here to avoid circular importing
+        from cogs.utils.profiles.user_profile import UserProfile
+
+        # Get the matches, with the page's key if we're past the first
+        args = [self.template_id, query, [i.field.field_id for i in self.compiled.fields], verified_only, limit]
+        if after is None:
+            profile_rows = await db(queries.SEARCH_PROFILES.format(key_filter=""), *args)
+        else:
+            profile_rows = await db(queries.SEARCH_PROFILES.format(key_filter=queries.SEARCH_PROFILES_AFTER_FILTER), *args, *after)
+        return [(UserProfile.from_record(i, self), i['rank']) for i in profile_rows]
+
     @classmethod
     async def fetch_template_by_id(cls, db, template_id:uuid.UUID, *, fetch_fields:bool=True) -> typing.Optional['Template']:
         """
@@ -199,7 +358,7 @@ class Template(object):
         """
 
         # Grab the template
-        template_rows = await db("SELECT * FROM template WHERE template_id=$1", template_id)
+        template_rows = await db(queries.TEMPLATE_BY_ID, template_id)
         if not template_rows:
             return None
         template = cls(**template_rows[0])
@@ -211,27 +370,68 @@ class Template(object):
     async def fetch_template_by_name(cls, db, guild_id:int, template_name:str, *, fetch_fields:bool=True) -> typing.Optional['Template']:
         """
         Get a template from the database via its name.
+        Lookups are stored in (and read from) the name cache, including lookups for templates that don't exist.
         """
 
+        # See if it's cached
+        cache_key = (guild_id, template_name.lower())
+        template_row = cls.name_cache.get(cache_key)
+
         # Grab the template
-        template_rows = await db("SELECT * FROM template WHERE guild_id=$1 AND LOWER(name)=LOWER($2)", guild_id, template_name)
-        if not template_rows:
+        if template_row is TimedLRUCache.MISSING:
+            template_rows = await db(queries.TEMPLATE_BY_NAME, guild_id, template_name)
+            template_row = dict(template_rows[0]) if template_rows else None
+            cls.name_cache.set(cache_key, template_row)
+        if template_row is None:
             return None
-        template = cls(**template_rows[0])
+        template = cls(**template_row)
         if fetch_fields:
             await template.fetch_fields(db)
         return template
 
+    @classmethod
+    def get_cached_template_by_name(cls, guild_id:int, template_name:str) -> typing.Union['Template', None, object]:
+        """
+        Get a template from the name cache without touching the database.
+
+        Returns:
+            typing.Union[Template, None, object]: The cached template (without its fields), None if the template is
+                cached as not existing, or `TimedLRUCache.MISSING` if there's no cache entry at all.
+        """
+
+        template_row = cls.name_cache.get((guild_id, template_name.lower()))
+        if template_row is TimedLRUCache.MISSING or template_row is None:
+            return template_row
+        return cls(**template_row)
+
+    @classmethod
+    def invalidate_name_cache(cls, guild_id:int, *template_names:str) -> None:
+        """
+        Remove the given template names from the name cache. Should be called whenever a template is
+        created, renamed, edited, or deleted.
+        """
+
+        for name in template_names:
+            if name is None:
+                continue
+            cls.name_cache.pop((guild_id, name.lower()))
+
     async def fetch_fields(self, db) -> typing.Dict[uuid.UUID, FilledField]:
         """
         Fetch the fields for this template and store them in .all_fields.
         """
 
-        field_rows = await db("SELECT * FROM field WHERE template_id=$1", self.template_id)
-        self.all_fields.clear()
-        for f in field_rows:
-            field = Field(**f)
-            self.all_fields[field.field_id] = field
+        field_rows = await db(queries.FIELDS_FOR_TEMPLATE, self.template_id)
+        return self.set_fields([Field.from_record(f) for f in field_rows])
+
+    def set_fields(self, fields:typing.Iterable[Field]) -> typing.Dict[uuid.UUID, Field]:
+        """
+        Store the given fields in .all_fields and build a new compiled snapshot from them.
+        The old snapshot is replaced rather than changed, so anything still holding it is unaffected.
+        """
+
+        self.all_fields = {i.field_id: i for i in fields}
+        self.compiled = CompiledTemplate.from_fields(self.all_fields.values())
         return self.all_fields
 
     @classmethod
@@ -255,10 +455,27 @@ class Template(object):
     def build_embed(self, bot, brief:bool=False) -> utils.Embed:
         """
         Create an embed to visualise all of the created fields and given information.
+        Templates too large for one embed only have their first part returned here - see `build_embeds`.
+        """
+
+        return self.build_embeds(bot, brief)[0]
+
+    def build_embeds(self, bot, brief:bool=False) -> typing.List[utils.Embed]:
+        """
+        Create as many embeds as it takes to visualise the template inside of Discord's limits.
+
+        Raises:
+            cogs.utils.profiles.embed_budget.EmbedBudgetError: The template can't be sent even when split up.
+        """
+
+        return embed_budget.validate_embeds(embed_budget.split_embed(self._build_embed(bot, brief)))
+
+    def _build_embed(self, bot, brief:bool=False) -> utils.Embed:
+        """
+        Renders the template into a single embed, which may be too large to send.
         """
 
         # Create the initial embed
-        fields: typing.List[Field] = sorted(self.fields.values(), key=lambda x: x.index)
         embed = utils.Embed(use_random_colour=True, title=self.name)
 
         # Work out what goes in the description
@@ -322,18 +539,9 @@ class Template(object):
         # Add each of the fields
         text = []
         char_limit_text = []
-        for index, f in enumerate(fields):
-            if f.deleted:
-                continue
-
-            # Work out the field type
-            field_type_string = str(f.field_type)
-            is_command, is_valid_command = CommandProcessor.get_is_command(f.prompt)
-            if is_command:
-                if is_valid_command:
-                    field_type_string = "COMMAND"
-                else:
-                    field_type_string = "COMMAND::INVALID"
+        for index, compiled_field in enumerate(self.compiled.fields):
+            f = compiled_field.field
+            field_type_string = compiled_field.field_type_string
 
             # Wew let's add this jazz
             if brief:
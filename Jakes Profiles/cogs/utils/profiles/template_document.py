@@ -0,0 +1,379 @@
+import collections
+import json
+import re
+import string
+import typing
+import uuid
+
+import discord
+from discord.ext import commands
+import toml
+
+from cogs.utils import queries
+from cogs.utils.profiles.field import Field
+from cogs.utils.profiles.field_type import FIELD_TYPES, ImageField
+from cogs.utils.profiles.command_processor import CommandProcessor
+
+
+DOCUMENT_VERSION = 1
+
+TEMPLATE_KEYS = frozenset({"version", "name", "colour", "verification_channel", "archive_channel", "role", "max_profile_count", "max_field_count", "fields"})
+FIELD_KEYS = frozenset({"name", "prompt", "type", "timeout", "optional"})
+
+MIN_FIELD_TIMEOUT = 30
+MAX_FIELD_TIMEOUT = 600
+DEFAULT_FIELD_TIMEOUT = 120
+COMMAND_FIELD_TIMEOUT = 15
+MAX_PROMPT_LENGTH = 2000  # Prompts are sent as messages, so they need to fit in one
+MAX_COMMAND_LENGTH = 2000
+
+
+class TemplateDocumentError(commands.BadArgument):
+    """
+    A template document couldn't be loaded.
+
+    Args:
+        problems (typing.List[str]): Everything that's wrong with the document.
+    """
+
+    def __init__(self, problems:typing.List[str]):
+        self.problems: typing.List[str] = problems
+        super().__init__("That template document isn't valid:\n" + "\n".join([f"\N{BULLET} {i}" for i in problems[:20]]))
+
+
+class FieldDocument(typing.NamedTuple):
+    """
+    A single field of a template document.
+    """
+
+    name: str
+    prompt: str
+    field_type: str
+    timeout: int
+    optional: bool
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "prompt": self.prompt,
+            "type": self.field_type,
+            "timeout": self.timeout,
+            "optional": self.optional,
+        }
+
+
+class TemplateDocument(typing.NamedTuple):
+    """
+    A template and all of its live fields, described as a single document that can be
+    written out as JSON or TOML and loaded back in.
+    Everything about the document itself is checked in `from_dict`, and everything that depends on
+    the guild it's being loaded into in `get_guild_problems` - neither of them talk to the database or the API.
+
+    Args:
+        name (str): The name of the template.
+        colour (int): The colour of the template's embeds.
+        verification_channel (typing.Optional[str]): A channel ID or a command, as it's stored on the template.
+        archive_channel (typing.Optional[str]): A channel ID or a command, as it's stored on the template.
+        role (typing.Optional[str]): A role ID or a command, as it's stored on the template.
+        max_profile_count (int): How many profiles each user can make.
+        max_field_count (int): How many fields the template can have.
+        fields (typing.Tuple[FieldDocument, ...]): The template's fields, in order.
+    """
+
+    name: str
+    colour: int
+    verification_channel: typing.Optional[str]
+    archive_channel: typing.Optional[str]
+    role: typing.Optional[str]
+    max_profile_count: int
+    max_field_count: int
+    fields: typing.Tuple[FieldDocument, ...]
+
+    FORMATS = ("json", "toml")
+    CODE_BLOCK_REGEX = re.compile(r"```(?P<language>[a-z]*)\n(?P<content>.*?)```", re.DOTALL)  # A document pasted inside of a code block
+
+    @classmethod
+    def from_template(cls, template) -> 'TemplateDocument':
+        """
+        Describe a template that's had its fields fetched.
+        """
+
+        return cls(
+            name=template.name,
+            colour=template.colour or 0,
+            verification_channel=template.verification_channel_id,
+            archive_channel=template.archive_channel_id,
+            role=template.role_id,
+            max_profile_count=template.max_profile_count,
+            max_field_count=template.max_field_count,
+            fields=tuple([
+                FieldDocument(i.field.name, i.field.prompt, i.field.field_type.name, i.field.timeout, i.field.optional)
+                for i in template.compiled.fields
+            ]),
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Get the document as a dict. Unset channels and roles are left out, since TOML has no null.
+        """
+
+        data = {"version": DOCUMENT_VERSION, "name": self.name, "colour": self.colour}
+        for key in ("verification_channel", "archive_channel", "role"):
+            if getattr(self, key) is not None:
+                data[key] = getattr(self, key)
+        data["max_profile_count"] = self.max_profile_count
+        data["max_field_count"] = self.max_field_count
+        data["fields"] = [i.to_dict() for i in self.fields]
+        return data
+
+    def dumps(self, file_format:str="json") -> str:
+        """
+        Write the document out as either JSON or TOML.
+        """
+
+        if file_format == "json":
+            return json.dumps(self.to_dict(), indent=4)
+        if file_format == "toml":
+            return toml.dumps(self.to_dict())
+        raise ValueError(f"Invalid document format {file_format}")
+
+    @classmethod
+    def loads(cls, text:str, file_format:str=None) -> 'TemplateDocument':
+        """
+        Load a document from JSON or TOML text. If the format isn't given then it's JSON if the
+        text starts with a brace and TOML otherwise.
+
+        Raises:
+            TemplateDocumentError: The text couldn't be parsed, or the document in it isn't valid.
+        """
+
+        text = text.strip()
+        if file_format is None:
+            file_format = "json" if text.startswith("{") else "toml"
+        try:
+            if file_format == "json":
+                data = json.loads(text)
+            elif file_format == "toml":
+                data = toml.loads(text)
+            else:
+                raise TemplateDocumentError([f"`{file_format}` isn't a supported format - use one of {', '.join(cls.FORMATS)}"])
+        except (ValueError, TypeError, IndexError) as e:
+            raise TemplateDocumentError([f"the document isn't valid {file_format.upper()} - {e}"])
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data:dict) -> 'TemplateDocument':
+        """
+        Check and load a document from its dict, collecting every problem with it rather than stopping at the first.
+
+        Raises:
+            TemplateDocumentError: The document isn't valid.
+        """
+
+        if not isinstance(data, dict):
+            raise TemplateDocumentError(["the document needs to be a table of keys and values"])
+        problems = []
+        problems.extend([f"`{i}` isn't a template key" for i in data.keys() if i not in TEMPLATE_KEYS])
+        if data.get("version", DOCUMENT_VERSION) != DOCUMENT_VERSION:
+            problems.append(f"only version {DOCUMENT_VERSION} documents can be loaded")
+
+        # Check the template name
+        name = data.get("name")
+        if not isinstance(name, str) or not 30 >= len(name) >= 1:
+            problems.append("the template `name` needs to be between 1 and 30 characters")
+        elif len([i for i in name if i not in string.ascii_letters + string.digits]) > 0:
+            problems.append("the template `name` can only contain letters and digits")
+
+        # Check the numbers
+        colour = data.get("colour", 0)
+        if not _is_int(colour) or not 0xffffff >= colour >= 0:
+            problems.append("the `colour` needs to be a number between 0 and 16777215 (0xffffff)")
+        max_profile_count = data.get("max_profile_count", 1)
+        if not _is_int(max_profile_count) or max_profile_count < 0:
+            problems.append("the `max_profile_count` needs to be a number that's at least 0")
+        max_field_count = data.get("max_field_count", 10)
+        if not _is_int(max_field_count) or max_field_count < 0:
+            problems.append("the `max_field_count` needs to be a number that's at least 0")
+
+        # Check the channels and role
+        ids = dict()
+        for key in ("verification_channel", "archive_channel", "role"):
+            value = data.get(key)
+            if _is_int(value):
+                value = str(value)
+            if value is not None and (not isinstance(value, str) or len(value) > MAX_COMMAND_LENGTH or not _is_id_or_command(value)):
+                problems.append(f"the `{key}` needs to be an ID or a valid command")
+            ids[key] = value
+
+        # Check the fields
+        fields = []
+        field_data = data.get("fields", [])
+        if not isinstance(field_data, list):
+            problems.append("the `fields` need to be a list")
+            field_data = []
+        for index, field in enumerate(field_data):
+            field_problems, field = cls._field_from_dict(field)
+            problems.extend([f"field {index + 1} - {i}" for i in field_problems])
+            if field is not None:
+                fields.append(field)
+        name_counts = collections.Counter([i.name.lower() for i in fields])
+        problems.extend([f"there's more than one field named `{i}`" for i in sorted([i for i, o in name_counts.items() if o > 1])])
+        if len([i for i in fields if i.field_type == ImageField.name]) > 1:
+            problems.append("a template can only have one image field")
+
+        # And done
+        if problems:
+            raise TemplateDocumentError(problems)
+        return cls(
+            name=name,
+            colour=colour,
+            verification_channel=ids["verification_channel"],
+            archive_channel=ids["archive_channel"],
+            role=ids["role"],
+            max_profile_count=max_profile_count,
+            max_field_count=max_field_count,
+            fields=tuple(fields),
+        )
+
+    @staticmethod
+    def _field_from_dict(data:dict) -> typing.Tuple[typing.List[str], typing.Optional[FieldDocument]]:
+        """
+        Check and load a single field, returning its problems and the field (if it doesn't have any).
+        """
+
+        if not isinstance(data, dict):
+            return ["it needs to be a table of keys and values"], None
+        problems = [f"`{i}` isn't a field key" for i in data.keys() if i not in FIELD_KEYS]
+        name, prompt = data.get("name"), data.get("prompt")
+        if not isinstance(name, str) or not 256 >= len(name) >= 1:
+            problems.append("the `name` needs to be between 1 and 256 characters")
+        if not isinstance(prompt, str) or not MAX_PROMPT_LENGTH >= len(prompt) >= 1:
+            problems.append(f"the `prompt` needs to be between 1 and {MAX_PROMPT_LENGTH} characters")
+            return problems, None
+
+        # Commands aren't asked so their timeout doesn't matter, but anything else needs a sensible one
+        is_command = CommandProcessor.is_command(prompt)
+        if is_command and CommandProcessor.compile(prompt) is None:
+            problems.append("the `prompt` looks like a command but isn't a valid one")
+        min_timeout = 0 if is_command else MIN_FIELD_TIMEOUT
+        timeout = data.get("timeout", COMMAND_FIELD_TIMEOUT if is_command else DEFAULT_FIELD_TIMEOUT)
+        if not _is_int(timeout) or not MAX_FIELD_TIMEOUT >= timeout >= min_timeout:
+            problems.append(f"the `timeout` needs to be a number of seconds between {min_timeout} and {MAX_FIELD_TIMEOUT}")
+
+        # Check everything else
+        field_type = data.get("type", "1000-CHAR")
+        if not isinstance(field_type, str) or field_type.upper() not in FIELD_TYPES:
+            problems.append(f"the `type` needs to be one of {', '.join(FIELD_TYPES.keys())}")
+        optional = data.get("optional", False)
+        if not isinstance(optional, bool):
+            problems.append("`optional` needs to be either true or false")
+        if problems:
+            return problems, None
+        return problems, FieldDocument(name, prompt, field_type.upper(), timeout, optional)
+
+    def get_guild_problems(self, guild:discord.Guild, guild_settings, template=None, *, is_bot_support:bool=False) -> typing.List[str]:
+        """
+        Check the document against the guild that it's being loaded into, using only the guild's cached channels and roles.
+
+        Args:
+            guild (discord.Guild): The guild the template is going to be in.
+            guild_settings (cogs.utils.guild_settings.GuildSettings): The settings for that guild.
+            template (cogs.utils.profiles.template.Template, optional): The template being overwritten - limits that are
+                already set on it are allowed to stay, even if they're over the guild's limits.
+            is_bot_support (bool, optional): Whether or not the guild's limits should be ignored.
+
+        Returns:
+            typing.List[str]: Everything that's wrong - empty if the document can be loaded.
+        """
+
+        problems = []
+        for key in ("verification_channel", "archive_channel"):
+            value = getattr(self, key)
+            if value is not None and value.isdigit() and not isinstance(guild.get_channel(int(value)), discord.TextChannel):
+                problems.append(f"the `{key}` isn't a text channel on this server")
+        if self.role is not None and self.role.isdigit() and guild.get_role(int(self.role)) is None:
+            problems.append("the `role` isn't a role on this server")
+        if is_bot_support:
+            return problems
+        max_profile_count = max([guild_settings.max_template_profile_count, getattr(template, "max_profile_count", None) or 0])
+        if self.max_profile_count > max_profile_count:
+            problems.append(f"the `max_profile_count` can be at most {max_profile_count}")
+        max_field_count = max([guild_settings.max_template_field_count, getattr(template, "max_field_count", None) or 0])
+        if self.max_field_count > max_field_count:
+            problems.append(f"the `max_field_count` can be at most {max_field_count}")
+        field_limit = max([guild_settings.max_template_field_count, self.max_field_count])
+        if len(self.fields) > field_limit:
+            problems.append(f"a template can have at most {field_limit} fields")
+        return problems
+
+    async def apply(self, db, guild_id:int, template_id:uuid.UUID=None) -> typing.Tuple[uuid.UUID, typing.List[Field]]:
+        """
+        Write the document to the database in a single transaction, either as a new template or over the top of an existing one.
+        Fields are matched to the template's live fields by name, so the profile data stored against them is kept; live
+        fields that aren't in the document are marked as deleted.
+
+        Args:
+            db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+            guild_id (int): The guild the template is in.
+            template_id (uuid.UUID, optional): The template to overwrite - a new template is made if this isn't given.
+
+        Returns:
+            typing.Tuple[uuid.UUID, typing.List[Field]]: The ID of the template and its new live fields.
+
+        Raises:
+            asyncpg.UniqueViolationError: A new template was made with a name that's already in use.
+        """
+
+        async with db.conn.transaction():
+
+            # Write the template itself
+            if template_id is None:
+                template_id = uuid.uuid4()
+                await db(
+                    """INSERT INTO template (template_id, name, colour, guild_id, verification_channel_id, archive_channel_id,
+                    role_id, max_profile_count, max_field_count) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)""",
+                    template_id, self.name, self.colour, guild_id, self.verification_channel, self.archive_channel,
+                    self.role, self.max_profile_count, self.max_field_count,
+                )
+                existing_fields = dict()
+            else:
+                await db(
+                    """UPDATE template SET name=$2, colour=$3, verification_channel_id=$4, archive_channel_id=$5, role_id=$6,
+                    max_profile_count=$7, max_field_count=$8 WHERE template_id=$1""",
+                    template_id, self.name, self.colour, self.verification_channel, self.archive_channel,
+                    self.role, self.max_profile_count, self.max_field_count,
+                )
+                rows = await db(queries.LIVE_FIELDS_FOR_UPDATE, template_id)
+                existing_fields = {i['name'].lower(): i['field_id'] for i in rows}
+
+            # Work out which fields are new and which are kept
+            fields = [
+                Field(
+                    field_id=existing_fields.get(i.name.lower()) or uuid.uuid4(), name=i.name, index=index, prompt=i.prompt,
+                    timeout=i.timeout, field_type=i.field_type, template_id=template_id, optional=i.optional, deleted=False,
+                )
+                for index, i in enumerate(self.fields)
+            ]
+            # Write the fields
+            await db.conn.executemany(
+                """INSERT INTO field (field_id, name, index, prompt, timeout, field_type, optional, template_id)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8) ON CONFLICT (field_id) DO UPDATE SET name=excluded.name,
+                index=excluded.index, prompt=excluded.prompt, timeout=excluded.timeout, field_type=excluded.field_type,
+                optional=excluded.optional""",
+                [(i.field_id, i.name, i.index, i.prompt, i.timeout, i.field_type.name, i.optional, template_id) for i in fields],
+            )
+            removed_field_ids = set(existing_fields.values()) - set([i.field_id for i in fields])
+            if removed_field_ids:
+                await db("UPDATE field SET deleted=true WHERE field_id=ANY($1::UUID[])", list(removed_field_ids))
+        return template_id, fields
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_id_or_command(value:str) -> bool:
+    if value.isdigit():
+        return True
+    is_command, is_valid_command = CommandProcessor.get_is_command(value)
+    return is_command and is_valid_command
@@ -4,10 +4,11 @@ import uuid
 import discord
 import voxelbotutils as utils
 
+from cogs.utils import queries
 from cogs.utils.profiles.template import Template
 from cogs.utils.profiles.filled_field import FilledField
-from cogs.utils.profiles.field_type import ImageField
-from cogs.utils.profiles.command_processor import CommandProcessor, InvalidCommandText
+from cogs.utils.profiles.embed_cache import EmbedCache
+from cogs.utils.profiles import embed_budget
 
 
 class UserProfile(object):
@@ -19,7 +20,9 @@ class UserProfile(object):
     with this.
     """
 
-    __slots__ = ("user_id", "name", "template_id", "verified", "all_filled_fields", "template", "posted_message_id", "posted_channel_id")
+    embed_cache = EmbedCache()
+
+    __slots__ = ("user_id", "name", "template_id", "verified", "all_filled_fields", "template", "posted_message_id", "posted_channel_id", "_saved_values")
 
     def __init__(self, user_id:int, name:str, template_id:uuid.UUID, verified:bool, posted_message_id:int=None, posted_channel_id:int=None, template:Template=None):
         self.user_id: int = user_id
@@ -30,20 +33,154 @@ class UserProfile(object):
         self.posted_channel_id = posted_channel_id
         self.all_filled_fields: typing.Dict[uuid.UUID, FilledField] = dict()
         self.template: Template = template
+        self._saved_values: typing.Optional[typing.Dict[uuid.UUID, typing.Optional[str]]] = None  # field_id: value as it is in the database
+
+    @classmethod
+    def from_record(cls, record, template:Template=None) -> 'UserProfile':
+        """
+        Build a profile from a row of the created_profile table.
+        """
+
+        return cls(
+            record['user_id'], record['name'], record['template_id'], record['verified'],
+            record['posted_message_id'], record['posted_channel_id'], template,
+        )
 
     async def fetch_filled_fields(self, db) -> typing.Dict[uuid.UUID, FilledField]:
         """Fetch the fields for this profile and store them in .all_filled_fields"""
 
         if self.template is None or len(self.template.all_fields) == 0:
             await self.fetch_template(db, fetch_fields=True)
-        field_rows = await db("SELECT * FROM filled_field WHERE user_id=$1 AND name=$2 AND field_id=ANY($3::UUID[])", self.user_id, self.name, self.template.all_fields.keys())
+        field_rows = await db(queries.FILLED_FIELDS_FOR_PROFILE, self.user_id, self.name, self.template.all_fields.keys())
+        return self._store_filled_field_rows(field_rows)
+
+    @classmethod
+    async def fetch_filled_fields_for_profiles(cls, db, profiles:typing.List['UserProfile'], template:Template) -> None:
+        """
+        Fetch the filled fields for multiple profiles of the same template with a single query,
+        storing them in each profile's .all_filled_fields.
+
+        Args:
+            db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+            profiles (typing.List[UserProfile]): The profiles that you want to populate.
+            template (Template): The template that all of the given profiles belong to.
+        """
+
+        # See if there's anything to do
+        if not profiles:
+            return
+        if len(template.all_fields) == 0:
+            await template.fetch_fields(db)
+
+        # Grab all of the fields in one go
+        field_rows = await db(
+            queries.FILLED_FIELDS_FOR_PROFILES,
+            [i.user_id for i in profiles], [i.name for i in profiles], list(template.all_fields.keys()),
+        )
+
+        # Split them out between the profiles
+        rows_by_profile = {(i.user_id, i.name): [] for i in profiles}
+        for row in field_rows:
+            rows_by_profile[(row['user_id'], row['name'])].append(row)
+        for profile in profiles:
+            profile.template = template
+            profile._store_filled_field_rows(rows_by_profile[(profile.user_id, profile.name)])
+
+    def _store_filled_field_rows(self, field_rows:typing.List[dict]) -> typing.Dict[uuid.UUID, FilledField]:
+        """
+        Store the given filled_field database rows in .all_filled_fields.
+        """
+
         self.all_filled_fields.clear()
+        all_fields = self.template.all_fields
         for f in field_rows:
-            filled = FilledField(**f)
-            filled.field = self.template.all_fields[filled.field_id]
+            filled = FilledField.from_record(f, all_fields[f['field_id']], user_id=self.user_id, name=self.name)
             self.all_filled_fields[filled.field_id] = filled
+        self._saved_values = {i: o.value for i, o in self.all_filled_fields.items()}
         return self.all_filled_fields
 
+    async def save(self, db) -> None:
+        """
+        Save the profile and its filled fields to the database inside of a single transaction.
+        Only the filled fields whose values differ from what was last fetched from (or saved to) the
+        database are written, and they're all written with one statement.
+
+        Args:
+            db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+
+        Raises:
+            asyncpg.ForeignKeyViolationError: The template (or one of its fields) was deleted.
+        """
+
+        # Work out what's changed
+        saved_values = self._saved_values or dict()
+        changed_fields = [
+            i for i in self.all_filled_fields.values()
+            if i.field_id not in saved_values or saved_values[i.field_id] != i.value
+        ]
+
+        # And save
+        async with db.conn.transaction():
+            await db(
+                """INSERT INTO created_profile (user_id, name, template_id, verified, posted_message_id, posted_channel_id)
+                VALUES ($1, $2, $3, $4, $5, $6) ON CONFLICT (user_id, name, template_id)
+                DO UPDATE SET verified=excluded.verified, posted_message_id=excluded.posted_message_id, posted_channel_id=excluded.posted_channel_id""",
+                self.user_id, self.name, self.template_id, self.verified, self.posted_message_id, self.posted_channel_id,
+            )
+            if changed_fields:
+                await db(
+                    """INSERT INTO filled_field (user_id, name, field_id, value, search_vector)
+                    SELECT $1, $2, field_id, value, TO_TSVECTOR('simple', COALESCE(value, '')) FROM UNNEST($3::UUID[], $4::VARCHAR[]) AS t(field_id, value)
+                    ON CONFLICT (user_id, name, field_id) DO UPDATE SET value=excluded.value, search_vector=excluded.search_vector""",
+                    self.user_id, self.name, [i.field_id for i in changed_fields], [i.value for i in changed_fields],
+                )
+        saved_values.update({i.field_id: i.value for i in changed_fields})
+        self._saved_values = saved_values
+        self.embed_cache.invalidate_profile(self.template_id, self.user_id, self.name)
+
+    @property
+    def has_unsaved_changes(self) -> bool:
+        """
+        Whether or not the filled fields differ from those last fetched from (or saved to) the database.
+        Profiles whose fields have never been fetched are counted as having unsaved changes.
+        """
+
+        if self._saved_values is None:
+            return True
+        return any([
+            i.field_id not in self._saved_values or self._saved_values[i.field_id] != i.value
+            for i in self.all_filled_fields.values()
+        ])
+
+    async def fetch_saved_state(self, db) -> bool:
+        """
+        Re-read where the profile is posted, and the stored values of any filled fields that haven't been changed here,
+        so that anything saved to the profile since it was fetched is kept rather than written over.
+
+        Args:
+            db (cogs.utils.database.DatabaseConnection): An active connection to the database.
+
+        Returns:
+            bool: Whether or not the profile is saved in the database.
+        """
+
+        profile_rows = await db(queries.PROFILE_POSTED_MESSAGE, self.user_id, self.name, self.template_id)
+        if not profile_rows:
+            return False
+        self.posted_message_id = profile_rows[0]['posted_message_id']
+        self.posted_channel_id = profile_rows[0]['posted_channel_id']
+        if self._saved_values is None:
+            return True
+
+        # Keep our changes on top of what's stored now
+        changed_fields = {
+            i.field_id: i for i in self.all_filled_fields.values()
+            if i.field_id not in self._saved_values or self._saved_values[i.field_id] != i.value
+        }
+        await self.fetch_filled_fields(db)
+        self.all_filled_fields.update(changed_fields)
+        return True
+
     async def fetch_template(self, db, *, fetch_fields:bool=True) -> Template:
         """
         Fetch the template for this field and store it in .template.
@@ -90,6 +227,18 @@ class UserProfile(object):
     def build_embed(self, bot, member:typing.Optional[discord.Member]=None) -> utils.Embed:
         """
         Converts the filled profile into an embed.
+        Profiles too large for one embed only have their first part returned here - see `build_embeds`.
+        """
+
+        return self.build_embeds(bot, member)[0]
+
+    def build_embeds(self, bot, member:typing.Optional[discord.Member]=None) -> typing.List[utils.Embed]:
+        """
+        Converts the filled profile into as many embeds as it takes to fit inside of Discord's limits.
+        Profiles that match what's in the database are rendered through the embed cache.
+
+        Raises:
+            cogs.utils.profiles.embed_budget.EmbedBudgetError: The profile can't be sent even when split up, eg its image URL is invalid.
         """
 
         # See if they're the right person
@@ -97,12 +246,29 @@ class UserProfile(object):
             raise ValueError("Invalid user passed to build embed")
         if member and not isinstance(member, discord.Member):
             raise ValueError("Invalid member object passed to build embed")
+        if not self.template:
+            raise AttributeError("Missing template field for user profile")
+
+        # See if we've rendered this before
+        use_cache = not self.has_unsaved_changes
+        if use_cache:
+            embeds = self.embed_cache.get(self, member)
+            if embeds is not None:
+                return embeds
+
+        # Render, check, and cache
+        embeds = embed_budget.validate_embeds(embed_budget.split_embed(self._build_embed(bot, member)))
+        if use_cache:
+            self.embed_cache.set(self, member, embeds)
+        return embeds
+
+    def _build_embed(self, bot, member:typing.Optional[discord.Member]=None) -> utils.Embed:
+        """
+        Renders the filled profile into an embed without touching the embed cache.
+        """
 
         # Create the initial embed
-        fields: typing.List[FilledField] = sorted(self.filled_fields.values(), key=lambda x: x.field.index)
         embed = utils.Embed(use_random_colour=True)
-        if not self.template:
-            raise AttributeError("Missing template field for user profile")
         embed.title = f"{self.template.name} | {self.name}"
         if self.template.colour:
             embed.colour = self.template.colour
@@ -111,23 +277,25 @@ class UserProfile(object):
         embed.add_field(name="Discord User", value=f"<@{self.user_id}>")
 
         # Add each of the fields
-        for f in fields:
+        image_field = self.template.compiled.image_field
+        for compiled_field in self.template.compiled.fields:
 
-            # Filter deleted or unset data
-            if f.field.deleted:
+            # Filter unset data
+            f = self.all_filled_fields.get(compiled_field.field.field_id)
+            if f is None or f.value is None:
                 continue
-            try:
-                field_value = CommandProcessor.get_value(f.field.prompt, member)
-            except InvalidCommandText:
+            if compiled_field.program is not None:
+                field_value = compiled_field.program.evaluate(member)
+            else:
                 field_value = f.value
             if field_value is None:
                 continue
 
             # Set data
-            if isinstance(f.field.field_type, ImageField) or f.field.field_type == ImageField:
+            if compiled_field.field is image_field:
                 embed.set_image(url=field_value)
             else:
-                embed.add_field(name=f.field.name, value=field_value, inline=len(field_value) <= 100)
+                embed.add_field(name=compiled_field.field.name, value=field_value, inline=len(field_value) <= 100)
 
         # Add a footer to our embed
         bot.set_footer_from_config(embed)
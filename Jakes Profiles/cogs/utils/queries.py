@@ -0,0 +1,84 @@
+"""
+The SQL for the queries that the bot issues against tables that could grow large.
+
+These are run by the cogs and by the profile classes, and are also what `migrations.check_query_plans`
+runs EXPLAIN on, so the statements that are checked are the same ones that are actually sent to the
+database. Queries with an optional filter have a `{key_filter}` (or similar) placeholder that's formatted
+with the matching filter constant, or with an empty string.
+"""
+
+
+# Templates
+TEMPLATE_BY_ID = "SELECT * FROM template WHERE template_id=$1"
+TEMPLATE_BY_NAME = "SELECT * FROM template WHERE guild_id=$1 AND LOWER(name)=LOWER($2)"
+TEMPLATE_IDS_FOR_GUILD = "SELECT template_id FROM template WHERE guild_id=$1"
+TEMPLATES_WITH_PROFILE_COUNTS = """SELECT template.template_id, template.name, COUNT(created_profile.*) FROM template
+LEFT JOIN created_profile ON template.template_id=created_profile.template_id
+WHERE guild_id=$1 GROUP BY template.template_id"""
+PROFILE_COUNT_FOR_TEMPLATE = "SELECT COUNT(*) FROM created_profile WHERE template_id=$1"
+
+# Fields
+FIELDS_FOR_TEMPLATE = "SELECT * FROM field WHERE template_id=$1"
+LIVE_FIELDS_FOR_UPDATE = "SELECT * FROM field WHERE template_id=$1 AND deleted=false FOR UPDATE"
+
+# Profiles
+PROFILES_FOR_USER = "SELECT * FROM created_profile WHERE template_id=$1 AND user_id=$2"
+PROFILE_FOR_USER_BY_NAME = "SELECT * FROM created_profile WHERE template_id=$1 AND user_id=$2 AND LOWER(name)=LOWER($3)"
+PROFILES_FOR_TEMPLATE = "SELECT * FROM created_profile WHERE template_id=$1"
+PROFILES_FOR_TEMPLATE_FIRST_PAGE = "SELECT * FROM created_profile WHERE template_id=$1 ORDER BY user_id, name LIMIT $2"
+PROFILES_FOR_TEMPLATE_PAGE_AFTER = """SELECT * FROM created_profile WHERE template_id=$1 AND (user_id, name) > ($2, $3)
+ORDER BY user_id, name LIMIT $4"""
+PROFILE_POSTED_MESSAGE = "SELECT posted_message_id, posted_channel_id FROM created_profile WHERE user_id=$1 AND name=$2 AND template_id=$3"
+
+# Filled fields
+FILLED_FIELDS_FOR_PROFILE = "SELECT user_id, name, field_id, value FROM filled_field WHERE user_id=$1 AND name=$2 AND field_id=ANY($3::UUID[])"
+FILLED_FIELDS_FOR_PROFILES = """SELECT filled_field.user_id, filled_field.name, filled_field.field_id, filled_field.value FROM filled_field
+INNER JOIN UNNEST($1::BIGINT[], $2::VARCHAR[]) AS profile(user_id, name)
+ON filled_field.user_id=profile.user_id AND filled_field.name=profile.name
+WHERE filled_field.field_id=ANY($3::UUID[])"""
+
+# Search
+SEARCH_PROFILES = """SELECT created_profile.*, matches.rank FROM (
+    SELECT filled_field.user_id, filled_field.name, ROUND(SUM(TS_RANK(filled_field.search_vector, query)::FLOAT8) * 1000000)::BIGINT AS rank
+    FROM filled_field, WEBSEARCH_TO_TSQUERY('simple', $2) query
+    WHERE filled_field.field_id=ANY($3::UUID[]) AND filled_field.search_vector @@ query
+    GROUP BY filled_field.user_id, filled_field.name
+) matches
+INNER JOIN created_profile ON created_profile.user_id=matches.user_id AND created_profile.name=matches.name
+AND created_profile.template_id=$1
+WHERE (created_profile.verified OR NOT $4) {key_filter}
+ORDER BY matches.rank DESC, matches.user_id DESC, matches.name DESC LIMIT $5"""
+SEARCH_PROFILES_AFTER_FILTER = "AND (matches.rank, matches.user_id, matches.name) < ($6::BIGINT, $7::BIGINT, $8::VARCHAR)"
+SEARCH_VECTOR_BACKFILL = """WITH batch AS (
+    SELECT user_id, name, field_id FROM filled_field {key_filter}
+    ORDER BY user_id, name, field_id LIMIT $1
+), filled AS (
+    UPDATE filled_field SET search_vector=TO_TSVECTOR('simple', COALESCE(filled_field.value, '')) FROM batch
+    WHERE filled_field.user_id=batch.user_id AND filled_field.name=batch.name AND filled_field.field_id=batch.field_id
+    AND filled_field.search_vector IS NULL RETURNING 1
+)
+SELECT user_id, name, field_id, (SELECT COUNT(*) FROM filled) AS filled_count FROM batch
+ORDER BY user_id DESC, name DESC, field_id DESC LIMIT 1"""
+SEARCH_VECTOR_BACKFILL_AFTER_FILTER = "WHERE (user_id, name, field_id) > ($2, $3, $4)"
+
+# Verification
+PENDING_VERIFICATION_MESSAGE_IDS = "SELECT posted_message_id FROM created_profile WHERE verified=false AND posted_message_id IS NOT NULL"
+PENDING_PROFILE_BY_MESSAGE = "SELECT * FROM created_profile WHERE posted_message_id=$1 AND verified=false"
+VERIFY_PROFILE_BY_MESSAGE = "UPDATE created_profile SET verified=true WHERE posted_message_id=$1 AND verified=false RETURNING *"
+PENDING_PROFILES_FIRST_PAGE = "SELECT * FROM created_profile WHERE template_id=$1 AND verified=false ORDER BY user_id, name LIMIT $2"
+PENDING_PROFILES_PAGE_AFTER = """SELECT * FROM created_profile WHERE template_id=$1 AND verified=false AND (user_id, name) > ($2, $3)
+ORDER BY user_id, name LIMIT $4"""
+PENDING_PROFILE_KEYS = "SELECT user_id, name FROM created_profile WHERE template_id=$1 AND verified=false {user_filter}"
+PENDING_PROFILE_KEYS_USER_FILTER = "AND user_id=ANY($2::BIGINT[])"
+BULK_VERIFY_PROFILES = """UPDATE created_profile SET verified=true WHERE template_id=$1 AND verified=false
+AND (user_id, name) IN (SELECT * FROM UNNEST($2::BIGINT[], $3::VARCHAR[])) RETURNING *"""
+BULK_DENY_PROFILES = """DELETE FROM created_profile WHERE template_id=$1 AND verified=false
+AND (user_id, name) IN (SELECT * FROM UNNEST($2::BIGINT[], $3::VARCHAR[])) RETURNING *"""
+
+# Drafts
+DRAFT = "SELECT * FROM profile_draft WHERE user_id=$1 AND template_id=$2"
+DRAFT_FIELDS = "SELECT * FROM profile_draft_field WHERE user_id=$1 AND template_id=$2"
+DELETE_EXPIRED_DRAFTS = "DELETE FROM profile_draft WHERE updated_at < (NOW() AT TIME ZONE 'utc') - $1::INTERVAL"
+
+# Guild settings
+GUILD_SETTINGS_BY_ID = "SELECT * FROM guild_settings WHERE guild_id=$1"